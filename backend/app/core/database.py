@@ -1,44 +1,194 @@
-"""資料庫連線設定（非同步版本）"""
-from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+"""資料庫連線設定（非同步版本）
+
+應用程式的所有工作（API、RSS 擷取、標籤、點子生成、啟動時的結構初始化）共用同一組非同步引擎，
+連線數量只在此處依設定決定。
+
+支援 SQLite 與 PostgreSQL：DATABASE_URL 只需指定資料庫（如 postgresql://...），
+非同步引擎使用 asyncpg（離線腳本的同步引擎使用 psycopg），連線池大小、溢位與回收時間由設定決定。
+
+檔案型 SQLite 使用正式環境的儲存設定：
+- 每條連線套用 WAL、synchronous=NORMAL、mmap、cache 與 busy_timeout。
+- 寫入只經過單一連線（pool_size=1），讀取使用另一組唯讀連線池；
+  WAL 模式下讀取不會被寫入交易阻擋，寫入之間也不會互相搶鎖。
+- AsyncSessionLocal 建立的 Session 依語句自動分流：flush 與 INSERT / UPDATE / DELETE
+  走寫入連線，其餘查詢走唯讀連線。
+記憶體資料庫與 PostgreSQL 維持單一引擎（PostgreSQL 以 MVCC 支援多個並行寫入者）。
+"""
+import os
+from typing import Optional
+
+from sqlalchemy import Delete, Insert, Update, create_engine, event, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session
 
 from app.core.config import get_settings
 
 settings = get_settings()
 
-# === 同步引擎（供 metadata.create_all 與排程任務使用） ===
-sync_engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False}
-)
+# 各資料庫使用的同步 / 非同步驅動
+SYNC_DRIVERS = {"sqlite": "sqlite", "postgresql": "postgresql+psycopg"}
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+# 支援 ON CONFLICT 的 INSERT 建構函式（兩者的 on_conflict_do_nothing / do_update 介面相同）
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _driver_url(database_url: str, drivers: dict[str, str]) -> URL:
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in drivers:
+        raise ValueError(f"不支援的資料庫: {backend}")
+    return url.set(drivername=drivers[backend])
+
+
+def sync_database_url(database_url: str) -> URL:
+    """同步引擎用的連線 URL"""
+    return _driver_url(database_url, SYNC_DRIVERS)
+
+
+def async_database_url(database_url: str) -> URL:
+    """非同步引擎用的連線 URL"""
+    return _driver_url(database_url, ASYNC_DRIVERS)
+
+
+def _engine_options(database_url: str) -> dict:
+    """依資料庫決定引擎參數：SQLite 允許跨執行緒使用連線，PostgreSQL 使用可設定的連線池"""
+    if make_url(database_url).get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        # 資料庫重啟或閒置斷線後，取用連線時先檢查，避免請求拿到失效連線
+        "pool_pre_ping": True,
+    }
+
+
+def dialect_insert(db, table):
+    """依 Session 連線的資料庫取得支援 ON CONFLICT 的 INSERT"""
+    return UPSERT_INSERTS[db.get_bind().dialect.name](table)
+
+
+def uses_sqlite_profile(database_url: str) -> bool:
+    """是否為套用儲存設定的檔案型 SQLite"""
+    url = make_url(database_url)
+    return (
+        settings.sqlite_wal
+        and url.get_backend_name() == "sqlite"
+        and url.database not in (None, "", ":memory:")
+    )
+
 
-# 同步 Session 工廠（僅供排程任務等同步場景使用）
-SyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+def _apply_sqlite_pragmas(dbapi_connection, writer: bool) -> None:
+    """新連線套用 SQLite 儲存設定（journal_mode 會寫入資料庫檔，只由寫入連線設定）"""
+    cursor = dbapi_connection.cursor()
+    if writer:
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+    # 負值單位為 KiB
+    cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_kb}")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
-# === 非同步引擎（主要 API 用） ===
-async_database_url = settings.database_url.replace("sqlite:///", "sqlite+aiosqlite:///")
 
-async_engine = create_async_engine(
-    async_database_url,
-    connect_args={"check_same_thread": False}
-)
+def _listen_pragmas(engine: Engine, writer: bool) -> None:
+    event.listen(engine, "connect", lambda conn, _record: _apply_sqlite_pragmas(conn, writer))
 
-# 非同步 Session 工廠
-AsyncSessionLocal = async_sessionmaker(
-    bind=async_engine,
-    class_=AsyncSession,
-    expire_on_commit=False
-)
+
+def create_sync_engine(database_url: str) -> Engine:
+    """建立同步引擎（供基準測試等離線腳本使用；檔案型 SQLite 為單一寫入連線）"""
+    if not uses_sqlite_profile(database_url):
+        return create_engine(sync_database_url(database_url), **_engine_options(database_url))
+
+    engine = create_engine(
+        sync_database_url(database_url),
+        connect_args={"check_same_thread": False},
+        pool_size=1,
+        max_overflow=0,
+    )
+    _listen_pragmas(engine, writer=True)
+    return engine
+
+
+def create_async_engines(database_url: str) -> tuple[AsyncEngine, AsyncEngine]:
+    """建立非同步的（寫入引擎, 讀取引擎）；未套用儲存設定時兩者為同一個引擎"""
+    async_url = async_database_url(database_url)
+    if not uses_sqlite_profile(database_url):
+        engine = create_async_engine(async_url, **_engine_options(database_url))
+        return engine, engine
+
+    writer = create_async_engine(
+        async_url,
+        connect_args={"check_same_thread": False},
+        pool_size=1,
+        max_overflow=0,
+    )
+    _listen_pragmas(writer.sync_engine, writer=True)
+
+    # 唯讀連線以 URI 開啟（mode=ro），誤送的寫入語句會直接失敗而不是搶寫入鎖
+    path = os.path.abspath(make_url(database_url).database)
+    reader = create_async_engine(
+        f"sqlite+aiosqlite:///file:{path}?mode=ro&uri=true",
+        connect_args={"check_same_thread": False},
+        pool_size=settings.sqlite_read_pool_size,
+        max_overflow=0,
+    )
+    _listen_pragmas(reader.sync_engine, writer=False)
+    return writer, reader
+
+
+def create_routing_sessionmaker(
+    writer: AsyncEngine,
+    reader: Optional[AsyncEngine] = None,
+) -> async_sessionmaker[AsyncSession]:
+    """建立依語句分流讀寫連線的非同步 Session 工廠
+
+    同一個 Session 的讀取與寫入位於不同連線：寫入尚未提交前，讀取看不到該筆寫入。
+    """
+    if reader is None or reader is writer:
+        return async_sessionmaker(bind=writer, class_=AsyncSession, expire_on_commit=False)
+
+    class RoutingSession(Session):
+        """flush 與 DML 走寫入連線，查詢走唯讀連線
+
+        未附語句的連線要求（如 ORM 依主鍵批次 UPDATE）同樣來自寫入路徑。
+        """
+
+        def get_bind(self, mapper=None, clause=None, **kwargs):
+            if self._flushing or clause is None or isinstance(clause, (Insert, Update, Delete)):
+                return writer.sync_engine
+            return reader.sync_engine
+
+    return async_sessionmaker(
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        expire_on_commit=False,
+    )
+
+
+# === 非同步引擎：單一寫入連線 + 唯讀連線池 ===
+async_engine, async_read_engine = create_async_engines(settings.database_url)
+
+# 非同步 Session 工廠（自動分流讀寫）
+AsyncSessionLocal = create_routing_sessionmaker(async_engine, async_read_engine)
 
 # 建立 Base 類別供模型繼承
 Base = declarative_base()
 
-# === 向後相容別名 ===
-# 讓現有 import 不中斷（逐步遷移期間）
-engine = sync_engine
-SessionLocal = SyncSessionLocal
+
+async def init_db(engine: Optional[AsyncEngine] = None) -> None:
+    """建立缺少的資料表並套用結構遷移（預設使用寫入引擎）"""
+    from app.core.migrations import run_migrations
+
+    async with (engine or async_engine).begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations)
 
 
 async def get_db():
@@ -50,10 +200,10 @@ async def get_db():
             await session.close()
 
 
-def get_sync_db():
-    """取得同步資料庫 Session（排程任務用）"""
-    db = SyncSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def checkpoint_wal(mode: str = "TRUNCATE") -> Optional[tuple[int, int, int]]:
+    """執行 WAL checkpoint，回傳 (busy, WAL 頁數, 已寫回頁數)；未使用 WAL 時回傳 None"""
+    if not uses_sqlite_profile(settings.database_url):
+        return None
+    async with async_engine.connect() as conn:
+        row = (await conn.execute(text(f"PRAGMA wal_checkpoint({mode})"))).one()
+    return tuple(row)
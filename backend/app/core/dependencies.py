@@ -5,14 +5,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
 
 from app.core.database import get_db
-from app.services.llm_client import VercelLLMClient
+from app.services.llm_client import VercelLLMClient, create_llm_client
 from app.services.news_service import NewsService
+from app.services.embedding import get_embedder
+from app.services.search_service import SearchService
+from app.services.similarity_service import SimilarityService
+from app.services.vector_index import get_idea_index, get_news_index
 
 
 @lru_cache(maxsize=1)
 def get_llm_client() -> VercelLLMClient:
     """取得 LLM 客戶端（單例）"""
-    return VercelLLMClient()
+    return create_llm_client()
 
 
 async def get_news_service(
@@ -20,3 +24,17 @@ async def get_news_service(
 ) -> NewsService:
     """取得新聞服務"""
     return NewsService(db)
+
+
+async def get_search_service(
+    db: AsyncSession = Depends(get_db),
+) -> SearchService:
+    """取得全文搜尋服務"""
+    return SearchService(db)
+
+
+async def get_similarity_service(
+    db: AsyncSession = Depends(get_db),
+) -> SimilarityService:
+    """取得語意相似服務"""
+    return SimilarityService(db, get_news_index(), get_idea_index(), get_embedder())
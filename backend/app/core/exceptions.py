@@ -23,6 +23,24 @@ class InsufficientDataError(AppException):
     detail = "資料庫中沒有足夠的資料"
 
 
+class InvalidCursorError(AppException):
+    """分頁游標無效"""
+    status_code = 400
+    detail = "無效的分頁游標"
+
+
+class InvalidSearchQueryError(AppException):
+    """搜尋關鍵字無效"""
+    status_code = 400
+    detail = "請輸入搜尋關鍵字"
+
+
+class SearchUnavailableError(AppException):
+    """目前的資料庫不支援全文搜尋"""
+    status_code = 501
+    detail = "全文搜尋僅支援 SQLite"
+
+
 class LLMError(AppException):
     """LLM 服務錯誤"""
     status_code = 500
@@ -32,4 +50,8 @@ class LLMError(AppException):
 class LLMRateLimitError(AppException):
     """LLM 速率限制"""
     status_code = 429
-    detail = "AI 服務目前流量限制，請稍後再試"
\ No newline at end of file
+    detail = "AI 服務目前流量限制，請稍後再試"
+    
+    def __init__(self, detail: str | None = None, retry_after: float | None = None):
+        self.retry_after = retry_after
+        super().__init__(detail)
\ No newline at end of file
@@ -0,0 +1,245 @@
+"""資料庫結構版本遷移
+
+create_all 只會建立缺少的資料表，既有資料表的新欄位與索引由此處依版本補上。
+每個步驟皆需可重複執行（新資料庫經 create_all 後欄位已存在）。
+"""
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(col["name"] == column for col in inspect(conn).get_columns(table))
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str) -> None:
+    """新增欄位（已存在則略過）"""
+    if not _has_column(conn, table, column):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _create_index(
+    conn: Connection,
+    name: str,
+    table: str,
+    columns: str,
+    unique: bool = False,
+    where: Optional[str] = None,
+) -> None:
+    """建立索引（已存在則略過），指定 where 時為部分索引"""
+    conn.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+        + (f" WHERE {where}" if where else "")
+    ))
+
+
+def _drop_index(conn: Connection, name: str) -> None:
+    """刪除索引（不存在則略過）"""
+    conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def _migrate_news_near_duplicates(conn: Connection) -> None:
+    """新聞 SimHash 指紋與近似重複群組欄位，並回填既有新聞的指紋"""
+    from app.services.simhash import news_fingerprint
+
+    _add_column(conn, "news", "simhash", "BIGINT")
+    _add_column(conn, "news", "cluster_id", "INTEGER REFERENCES news (id)")
+    _create_index(conn, "ix_news_simhash", "news", "simhash")
+    _create_index(conn, "ix_news_cluster_id", "news", "cluster_id")
+
+    rows = conn.execute(text("SELECT id, title, summary FROM news WHERE simhash IS NULL")).all()
+    if rows:
+        conn.execute(
+            text("UPDATE news SET simhash = :simhash WHERE id = :id"),
+            [{"id": row.id, "simhash": news_fingerprint(row.title, row.summary)} for row in rows],
+        )
+
+
+def _migrate_news_link_hash(conn: Connection) -> None:
+    """新聞正規化連結雜湊欄位與唯一索引，並回填既有新聞
+
+    正規化後重複的舊資料只保留最早一筆的雜湊，其餘設為 NULL 並歸入該筆所屬的群組。
+    """
+    from app.services.url_canonical import url_hash64
+
+    _add_column(conn, "news", "link_hash", "BIGINT")
+
+    rows = conn.execute(text("SELECT id, link, cluster_id FROM news ORDER BY id")).all()
+    cluster_by_hash: dict[int, int] = {}
+    hashes, duplicates = [], []
+    for row in rows:
+        link_hash = url_hash64(row.link)
+        if link_hash not in cluster_by_hash:
+            cluster_by_hash[link_hash] = row.cluster_id or row.id
+            hashes.append({"id": row.id, "link_hash": link_hash})
+        elif row.cluster_id is None:
+            duplicates.append({"id": row.id, "cluster_id": cluster_by_hash[link_hash]})
+
+    conn.execute(text("UPDATE news SET link_hash = NULL"))
+    if hashes:
+        conn.execute(text("UPDATE news SET link_hash = :link_hash WHERE id = :id"), hashes)
+    if duplicates:
+        conn.execute(text("UPDATE news SET cluster_id = :cluster_id WHERE id = :id"), duplicates)
+    _create_index(conn, "ix_news_link_hash", "news", "link_hash", unique=True)
+
+
+def _migrate_keyset_indexes(conn: Connection) -> None:
+    """列表游標分頁用的 (created_at, id) 複合索引
+
+    標籤依 (name, id) 分頁，name 的唯一索引已隱含 rowid（即 id），不需另建。
+    """
+    _create_index(conn, "ix_news_created_at_id", "news", "created_at, id")
+    _create_index(conn, "ix_ideas_created_at_id", "ideas", "created_at, id")
+
+
+def _migrate_counters(conn: Connection) -> None:
+    """資料表筆數計數器，以目前的實際筆數初始化"""
+    from app.models.counter import Counter
+    from app.services.counters import seed_counters
+
+    Counter.__table__.create(conn, checkfirst=True)
+    seed_counters(conn)
+
+
+def _migrate_query_plan_indexes(conn: Connection) -> None:
+    """依各服務查詢的 EXPLAIN QUERY PLAN 調整索引（見 benchmarks/bench_query_plans.py）
+
+    - news_tags(tag_id, news_id)：依標籤找新聞原本只能掃描整張關聯表。
+    - news.tagged_at + 部分索引：待標籤佇列原本以 NOT EXISTS 反查 news_tags，需掃描整張 news。
+      既有已標籤新聞的 tagged_at 以遷移時間回填。
+    - 以 cluster_id IS NULL 為條件的部分索引取代 ix_news_cluster_id：所有查詢都是篩選代表新聞
+      （絕大多數列），該索引只會讓查詢規劃器走近乎全表的索引掃描。
+    """
+    _create_index(conn, "ix_news_tags_tag_id_news_id", "news_tags", "tag_id, news_id")
+
+    _add_column(conn, "news", "tagged_at", "TIMESTAMP")
+    conn.execute(
+        text(
+            "UPDATE news SET tagged_at = :now WHERE tagged_at IS NULL "
+            "AND EXISTS (SELECT 1 FROM news_tags WHERE news_tags.news_id = news.id)"
+        ),
+        {"now": datetime.utcnow()},
+    )
+    _create_index(conn, "ix_news_untagged", "news", "id", where="tagged_at IS NULL")
+
+    _create_index(conn, "ix_news_canonical_created_at", "news", "created_at", where="cluster_id IS NULL")
+    _drop_index(conn, "ix_news_cluster_id")
+
+
+def _migrate_search_indexes(conn: Connection) -> None:
+    """新聞與點子的 FTS5 全文索引（外部內容表 + 觸發器同步），並以既有資料重建
+
+    只適用 SQLite；PostgreSQL 不建立索引，搜尋 API 回應 501。
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    from app.services.search_service import SEARCH_INDEXES
+
+    for index in SEARCH_INDEXES.values():
+        fts, table, columns = index.fts_table, index.content_table, index.columns
+        names = ", ".join(columns)
+        new_values = ", ".join(f"new.{column}" for column in columns)
+        old_values = ", ".join(f"old.{column}" for column in columns)
+        insert_new = f"INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {new_values});"
+        delete_old = f"INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{names}, content='{table}', content_rowid='id', tokenize='trigram')"
+        ))
+        conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END"))
+        conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END"))
+        # 只在索引欄位變動時觸發（標籤時間、群組等欄位的更新不需重寫索引）
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} "
+            f"BEGIN {delete_old} {insert_new} END"
+        ))
+        conn.execute(text(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')"))
+
+
+def _migrate_idea_news_pairs(conn: Connection) -> None:
+    """點子來源新聞的外鍵與已用配對表，依標題回填既有點子
+
+    標題相同的新聞取 ID 最小者；找不到對應新聞的點子維持 NULL、不記錄配對。
+    news.title 沒有索引，以一次依主鍵順序的掃描建立標題對照，不逐筆查詢。
+    同一配對有多個點子時只記錄最早的一個。
+    """
+    from app.core.database import UPSERT_INSERTS
+    from app.models.news import idea_news_pairs
+
+    _add_column(conn, "ideas", "news_id_1", "INTEGER REFERENCES news (id)")
+    _add_column(conn, "ideas", "news_id_2", "INTEGER REFERENCES news (id)")
+    idea_news_pairs.create(conn, checkfirst=True)
+
+    ideas = conn.execute(text(
+        "SELECT id, news_source_1, news_source_2, news_id_1, news_id_2 FROM ideas ORDER BY id"
+    )).all()
+    wanted = {title for row in ideas for title in (row.news_source_1, row.news_source_2) if title}
+    news_by_title: dict[str, int] = {}
+    if wanted:
+        for news_id, title in conn.execute(text("SELECT id, title FROM news ORDER BY id")):
+            if title in wanted:
+                news_by_title.setdefault(title, news_id)
+
+    updates, pairs = [], {}
+    for row in ideas:
+        id_1 = row.news_id_1 or news_by_title.get(row.news_source_1)
+        id_2 = row.news_id_2 or news_by_title.get(row.news_source_2)
+        if (id_1, id_2) != (row.news_id_1, row.news_id_2):
+            updates.append({"id": row.id, "id_1": id_1, "id_2": id_2})
+        if id_1 and id_2 and id_1 != id_2:
+            pairs.setdefault((min(id_1, id_2), max(id_1, id_2)), row.id)
+
+    if updates:
+        conn.execute(text("UPDATE ideas SET news_id_1 = :id_1, news_id_2 = :id_2 WHERE id = :id"), updates)
+    if pairs:
+        conn.execute(
+            UPSERT_INSERTS[conn.dialect.name](idea_news_pairs).on_conflict_do_nothing(),
+            [{"news_id_low": low, "news_id_high": high, "idea_id": idea_id} for (low, high), idea_id in pairs.items()],
+        )
+
+
+def _migrate_news_tag_source(conn: Connection) -> None:
+    """新聞標籤來源欄位（本地標籤器只以 LLM 標籤訓練）
+
+    既有標籤無法分辨是 LLM、本地標籤器或沿用群組寫入的，維持 NULL、不列入訓練資料。
+    """
+    _add_column(conn, "news", "tag_source", "VARCHAR(10)")
+
+
+# (版本, 名稱, 遷移函式)，版本號只增不減
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "news_near_duplicates", _migrate_news_near_duplicates),
+    (2, "news_link_hash", _migrate_news_link_hash),
+    (3, "keyset_indexes", _migrate_keyset_indexes),
+    (4, "counters", _migrate_counters),
+    (5, "query_plan_indexes", _migrate_query_plan_indexes),
+    (6, "search_indexes", _migrate_search_indexes),
+    (7, "idea_news_pairs", _migrate_idea_news_pairs),
+    (8, "news_tag_source", _migrate_news_tag_source),
+]
+
+
+def run_migrations(conn: Connection) -> list[int]:
+    """執行尚未套用的遷移，回傳本次套用的版本"""
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+    ))
+    applied_versions = set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version in applied_versions:
+            continue
+        migrate(conn)
+        conn.execute(
+            text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+            {"v": version, "n": name, "t": datetime.utcnow()},
+        )
+        applied.append(version)
+        print(f"[資料庫] 已套用遷移 {version}: {name}")
+
+    return applied
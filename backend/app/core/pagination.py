@@ -0,0 +1,86 @@
+"""Keyset（游標）分頁
+
+依排序鍵（如 (created_at, id)）記住上一頁最後一筆的位置，下一頁以
+WHERE (鍵) < (上一筆的鍵) 直接從索引定位，成本不隨頁數加深而增加。
+游標為不透明的 base64 字串，內容只有排序鍵的值。
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, NamedTuple, Optional, Sequence
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.core.exceptions import InvalidCursorError
+
+
+class Page(NamedTuple):
+    """一頁結果與下一頁的游標（沒有下一頁時為 None）"""
+    items: list
+    next_cursor: Optional[str]
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """排序鍵的值編碼為游標"""
+    payload = [
+        {"dt": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list[Any]:
+    """游標解碼為排序鍵的值，格式錯誤時拋出 InvalidCursorError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != size:
+            raise ValueError("cursor size mismatch")
+        return [
+            datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in payload
+        ]
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise InvalidCursorError()
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    keys: Sequence[InstrumentedAttribute],
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    descending: bool = True,
+) -> Page:
+    """依 keys 排序取得一頁
+
+    有游標時從游標位置之後開始（keyset）；沒有游標時沿用 offset（相容舊用法）。
+    兩種模式都會回傳下一頁游標，客戶端可從第一頁起改用游標翻頁。
+    keys 最後一個欄位必須唯一（通常為 id），所有欄位同方向排序才能走同一個複合索引。
+    """
+    if limit < 1:
+        return Page([], None)
+
+    order = [key.desc() if descending else key.asc() for key in keys]
+    stmt = stmt.order_by(*order)
+
+    if cursor:
+        values = decode_cursor(cursor, len(keys))
+        position = tuple_(*keys)
+        stmt = stmt.where(position < tuple_(*values) if descending else position > tuple_(*values))
+    elif skip:
+        stmt = stmt.offset(skip)
+
+    # 多取一筆判斷是否還有下一頁
+    rows = list((await db.execute(stmt.limit(limit + 1))).scalars().all())
+    if len(rows) <= limit:
+        return Page(rows, None)
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return Page(rows, encode_cursor([getattr(last, key.key) for key in keys]))
@@ -1,4 +1,5 @@
 """FastAPI 應用程式主入口"""
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
@@ -6,10 +7,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.core.config import get_settings
-from app.core.database import engine, Base
-from app.core.exceptions import AppException
+from app.core.database import AsyncSessionLocal, init_db
+from app.core.exceptions import AppException, LLMRateLimitError
+from app.core.dependencies import get_llm_client
+from app.services.embedding import get_embedder
+from app.services.feed_downloader import get_feed_downloader
+from app.services.feed_parser import shutdown_parse_pool
 from app.services.scheduler import start_scheduler, stop_scheduler
-from app.routers import ideas, news
+from app.services.tag_cooccurrence import get_tag_cooccurrence
+from app.services.tag_dictionary import get_tag_dictionary
+from app.routers import ideas, news, search, system
 
 # 取得設定
 settings = get_settings()
@@ -19,11 +26,22 @@ settings = get_settings()
 async def lifespan(app: FastAPI):
     """應用生命週期管理"""
     # 啟動時執行
-    Base.metadata.create_all(bind=engine)
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        tag_count = await get_tag_dictionary().warm(db)
+        tagged_count = await get_tag_cooccurrence().warm(db)
+    print(f"[標籤字典] 已載入 {tag_count} 個標籤")
+    print(f"[標籤共現] 已載入 {tagged_count} 則新聞的標籤")
+    # 向量器建立投影矩陣需數百毫秒，先在執行緒中建立，避免第一次寫入時卡住事件迴圈
+    await asyncio.to_thread(get_embedder)
+    await get_llm_client().open()
     start_scheduler()
     yield
     # 關閉時執行
     stop_scheduler()
+    await get_feed_downloader().aclose()
+    shutdown_parse_pool()
+    await get_llm_client().aclose()
 
 
 # 建立 FastAPI 應用
@@ -39,9 +57,13 @@ app = FastAPI(
 @app.exception_handler(AppException)
 async def app_exception_handler(request: Request, exc: AppException):
     """全域應用例外處理"""
+    headers = None
+    if isinstance(exc, LLMRateLimitError) and exc.retry_after is not None:
+        headers = {"Retry-After": str(max(1, round(exc.retry_after)))}
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=headers
     )
 
 
@@ -57,6 +79,8 @@ app.add_middleware(
 # 註冊路由
 app.include_router(ideas.router, prefix="/api")
 app.include_router(news.router, prefix="/api")
+app.include_router(system.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
 
 
 @app.get("/")
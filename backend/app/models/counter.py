@@ -0,0 +1,14 @@
+"""資料表筆數計數器資料模型"""
+from datetime import datetime
+from sqlalchemy import Column, String, BigInteger, DateTime
+
+from app.core.database import Base
+
+
+class Counter(Base):
+    """各資料表的筆數（與寫入在同一交易中增減，定期與 COUNT(*) 對帳）"""
+    __tablename__ = "counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,18 @@
+"""RSS 來源狀態資料模型"""
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime
+
+from app.core.database import Base
+
+
+class FeedState(Base):
+    """RSS 來源的條件式請求快取（ETag / Last-Modified / 內容雜湊）"""
+    __tablename__ = "feed_states"
+
+    source = Column(String(100), primary_key=True)
+    url = Column(String(1000), nullable=False)
+    etag = Column(String(500), nullable=True)
+    last_modified = Column(String(100), nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    last_checked_at = Column(DateTime, default=datetime.utcnow)
+    last_changed_at = Column(DateTime, nullable=True)
@@ -0,0 +1,17 @@
+"""LLM 回應快取資料模型"""
+from datetime import datetime
+from sqlalchemy import Column, String, Text, DateTime
+
+from app.core.database import Base
+
+
+class LLMCacheEntry(Base):
+    """LLM 回應快取（以 model / prompt / 參數的雜湊為鍵）"""
+    __tablename__ = "llm_cache"
+
+    key = Column(String(64), primary_key=True)
+    prompt_type = Column(String(50), nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -1,6 +1,6 @@
 """新聞與標籤資料模型"""
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Index, Table, text
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -11,7 +11,9 @@ news_tags = Table(
     "news_tags",
     Base.metadata,
     Column("news_id", Integer, ForeignKey("news.id"), primary_key=True),
-    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True)
+    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    # 主鍵為 (news_id, tag_id)，依標籤找新聞需要反向的複合索引
+    Index("ix_news_tags_tag_id_news_id", "tag_id", "news_id"),
 )
 
 
@@ -22,14 +24,42 @@ class News(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(500), nullable=False)
     link = Column(String(1000), nullable=False, unique=True)
+    # 正規化連結的 64-bit 雜湊（去重查詢走此欄位；舊資料中的重複連結為 NULL）
+    link_hash = Column(BigInteger, nullable=True, unique=True, index=True)
     summary = Column(Text, nullable=True)
     source = Column(String(100), nullable=False)
     published_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # 近似重複偵測：標題 + 摘要的 SimHash，及所屬群組的代表新聞 ID（自身為代表時為 NULL）
+    simhash = Column(BigInteger, nullable=True, index=True)
+    cluster_id = Column(Integer, ForeignKey("news.id"), nullable=True)
+    # 寫入標籤的時間（NULL 表示待標籤），讓待標籤佇列可以走部分索引而不必反查 news_tags
+    tagged_at = Column(DateTime, nullable=True)
+    # 標籤來源：llm / local（本地標籤器）/ cluster（沿用群組代表）；本地標籤器只以 llm 標籤訓練
+    tag_source = Column(String(10), nullable=True)
     
     # 關聯標籤
     tags = relationship("Tag", secondary=news_tags, back_populates="news_items")
 
+    __table_args__ = (
+        # 列表游標分頁依 (created_at, id) 排序
+        Index("ix_news_created_at_id", "created_at", "id"),
+        # 待標籤佇列：只索引尚未標籤的新聞
+        Index(
+            "ix_news_untagged",
+            "id",
+            sqlite_where=text("tagged_at IS NULL"),
+            postgresql_where=text("tagged_at IS NULL"),
+        ),
+        # 近似重複比對：時間窗內的群組代表新聞（代表新聞佔絕大多數，單獨索引 cluster_id 沒有選擇性）
+        Index(
+            "ix_news_canonical_created_at",
+            "created_at",
+            sqlite_where=text("cluster_id IS NULL"),
+            postgresql_where=text("cluster_id IS NULL"),
+        ),
+    )
+
 
 class Tag(Base):
     """標籤資料模型"""
@@ -52,5 +82,21 @@ class Idea(Base):
     content = Column(Text, nullable=False)
     news_source_1 = Column(String(500), nullable=True)
     news_source_2 = Column(String(500), nullable=True)
+    # 來源新聞 ID（舊資料依標題回填，找不到對應新聞時為 NULL）
+    news_id_1 = Column(Integer, ForeignKey("news.id"), nullable=True)
+    news_id_2 = Column(Integer, ForeignKey("news.id"), nullable=True)
     devil_audit = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    # 列表游標分頁依 (created_at, id) 排序
+    __table_args__ = (Index("ix_ideas_created_at_id", "created_at", "id"),)
+
+
+# 已生成過點子的新聞配對（無序，news_id_low < news_id_high），同一配對只記錄最早的點子
+idea_news_pairs = Table(
+    "idea_news_pairs",
+    Base.metadata,
+    Column("news_id_low", Integer, ForeignKey("news.id"), primary_key=True),
+    Column("news_id_high", Integer, ForeignKey("news.id"), primary_key=True),
+    Column("idea_id", Integer, ForeignKey("ideas.id"), nullable=False),
+)
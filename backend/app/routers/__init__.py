@@ -1,4 +1,4 @@
 # 路由模組
-from app.routers import ideas, news
+from app.routers import ideas, news, search, system
 
-__all__ = ["ideas", "news"]
+__all__ = ["ideas", "news", "search", "system"]
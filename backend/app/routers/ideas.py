@@ -1,20 +1,28 @@
 """點子生成 API 路由（使用 DI 服務）"""
-import random
+import json
+from typing import Any, AsyncIterator, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
-from app.core.dependencies import get_llm_client
+from app.core.dependencies import get_llm_client, get_similarity_service
+from app.core.exceptions import AppException, LLMRateLimitError
 from app.schemas import (
     IdeaResponse,
     IdeaListResponse,
     IdeaGenerateRequest,
     DevilAuditRequest,
     DevilAuditResponse,
+    SimilarIdeaItem,
+    SimilarIdeaResponse,
 )
 from app.services.idea_service import IdeaService
 from app.services.llm_client import VercelLLMClient
+from app.services.similarity_service import SimilarityService
+from app.services.tag_cooccurrence import get_tag_cooccurrence
+from app.services.vector_index import get_idea_index
 
 router = APIRouter(prefix="/ideas", tags=["ideas"])
 
@@ -24,19 +32,28 @@ def _get_idea_service(
     llm_client: VercelLLMClient = Depends(get_llm_client),
 ) -> IdeaService:
     """組裝 IdeaService（DI 入口）"""
-    return IdeaService(db=db, llm_client=llm_client)
+    return IdeaService(
+        db=db,
+        llm_client=llm_client,
+        cooccurrence=get_tag_cooccurrence(),
+        idea_index=get_idea_index(),
+    )
 
 
 @router.get("", response_model=IdeaListResponse)
 async def list_ideas(
-    skip: int = 0,
-    limit: int = 20,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     service: IdeaService = Depends(_get_idea_service),
 ):
-    """獲取所有點子列表"""
-    ideas = await service.get_all_ideas(skip=skip, limit=limit)
-    total = await service.get_ideas_count()
-    return IdeaListResponse(total=total, items=ideas)
+    """獲取所有點子列表
+
+    帶 cursor（上一頁的 next_cursor）時以 keyset 分頁並略過 total 計算；否則沿用 skip。
+    """
+    page = await service.get_all_ideas(skip=skip, limit=limit, cursor=cursor)
+    total = None if cursor else await service.get_ideas_count()
+    return IdeaListResponse(total=total, items=page.items, next_cursor=page.next_cursor)
 
 
 @router.get("/{idea_id}", response_model=IdeaResponse)
@@ -48,14 +65,11 @@ async def get_idea(
     return await service.get_idea_by_id(idea_id)
 
 
-@router.post("/generate", response_model=IdeaResponse)
-async def generate_idea(
-    request: IdeaGenerateRequest,
-    service: IdeaService = Depends(_get_idea_service),
-):
-    """生成新的商業構想
+async def _select_news_pair(request: IdeaGenerateRequest, service: IdeaService):
+    """依請求選取兩則新聞
 
-    可以指定 tag_ids 或 news_ids，若都不指定則隨機選取兩則新聞
+    可以指定 tag_ids 或 news_ids，若都不指定則依 pair_strategy 選取兩則新聞；
+    依標籤或策略選取時優先選還沒生成過點子的配對
     """
     news_a = None
     news_b = None
@@ -68,17 +82,58 @@ async def generate_idea(
     elif request.tag_ids:
         news_list = await service.get_news_by_tag_ids(request.tag_ids)
         if len(news_list) >= 2:
-            selected = random.sample(news_list, 2)
-            news_a, news_b = selected[0], selected[1]
+            news_a, news_b = await service.choose_news_pair(news_list)
 
-    # 若沒有指定，則隨機選取
+    # 若沒有指定，則依配對策略選取
     if not news_a or not news_b:
-        news_a, news_b = await service.get_random_news_pair()
+        news_a, news_b = await service.get_news_pair(request.pair_strategy)
+
+    return news_a, news_b
+
+
+@router.post("/generate", response_model=IdeaResponse)
+async def generate_idea(
+    request: IdeaGenerateRequest,
+    service: IdeaService = Depends(_get_idea_service),
+):
+    """生成新的商業構想
+
+    可以指定 tag_ids 或 news_ids，若都不指定則依 pair_strategy 選取兩則新聞：
+    complementary（主題相關但不同的新聞）、distant（標籤從未一起出現的新聞）或 random。
+    reuse_cached 時，這組新聞已生成過點子就直接回傳該點子。
+    """
+    news_a, news_b = await _select_news_pair(request, service)
+    if request.reuse_cached:
+        cached = await service.get_cached_idea(news_a, news_b)
+        if cached is not None:
+            return cached
 
     # 生成點子
     return await service.generate_idea(news_a, news_b)
 
 
+@router.post("/generate/stream")
+async def generate_idea_stream(
+    request: IdeaGenerateRequest,
+    http_request: Request,
+    service: IdeaService = Depends(_get_idea_service),
+):
+    """以 Server-Sent Events 串流生成商業構想
+
+    事件：delta（{"text"}）逐段輸出，done（完整 IdeaResponse）表示已寫入，
+    error（{"detail", "status_code"}）表示失敗。選取新聞的錯誤在串流開始前以一般 HTTP 錯誤回應。
+    reuse_cached 且這組新聞已生成過點子時，只送出該點子的 done 事件。
+    """
+    news_a, news_b = await _select_news_pair(request, service)
+    cached = await service.get_cached_idea(news_a, news_b) if request.reuse_cached else None
+    events = _cached_events(cached) if cached is not None else service.stream_idea(news_a, news_b)
+    return _sse_response(
+        http_request,
+        events,
+        lambda idea: IdeaResponse.model_validate(idea).model_dump(mode="json"),
+    )
+
+
 @router.post("/devil-audit", response_model=DevilAuditResponse)
 async def devil_audit(
     request: DevilAuditRequest,
@@ -92,6 +147,39 @@ async def devil_audit(
     )
 
 
+@router.post("/devil-audit/stream")
+async def devil_audit_stream(
+    request: DevilAuditRequest,
+    http_request: Request,
+    service: IdeaService = Depends(_get_idea_service),
+):
+    """以 Server-Sent Events 串流魔鬼審計（事件格式同 /generate/stream，done 為 DevilAuditResponse）"""
+    idea = await service.get_idea_by_id(request.idea_id)
+    events = service.stream_devil_audit(idea)
+    return _sse_response(
+        http_request,
+        events,
+        lambda audit: DevilAuditResponse(idea_id=request.idea_id, audit_questions=audit).model_dump(),
+    )
+
+
+@router.get("/{idea_id}/similar", response_model=SimilarIdeaResponse)
+async def get_similar_ideas(
+    idea_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    service: SimilarityService = Depends(get_similarity_service),
+):
+    """獲取語意相似的點子"""
+    similar = await service.similar_ideas(idea_id, limit=limit)
+    return SimilarIdeaResponse(
+        idea_id=idea_id,
+        items=[
+            SimilarIdeaItem(**IdeaResponse.model_validate(idea).model_dump(), score=score)
+            for idea, score in similar
+        ],
+    )
+
+
 @router.get("/{idea_id}/export")
 async def export_idea(
     idea_id: int,
@@ -104,3 +192,51 @@ async def export_idea(
         "format": "markdown",
         "content": markdown,
     }
+
+
+async def _cached_events(idea) -> AsyncIterator[tuple[str, Any]]:
+    """已快取點子的事件串流（只有 done）"""
+    yield "done", idea
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """格式化單一 SSE 事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _sse_response(
+    http_request: Request,
+    events: AsyncIterator[tuple[str, Any]],
+    serialize_done,
+) -> StreamingResponse:
+    """把服務層的 (事件, 資料) 串流轉成 SSE 回應
+
+    客戶端斷線時關閉服務層串流（連帶關閉上游 LLM 連線），不會寫入不完整的結果。
+    """
+    async def body():
+        try:
+            async for event, data in events:
+                if await http_request.is_disconnected():
+                    break
+                if event == "delta":
+                    yield _sse_event("delta", {"text": data})
+                else:
+                    yield _sse_event("done", serialize_done(data))
+        except AppException as e:
+            payload = {"detail": e.detail, "status_code": e.status_code}
+            if isinstance(e, LLMRateLimitError) and e.retry_after is not None:
+                payload["retry_after"] = e.retry_after
+            yield _sse_event("error", payload)
+        except Exception as e:
+            # 其他錯誤（例如寫入點子時的資料庫錯誤）也以 error 事件結束串流，客戶端才不會一直等待
+            print(f"[SSE] 串流失敗: {str(e)}")
+            yield _sse_event("error", {"detail": "伺服器內部錯誤", "status_code": 500})
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        # 避免反向代理緩衝而失去逐段輸出的效果
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,9 +1,12 @@
 """新聞 API 路由（使用 DI 服務）"""
-from fastapi import APIRouter, Depends
+from typing import Optional
 
-from app.schemas import NewsResponse, NewsListResponse, TagResponse
+from fastapi import APIRouter, Depends, Query
+
+from app.schemas import NewsResponse, NewsListResponse, SimilarNewsItem, SimilarNewsResponse, TagResponse
 from app.services.news_service import NewsService
-from app.core.dependencies import get_news_service
+from app.services.similarity_service import SimilarityService
+from app.core.dependencies import get_news_service, get_similarity_service
 from app.services.scheduler import fetch_rss_job, extract_tags_job
 
 router = APIRouter(prefix="/news", tags=["news"])
@@ -22,14 +25,18 @@ async def trigger_fetch():
 
 @router.get("", response_model=NewsListResponse)
 async def list_news(
-    skip: int = 0,
-    limit: int = 20,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     service: NewsService = Depends(get_news_service),
 ):
-    """獲取新聞列表"""
-    items = await service.get_news_list(skip=skip, limit=limit)
-    total = await service.get_news_count()
-    return NewsListResponse(total=total, items=items)
+    """獲取新聞列表
+
+    帶 cursor（上一頁的 next_cursor）時以 keyset 分頁並略過 total 計算；否則沿用 skip。
+    """
+    page = await service.get_news_list(skip=skip, limit=limit, cursor=cursor)
+    total = None if cursor else await service.get_news_count()
+    return NewsListResponse(total=total, items=page.items, next_cursor=page.next_cursor)
 
 
 @router.get("/random-pair")
@@ -46,16 +53,18 @@ async def get_random_news_pair(
 
 @router.get("/tags")
 async def list_tags(
-    skip: int = 0,
-    limit: int = 50,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
     service: NewsService = Depends(get_news_service),
 ):
-    """獲取所有標籤列表"""
-    tags = await service.get_tags_list(skip=skip, limit=limit)
-    total = await service.get_tags_count()
+    """獲取所有標籤列表（cursor 用法同新聞列表）"""
+    page = await service.get_tags_list(skip=skip, limit=limit, cursor=cursor)
+    total = None if cursor else await service.get_tags_count()
     return {
         "total": total,
-        "items": [TagResponse.model_validate(tag) for tag in tags],
+        "items": [TagResponse.model_validate(tag) for tag in page.items],
+        "next_cursor": page.next_cursor,
     }
 
 
@@ -67,3 +76,20 @@ async def get_news(
     """獲取單一新聞詳情"""
     news = await service.get_news_by_id(news_id)
     return news
+
+
+@router.get("/{news_id}/similar", response_model=SimilarNewsResponse)
+async def get_similar_news(
+    news_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    service: SimilarityService = Depends(get_similarity_service),
+):
+    """獲取語意相似的新聞（不含近似重複的群組成員）"""
+    similar = await service.similar_news(news_id, limit=limit)
+    return SimilarNewsResponse(
+        news_id=news_id,
+        items=[
+            SimilarNewsItem(**NewsResponse.model_validate(news).model_dump(), score=score)
+            for news, score in similar
+        ],
+    )
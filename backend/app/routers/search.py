@@ -0,0 +1,32 @@
+"""全文搜尋 API 路由（使用 DI 服務）"""
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from app.schemas import SearchHitResponse, SearchResponse
+from app.services.search_service import SearchService
+from app.core.dependencies import get_search_service
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    scope: Literal["news", "ideas"] = "news",
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    service: SearchService = Depends(get_search_service),
+):
+    """以關鍵字搜尋新聞或點子（空白分隔的關鍵字需全部符合）
+
+    通常依 BM25 相關度排序；命中過多或只有二字以下的關鍵字時改依新到舊排序（見 ranking）。
+    帶 cursor（上一頁的 next_cursor）取得下一頁。
+    """
+    page = await service.search(q, scope=scope, limit=limit, cursor=cursor)
+    return SearchResponse(
+        scope=scope,
+        ranking=page.ranking,
+        items=[SearchHitResponse.model_validate(hit) for hit in page.items],
+        next_cursor=page.next_cursor,
+    )
@@ -0,0 +1,25 @@
+"""系統狀態 API 路由"""
+from fastapi import APIRouter, Depends
+
+from app.core.dependencies import get_llm_client
+from app.schemas import SourceScheduleResponse, LLMCacheStatsResponse
+from app.services.llm_client import VercelLLMClient
+from app.services.scheduler import get_source_schedules
+
+router = APIRouter(prefix="/system", tags=["system"])
+
+
+@router.get("/sources", response_model=list[SourceScheduleResponse])
+async def list_source_schedules():
+    """獲取各 RSS 來源目前的輪詢間隔與下一次執行時間"""
+    return get_source_schedules()
+
+
+@router.get("/llm-cache", response_model=LLMCacheStatsResponse)
+async def get_llm_cache_stats(
+    llm_client: VercelLLMClient = Depends(get_llm_client),
+):
+    """獲取 LLM 回應快取的命中統計"""
+    if llm_client.cache is None:
+        return LLMCacheStatsResponse(enabled=False)
+    return LLMCacheStatsResponse(enabled=True, **llm_client.cache.get_stats())
@@ -5,6 +5,8 @@ from app.schemas.news import (
     NewsCreate,
     NewsResponse,
     NewsListResponse,
+    SimilarNewsItem,
+    SimilarNewsResponse,
 )
 from app.schemas.idea import (
     IdeaBase,
@@ -14,7 +16,11 @@ from app.schemas.idea import (
     IdeaGenerateRequest,
     DevilAuditRequest,
     DevilAuditResponse,
+    SimilarIdeaItem,
+    SimilarIdeaResponse,
 )
+from app.schemas.system import SourceScheduleResponse, LLMCacheStatsResponse
+from app.schemas.search import SearchHitResponse, SearchResponse
 
 __all__ = [
     "TagBase",
@@ -24,6 +30,8 @@ __all__ = [
     "NewsCreate",
     "NewsResponse",
     "NewsListResponse",
+    "SimilarNewsItem",
+    "SimilarNewsResponse",
     "IdeaBase",
     "IdeaCreate",
     "IdeaResponse",
@@ -31,4 +39,10 @@ __all__ = [
     "IdeaGenerateRequest",
     "DevilAuditRequest",
     "DevilAuditResponse",
+    "SimilarIdeaItem",
+    "SimilarIdeaResponse",
+    "SourceScheduleResponse",
+    "LLMCacheStatsResponse",
+    "SearchHitResponse",
+    "SearchResponse",
 ]
@@ -1,6 +1,6 @@
 """點子相關 Pydantic 資料結構"""
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import BaseModel, ConfigDict
 
 
@@ -21,22 +21,41 @@ class IdeaResponse(IdeaBase):
     id: int
     news_source_1: Optional[str] = None
     news_source_2: Optional[str] = None
+    news_id_1: Optional[int] = None
+    news_id_2: Optional[int] = None
     devil_audit: Optional[str] = None
     created_at: datetime
     
     model_config = ConfigDict(from_attributes=True)
 
 
+class SimilarIdeaItem(IdeaResponse):
+    """相似點子（score 為餘弦相似度）"""
+    score: float
+
+
+class SimilarIdeaResponse(BaseModel):
+    """相似點子回應（由最相似到最不相似）"""
+    idea_id: int
+    items: list[SimilarIdeaItem]
+
+
 class IdeaListResponse(BaseModel):
-    """點子列表回應"""
-    total: int
+    """點子列表回應（以游標翻頁時不計算 total）"""
+    total: Optional[int] = None
     items: list[IdeaResponse]
+    next_cursor: Optional[str] = None
 
 
 class IdeaGenerateRequest(BaseModel):
-    """點子生成請求"""
+    """點子生成請求（未指定 tag_ids 或 news_ids 時依 pair_strategy 選取新聞）
+
+    reuse_cached 時，選出的新聞配對若已生成過點子，直接回傳該點子而不呼叫 LLM。
+    """
     tag_ids: list[int] = []
     news_ids: list[int] = []
+    pair_strategy: Literal["complementary", "distant", "random"] = "random"
+    reuse_cached: bool = False
 
 
 class DevilAuditRequest(BaseModel):
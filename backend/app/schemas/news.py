@@ -24,12 +24,25 @@ class NewsResponse(NewsBase):
     id: int
     published_at: Optional[datetime] = None
     created_at: datetime
+    cluster_id: Optional[int] = None
     tags: list[TagResponse] = []
     
     model_config = ConfigDict(from_attributes=True)
 
 
+class SimilarNewsItem(NewsResponse):
+    """相似新聞（score 為餘弦相似度）"""
+    score: float
+
+
+class SimilarNewsResponse(BaseModel):
+    """相似新聞回應（由最相似到最不相似）"""
+    news_id: int
+    items: list[SimilarNewsItem]
+
+
 class NewsListResponse(BaseModel):
-    """新聞列表回應"""
-    total: int
+    """新聞列表回應（以游標翻頁時不計算 total）"""
+    total: Optional[int] = None
     items: list[NewsResponse]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,23 @@
+"""全文搜尋相關 Pydantic 資料結構"""
+from datetime import datetime
+from typing import Literal, Optional
+from pydantic import BaseModel, ConfigDict
+
+
+class SearchHitResponse(BaseModel):
+    """一筆搜尋結果（snippet 以 <mark> 標記命中的關鍵字，內文未經 HTML 跳脫）"""
+    id: int
+    title: str
+    snippet: str
+    score: float
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SearchResponse(BaseModel):
+    """搜尋回應（ranking 為 bm25 時依相關度、recent 時依新到舊排序；next_cursor 為 None 表示沒有下一頁）"""
+    scope: Literal["news", "ideas"]
+    ranking: Literal["bm25", "recent"]
+    items: list[SearchHitResponse]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,31 @@
+"""系統狀態相關 Pydantic 資料結構"""
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+
+class SourceScheduleResponse(BaseModel):
+    """RSS 來源輪詢狀態"""
+    source: str
+    interval_seconds: float
+    next_run_at: Optional[datetime] = None
+    last_polled_at: Optional[datetime] = None
+    last_status: str
+    last_new_articles: int
+    publish_rate_per_hour: Optional[float] = None
+    hint_seconds: Optional[float] = None
+    failures: int
+
+
+class LLMCacheStatsResponse(BaseModel):
+    """LLM 回應快取命中統計"""
+    enabled: bool
+    memory_hits: int = 0
+    db_hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    stores: int = 0
+    evictions: int = 0
+    errors: int = 0
+    hit_rate: float = 0.0
+    memory_entries: int = 0
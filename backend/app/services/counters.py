@@ -0,0 +1,81 @@
+"""資料表筆數計數器
+
+列表端點的 total 讀取 counters 表（主鍵查詢），不再每次執行 COUNT(*)。
+寫入路徑在新增資料的同一個交易中執行 increment()，交易回滾時計數一併回滾；
+UPDATE value = value + n 為單一原子語句，同時寫入也不會遺失更新。
+reconcile_counters() 定期以 COUNT(*) 校正漂移（例如繞過服務層直接寫入的資料）。
+"""
+from datetime import datetime
+
+from sqlalchemy import Update, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.engine import Connection
+
+from app.models.counter import Counter
+from app.models.news import News, Tag, Idea
+
+# 計數器名稱 → 計數的模型
+COUNTED_MODELS = {
+    "news": News,
+    "tags": Tag,
+    "ideas": Idea,
+}
+
+
+def increment(name: str, delta: int = 1) -> Update:
+    """遞增計數器的語句（由呼叫端在寫入資料的同一個交易中執行）"""
+    return (
+        update(Counter)
+        .where(Counter.name == name)
+        .values(value=Counter.value + delta, updated_at=datetime.utcnow())
+    )
+
+
+def count_stmt(name: str):
+    """計算實際筆數的語句"""
+    model = COUNTED_MODELS[name]
+    return select(func.count()).select_from(model)
+
+
+async def get_count(db: AsyncSession, name: str) -> int:
+    """讀取計數器；尚未建立時退回 COUNT(*)"""
+    value = (await db.execute(select(Counter.value).where(Counter.name == name))).scalar_one_or_none()
+    if value is None:
+        value = (await db.execute(count_stmt(name))).scalar_one()
+    return value
+
+
+def seed_counters(conn: Connection) -> None:
+    """以目前的實際筆數建立缺少的計數器（同步，供遷移使用）"""
+    existing = set(conn.execute(select(Counter.name)).scalars())
+    now = datetime.utcnow()
+    for name in COUNTED_MODELS:
+        if name not in existing:
+            conn.execute(
+                Counter.__table__.insert().values(
+                    name=name, value=conn.execute(count_stmt(name)).scalar_one(), updated_at=now
+                )
+            )
+
+
+async def reconcile_counters(db: AsyncSession) -> dict[str, int]:
+    """以 COUNT(*) 校正計數器，回傳各計數器的漂移量（實際 - 計數）
+
+    實際筆數與計數器值以同一個查詢讀取（同一份快照），再以 value = value + 漂移量 校正，
+    期間其他交易提交的遞增不會被覆蓋。
+    """
+    drift: dict[str, int] = {}
+    now = datetime.utcnow()
+    for name in COUNTED_MODELS:
+        stored_value = select(Counter.value).where(Counter.name == name).scalar_subquery()
+        actual, stored = (
+            await db.execute(select(count_stmt(name).scalar_subquery(), stored_value))
+        ).one()
+        if stored is None:
+            db.add(Counter(name=name, value=actual, updated_at=now))
+            drift[name] = actual
+        elif stored != actual:
+            await db.execute(increment(name, actual - stored))
+            drift[name] = actual - stored
+    await db.commit()
+    return drift
@@ -0,0 +1,61 @@
+"""本地文字向量（hashing vectorizer + 隨機投影，不呼叫外部服務）"""
+import math
+import zlib
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.services.simhash import tokenize
+
+
+class HashingEmbedder:
+    """把標題與內文轉為 L2 正規化的 float32 向量
+
+    斷詞沿用 SimHash 的規則（英文單字、中日韓文字 bigram），詞以 CRC32 雜湊到
+    2^HASH_BITS 個特徵（跨行程穩定），權重為 1 + log(tf)，標題詞權重加倍。
+    特徵再以稀疏隨機投影（Achlioptas：+1 / 0 / -1）降到 dim 維，餘弦相似度近似保留。
+    投影矩陣由固定種子產生，同一設定下每次啟動的向量都相同。
+    """
+
+    HASH_BITS = 16
+    TITLE_WEIGHT = 2
+    SEED = 20240601
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        rng = np.random.default_rng(self.SEED)
+        # 各 1/6 機率為 +1 / -1，其餘為 0
+        self._projection = rng.choice(
+            np.array([1, 0, -1], dtype=np.int8), size=(1 << self.HASH_BITS, dim), p=[1 / 6, 2 / 3, 1 / 6]
+        )
+
+    def embed(self, title: str, body: str | None = None) -> np.ndarray:
+        """單篇文字的向量（沒有任何詞時為零向量）"""
+        counts: Counter = Counter()
+        for token in tokenize(title):
+            counts[token] += self.TITLE_WEIGHT
+        counts.update(tokenize(body or ""))
+        if not counts:
+            return np.zeros(self.dim, dtype=np.float32)
+
+        mask = (1 << self.HASH_BITS) - 1
+        buckets = np.fromiter((zlib.crc32(token.encode()) & mask for token in counts), dtype=np.int64)
+        weights = np.fromiter((1 + math.log(count) for count in counts.values()), dtype=np.float32)
+        vector = weights @ self._projection[buckets]
+        norm = np.linalg.norm(vector)
+        return (vector / norm).astype(np.float32) if norm else vector.astype(np.float32)
+
+    def embed_many(self, texts: list[tuple[str, str | None]]) -> np.ndarray:
+        """多篇 (標題, 內文) 的向量矩陣"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, (title, body) in enumerate(texts):
+            matrix[row] = self.embed(title, body)
+        return matrix
+
+
+@lru_cache(maxsize=1)
+def get_embedder() -> HashingEmbedder:
+    """取得文字向量器（單例）"""
+    return HashingEmbedder(get_settings().vector_dim)
@@ -0,0 +1,126 @@
+"""RSS 下載服務（共用連線池的非同步 HTTP 客戶端）"""
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional
+
+import httpx
+
+from app.core.config import get_settings
+
+
+@dataclass
+class FeedDownload:
+    """單一來源的下載結果"""
+    source: dict
+    status_code: int
+    content: bytes = b""
+    headers: httpx.Headers = field(default_factory=httpx.Headers)
+    url: str = ""
+    elapsed: float = 0.0
+
+    @property
+    def not_modified(self) -> bool:
+        """伺服器回應 304（內容未變更）"""
+        return self.status_code == 304
+
+    @property
+    def max_age(self) -> Optional[int]:
+        """Cache-Control 的 max-age（秒）"""
+        for directive in self.headers.get("cache-control", "").split(","):
+            name, _, value = directive.strip().partition("=")
+            if name.lower() == "max-age":
+                try:
+                    return max(int(value.strip('"')), 0)
+                except ValueError:
+                    return None
+        return None
+
+    @property
+    def content_hash(self) -> str:
+        """內容的 SHA-256 雜湊"""
+        return hashlib.sha256(self.content).hexdigest()
+
+
+class FeedDownloader:
+    """RSS 下載器
+
+    所有來源共用同一個 httpx.AsyncClient（連線池 + keep-alive），
+    以全域 semaphore 限制同時下載數；每個來源可在 RSS_SOURCES 中以
+    connect_timeout / read_timeout 覆寫預設逾時，避免單一慢速來源拖垮整輪抓取。
+    """
+
+    USER_AGENT = "IdeaGeneration/0.1 (+https://github.com/colaman7014/IdeaGeneration)"
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.settings = get_settings()
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """取得共用 HTTP 客戶端（延遲建立）"""
+        if self._client is None or self._client.is_closed:
+            max_concurrency = self.settings.rss_max_concurrency
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                limits=httpx.Limits(
+                    max_connections=max_concurrency,
+                    max_keepalive_connections=max_concurrency,
+                ),
+                timeout=self._timeout_for({}),
+                headers={"User-Agent": self.USER_AGENT},
+                follow_redirects=True,
+            )
+        return self._client
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """取得全域併發上限"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.settings.rss_max_concurrency)
+        return self._semaphore
+
+    def _timeout_for(self, source: dict) -> httpx.Timeout:
+        """組合單一來源的逾時設定（來源設定優先於全域設定）"""
+        connect = source.get("connect_timeout", self.settings.rss_connect_timeout)
+        read = source.get("read_timeout", self.settings.rss_read_timeout)
+        return httpx.Timeout(connect=connect, read=read, write=connect, pool=read)
+
+    async def fetch(self, source: dict, headers: Optional[dict] = None) -> FeedDownload:
+        """下載單一來源，回傳原始 bytes（不在此解析）
+
+        headers 可帶入 If-None-Match / If-Modified-Since，304 回應視為正常結果。
+        """
+        client = self._get_client()
+        async with self._get_semaphore():
+            started = time.perf_counter()
+            response = await client.get(
+                source["url"],
+                headers=headers,
+                timeout=self._timeout_for(source),
+            )
+            if response.status_code != 304:
+                response.raise_for_status()
+            return FeedDownload(
+                source=source,
+                status_code=response.status_code,
+                content=response.content,
+                headers=response.headers,
+                url=str(response.url),
+                elapsed=time.perf_counter() - started,
+            )
+
+    async def aclose(self) -> None:
+        """關閉連線池"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._semaphore = None
+
+
+@lru_cache(maxsize=1)
+def get_feed_downloader() -> FeedDownloader:
+    """取得 RSS 下載器（單例）"""
+    return FeedDownloader()
@@ -0,0 +1,116 @@
+"""RSS 解析服務（執行緒 / 行程池兩種模式）"""
+import asyncio
+import calendar
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+
+import feedparser
+
+from app.core.config import get_settings
+
+
+class FeedEntry(NamedTuple):
+    """精簡的 RSS 條目（可 pickle，供行程池回傳）"""
+    title: str
+    link: str
+    summary: str
+    source: str
+    published_ts: Optional[float]  # UTC epoch 秒
+
+
+class ParsedFeed(NamedTuple):
+    """解析結果：條目與頻道層級的輪詢提示"""
+    entries: list[FeedEntry]
+    ttl_minutes: Optional[int]  # <ttl>，建議的最短輪詢間隔
+
+
+def parse_feed(content: bytes, source_name: str, url: str = "") -> ParsedFeed:
+    """解析 RSS 內容為精簡條目（模組層級函式，可在子行程執行）"""
+    feed = feedparser.parse(content, response_headers={"content-location": url})
+
+    if feed.bozo and not feed.entries:
+        raise ValueError(f"無法解析 RSS: {feed.bozo_exception}")
+
+    entries = [
+        FeedEntry(
+            title=entry.get("title", "無標題"),
+            link=entry.get("link", ""),
+            summary=entry.get("summary", entry.get("description", "")),
+            source=source_name,
+            published_ts=_published_timestamp(entry),
+        )
+        for entry in feed.entries
+    ]
+    return ParsedFeed(entries=entries, ttl_minutes=_ttl_minutes(feed.feed))
+
+
+def _published_timestamp(entry: dict) -> Optional[float]:
+    """解析 RSS 條目的發布時間（feedparser 的 struct_time 皆為 UTC）"""
+    published = entry.get("published_parsed") or entry.get("updated_parsed")
+
+    if published:
+        try:
+            return float(calendar.timegm(published))
+        except (TypeError, ValueError, OverflowError):
+            pass
+
+    return None
+
+
+def _ttl_minutes(channel: dict) -> Optional[int]:
+    """解析頻道的 <ttl>（分鐘）"""
+    try:
+        ttl = int(channel.get("ttl", ""))
+    except (TypeError, ValueError):
+        return None
+    return ttl if ttl > 0 else None
+
+
+# 全域行程池（延遲建立）
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """取得解析用行程池（spawn 模式，避免 fork 帶入事件迴圈與執行緒狀態）"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=get_settings().rss_parse_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def shutdown_parse_pool() -> None:
+    """關閉解析用行程池"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+class FeedParser:
+    """RSS 解析器
+
+    feedparser 為純 Python 且吃 CPU；thread 模式在 asyncio.to_thread 中解析，
+    大型 feed 仍會佔住 GIL 拖慢同一事件迴圈上的 API。
+    process 模式改在有上限的 ProcessPoolExecutor 中解析，只回傳精簡條目。
+    """
+
+    MODES = ("thread", "process")
+
+    def __init__(self, mode: Optional[str] = None):
+        mode = mode or get_settings().rss_parse_mode
+        if mode not in self.MODES:
+            raise ValueError(f"不支援的解析模式: {mode}")
+        self.mode = mode
+
+    async def parse(self, content: bytes, source_name: str, url: str = "") -> ParsedFeed:
+        """解析下載完成的 RSS 內容"""
+        if self.mode == "process":
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                _get_process_pool(), parse_feed, content, source_name, url
+            )
+        return await asyncio.to_thread(parse_feed, content, source_name, url)
@@ -1,13 +1,24 @@
 """點子生成服務（非同步版本）"""
+import asyncio
 import random
-from typing import Optional
+from itertools import combinations
+from typing import Any, AsyncIterator, Optional
 
-from sqlalchemy import select, func
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import selectinload
 
-from app.models.news import News, Tag, Idea
-from app.core.exceptions import NotFoundError, InsufficientDataError, LLMError, LLMRateLimitError
+from app.core.pagination import Page, paginate
+from app.models.news import News, Idea
+from app.core.database import AsyncSessionLocal
+from app.core.exceptions import NotFoundError, LLMError, LLMRateLimitError
+from app.services.counters import get_count, increment
+from app.services.embedding import get_embedder
+from app.services.news_sampler import sample_news_pair
+from app.services.news_service import load_news_by_tag_ids
+from app.services.pair_history import PAIR_CANDIDATES, find_pair_idea, first_unused_pair, record_pair
+from app.services.tag_cooccurrence import PairStrategy, TagCooccurrence
+from app.services.vector_index import VectorIndex
 from app.services.llm_client import (
     VercelLLMClient,
     IDEA_SYNTHESIS_PROMPT,
@@ -18,38 +29,58 @@ from app.services.llm_client import (
 class IdeaService:
     """點子生成服務（非同步 DB + DI）"""
 
-    def __init__(self, db: AsyncSession, llm_client: VercelLLMClient):
+    def __init__(
+        self,
+        db: AsyncSession,
+        llm_client: VercelLLMClient,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        cooccurrence: Optional[TagCooccurrence] = None,
+        idea_index: Optional[VectorIndex] = None,
+    ):
         self.db = db
         self.llm_client = llm_client
+        # 串流端點於回應結束後寫入時使用
+        self.session_factory = session_factory
+        self.cooccurrence = cooccurrence
+        # 注入時，新點子提交後寫入語意向量
+        self.idea_index = idea_index
 
     async def get_random_news_pair(self) -> tuple[News, News]:
-        """隨機選取兩則帶標籤的新聞"""
-        stmt = (
-            select(News)
-            .where(News.tags.any())
-            .options(selectinload(News.tags))
-        )
-        result = await self.db.execute(stmt)
-        news_with_tags = list(result.scalars().all())
-
-        if len(news_with_tags) < 2:
-            raise InsufficientDataError("資料庫中沒有足夠的新聞（需要至少 2 則帶標籤的新聞）")
-
-        selected = random.sample(news_with_tags, 2)
-        return selected[0], selected[1]
+        """隨機選取兩則帶標籤的新聞（排除近似重複的群組成員，優先選還沒生成過點子的配對）"""
+        return await sample_news_pair(self.db)
+
+    async def get_news_pair(self, strategy: PairStrategy = "random") -> tuple[News, News]:
+        """依配對策略從標籤共現矩陣選取兩則新聞，只以主鍵載入選中的兩筆
+
+        一次挑出 PAIR_CANDIDATES 組候選，排除已生成過點子的配對；
+        未注入共現矩陣、矩陣中的新聞不足或候選都已用過時，改為隨機取樣。
+        """
+        pair = None
+        if self.cooccurrence is not None:
+            candidates = [self.cooccurrence.pick_pair(strategy) for _ in range(PAIR_CANDIDATES)]
+            if candidates[0] is not None:
+                pair = await first_unused_pair(self.db, candidates)
+        if pair is not None:
+            by_id = {news.id: news for news in await self.get_news_by_ids(list(pair))}
+            if len(by_id) == 2:
+                return by_id[pair[0]], by_id[pair[1]]
+        return await self.get_random_news_pair()
+
+    async def choose_news_pair(self, news_list: list[News]) -> tuple[News, News]:
+        """從至少兩則候選新聞中隨機挑兩則，優先選還沒生成過點子的配對"""
+        shuffled = random.sample(news_list, min(len(news_list), PAIR_CANDIDATES))
+        by_id = {news.id: news for news in shuffled}
+        pairs = [(a.id, b.id) for a, b in combinations(shuffled, 2)]
+        pair = await first_unused_pair(self.db, pairs) or pairs[0]
+        return by_id[pair[0]], by_id[pair[1]]
+
+    async def get_cached_idea(self, news_a: News, news_b: News) -> Optional[Idea]:
+        """這組新聞（不分順序）已生成過的點子，沒有時回傳 None"""
+        return await find_pair_idea(self.db, news_a.id, news_b.id)
 
     async def get_news_by_tag_ids(self, tag_ids: list[int]) -> list[News]:
-        """根據標籤 ID 獲取新聞"""
-        if not tag_ids:
-            return []
-
-        stmt = (
-            select(News)
-            .where(News.tags.any(Tag.id.in_(tag_ids)))
-            .options(selectinload(News.tags))
-        )
-        result = await self.db.execute(stmt)
-        return list(result.scalars().all())
+        """根據標籤 ID 獲取新聞（排除近似重複的群組成員，供配對取樣）"""
+        return await load_news_by_tag_ids(self.db, tag_ids, News.cluster_id.is_(None))
 
     async def get_news_by_ids(self, news_ids: list[int]) -> list[News]:
         """根據新聞 ID 獲取新聞"""
@@ -70,17 +101,7 @@ class IdeaService:
         news_b: News,
     ) -> Idea:
         """從兩則新聞生成商業構想"""
-        # 準備標籤字串
-        tags_a = ", ".join([tag.name for tag in news_a.tags])
-        tags_b = ", ".join([tag.name for tag in news_b.tags])
-
-        # 組合 prompt
-        prompt = IDEA_SYNTHESIS_PROMPT.format(
-            news_a_title=news_a.title,
-            tags_a=tags_a,
-            news_b_title=news_b.title,
-            tags_b=tags_b,
-        )
+        prompt = self._build_idea_prompt(news_a, news_b)
 
         # 呼叫 LLM
         try:
@@ -88,33 +109,106 @@ class IdeaService:
                 prompt=prompt,
                 max_tokens=800,
                 temperature=0.8,
+                prompt_type="idea",
+                use_cache=False,
             )
+        except LLMRateLimitError:
+            # 重試用盡仍被限流，保留 retry_after 交給例外處理器回應
+            raise
         except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "rate_limit" in error_msg:
-                raise LLMRateLimitError()
-            raise LLMError(f"點子生成失敗: {error_msg}")
+            raise LLMError(f"點子生成失敗: {str(e)}")
+
+        if not result:
+            raise LLMError("點子生成失敗，請稍後再試")
 
+        return await self._save_idea(self.db, result, news_a.title, news_b.title, news_a.id, news_b.id)
+
+    async def stream_idea(
+        self,
+        news_a: News,
+        news_b: News,
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """串流生成商業構想
+
+        依序產生 ("delta", 文字片段)，完整結束後寫入點子並產生 ("done", Idea)；
+        串流中途被關閉（客戶端斷線）時不寫入任何記錄。
+        寫入改用獨立的短期 Session，因為請求範圍的 Session 可能在串流開始前就已關閉。
+        """
+        prompt = self._build_idea_prompt(news_a, news_b)
+        title_a, title_b = news_a.title, news_b.title
+        id_a, id_b = news_a.id, news_b.id
+
+        chunks = []
+        async for delta in self._stream_completion(
+            "點子生成失敗",
+            prompt=prompt,
+            max_tokens=800,
+            temperature=0.8,
+            prompt_type="idea",
+            use_cache=False,
+        ):
+            chunks.append(delta)
+            yield "delta", delta
+
+        result = "".join(chunks)
         if not result:
             raise LLMError("點子生成失敗，請稍後再試")
 
-        # 解析結果
+        async with self.session_factory() as db:
+            idea = await self._save_idea(db, result, title_a, title_b, id_a, id_b)
+        yield "done", idea
+
+    def _build_idea_prompt(self, news_a: News, news_b: News) -> str:
+        """組合點子生成 prompt"""
+        # 準備標籤字串
+        tags_a = ", ".join([tag.name for tag in news_a.tags])
+        tags_b = ", ".join([tag.name for tag in news_b.tags])
+
+        return IDEA_SYNTHESIS_PROMPT.format(
+            news_a_title=news_a.title,
+            tags_a=tags_a,
+            news_b_title=news_b.title,
+            tags_b=tags_b,
+        )
+
+    async def _save_idea(
+        self,
+        db: AsyncSession,
+        result: str,
+        news_source_1: str,
+        news_source_2: str,
+        news_id_1: Optional[int] = None,
+        news_id_2: Optional[int] = None,
+    ) -> Idea:
+        """解析 LLM 結果並建立 Idea 記錄，同一交易中記錄來源新聞配對"""
         parsed = self._parse_idea_result(result)
 
-        # 建立 Idea 記錄
         idea = Idea(
             title=parsed.get("title", "未命名構想"),
             content=result,
-            news_source_1=news_a.title,
-            news_source_2=news_b.title,
+            news_source_1=news_source_1,
+            news_source_2=news_source_2,
+            news_id_1=news_id_1,
+            news_id_2=news_id_2,
         )
 
-        self.db.add(idea)
-        await self.db.commit()
-        await self.db.refresh(idea)
+        db.add(idea)
+        if news_id_1 is not None and news_id_2 is not None and news_id_1 != news_id_2:
+            await db.flush()
+            await db.execute(record_pair(db, news_id_1, news_id_2, idea.id))
+        await db.execute(increment("ideas"))
+        await db.commit()
+        await db.refresh(idea)
+        if self.idea_index is not None:
+            # 向量計算與索引寫入（可能延伸檔案或重建分區）在執行緒中進行，不卡住事件迴圈
+            await asyncio.to_thread(self._index_idea, idea.id, idea.title, idea.content)
 
         return idea
 
+    def _index_idea(self, idea_id: int, title: str, content: str) -> None:
+        """寫入點子的語意向量"""
+        self.idea_index.add(idea_id, get_embedder().embed(title, content))
+
     async def generate_devil_audit(self, idea_id: int) -> str:
         """對點子進行魔鬼審計"""
         idea = await self.get_idea_by_id(idea_id)
@@ -128,12 +222,13 @@ class IdeaService:
                 prompt=prompt,
                 max_tokens=500,
                 temperature=0.7,
+                prompt_type="devil_audit",
             )
+        except LLMRateLimitError:
+            # 重試用盡仍被限流，保留 retry_after 交給例外處理器回應
+            raise
         except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "rate_limit" in error_msg:
-                raise LLMRateLimitError()
-            raise LLMError(f"魔鬼審計失敗: {error_msg}")
+            raise LLMError(f"魔鬼審計失敗: {str(e)}")
 
         if not result:
             raise LLMError("魔鬼審計失敗，請稍後再試")
@@ -145,6 +240,47 @@ class IdeaService:
 
         return result
 
+    async def stream_devil_audit(self, idea: Idea) -> AsyncIterator[tuple[str, Any]]:
+        """串流魔鬼審計
+
+        與 stream_idea 相同：產生 ("delta", 文字片段)，完整結束後才寫回點子並產生 ("done", 審計內容)。
+        """
+        idea_id = idea.id
+        prompt = DEVIL_AUDIT_PROMPT.format(idea_content=idea.content)
+
+        chunks = []
+        async for delta in self._stream_completion(
+            "魔鬼審計失敗",
+            prompt=prompt,
+            max_tokens=500,
+            temperature=0.7,
+            prompt_type="devil_audit",
+        ):
+            chunks.append(delta)
+            yield "delta", delta
+
+        result = "".join(chunks)
+        if not result:
+            raise LLMError("魔鬼審計失敗，請稍後再試")
+
+        async with self.session_factory() as db:
+            stored = await db.get(Idea, idea_id)
+            if stored is None:
+                raise NotFoundError("點子不存在")
+            stored.devil_audit = result
+            await db.commit()
+        yield "done", result
+
+    async def _stream_completion(self, error_label: str, **kwargs) -> AsyncIterator[str]:
+        """轉送 LLM 串流，並把非限流錯誤包裝成 LLMError"""
+        try:
+            async for delta in self.llm_client.stream(**kwargs):
+                yield delta
+        except LLMRateLimitError:
+            raise
+        except Exception as e:
+            raise LLMError(f"{error_label}: {str(e)}")
+
     def _parse_idea_result(self, result: str) -> dict:
         """解析 LLM 回傳的點子結果"""
         parsed = {}
@@ -176,22 +312,18 @@ class IdeaService:
 
         return idea
 
-    async def get_all_ideas(self, skip: int = 0, limit: int = 20) -> list[Idea]:
-        """獲取所有點子"""
-        stmt = (
-            select(Idea)
-            .order_by(Idea.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-        )
-        result = await self.db.execute(stmt)
-        return list(result.scalars().all())
+    async def get_all_ideas(
+        self,
+        skip: int = 0,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Page:
+        """獲取所有點子（依 (created_at, id) 由新到舊，有游標時以 keyset 分頁）"""
+        return await paginate(self.db, select(Idea), (Idea.created_at, Idea.id), limit, cursor, skip)
 
     async def get_ideas_count(self) -> int:
-        """獲取點子總數"""
-        stmt = select(func.count(Idea.id))
-        result = await self.db.execute(stmt)
-        return result.scalar_one()
+        """獲取點子總數（讀取計數器）"""
+        return await get_count(self.db, "ideas")
 
     async def export_idea_markdown(self, idea_id: int) -> str:
         """匯出點子為 Obsidian Markdown 格式"""
@@ -0,0 +1,173 @@
+"""LLM 回應快取服務（記憶體 LRU + SQLite 兩層）"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal, dialect_insert
+from app.models.llm_cache import LLMCacheEntry
+
+
+class LLMCache:
+    """LLM 回應快取
+
+    鍵為 (model, prompt, temperature, max_tokens) 的 SHA-256。
+    第一層為行程內 LRU，第二層為資料庫（跨重啟保留），兩層皆依 prompt 類型設定 TTL；
+    資料庫層超過上限時淘汰最久未使用的項目。資料庫層失敗時僅略過，不影響 LLM 呼叫。
+
+    資料庫層命中只在最後存取時間超過 touch_interval 時才寫回，多數命中是純讀取、不佔用寫入連線；
+    淘汰（刪除過期 + COUNT）每 evict_every 次寫入才執行一次，筆數最多暫時超過上限 evict_every - 1 筆。
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal):
+        settings = get_settings()
+        self._session_factory = session_factory
+        self.memory_size = settings.llm_cache_memory_size
+        self.max_entries = settings.llm_cache_max_entries
+        self.evict_every = settings.llm_cache_evict_every
+        self.touch_interval = timedelta(seconds=settings.llm_cache_touch_interval)
+        self._sets_since_evict = 0
+        self.ttls = {
+            "tags": settings.llm_cache_ttl_tags,
+            "devil_audit": settings.llm_cache_ttl_devil_audit,
+            "default": settings.llm_cache_ttl_default,
+        }
+        self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self.stats = {
+            "memory_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "stores": 0,
+            "evictions": 0,
+            "errors": 0,
+        }
+
+    @staticmethod
+    def make_key(model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        """計算內容定址的快取鍵"""
+        raw = json.dumps([model, prompt, temperature, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def ttl_for(self, prompt_type: str) -> int:
+        """取得 prompt 類型的 TTL（秒）"""
+        return self.ttls.get(prompt_type, self.ttls["default"])
+
+    async def get(self, key: str) -> Optional[str]:
+        """查詢快取（先記憶體後資料庫）"""
+        cached = self._memory.get(key)
+        if cached is not None:
+            value, expires_at = cached
+            if expires_at > time.time():
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return value
+            del self._memory[key]
+
+        try:
+            value, expires_at = await self._get_from_db(key)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[LLM 快取] 讀取失敗: {str(e)}")
+            value = None
+
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["db_hits"] += 1
+        self._remember(key, value, expires_at.timestamp())
+        return value
+
+    async def set(self, key: str, value: str, prompt_type: str) -> None:
+        """寫入快取"""
+        ttl = self.ttl_for(prompt_type)
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+        self._remember(key, value, time.time() + ttl)
+        self.stats["stores"] += 1
+
+        try:
+            await self._save_to_db(key, value, prompt_type, expires_at)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[LLM 快取] 寫入失敗: {str(e)}")
+
+    def record_bypass(self) -> None:
+        """記錄明確略過快取的呼叫"""
+        self.stats["bypassed"] += 1
+
+    def get_stats(self) -> dict:
+        """取得命中統計"""
+        hits = self.stats["memory_hits"] + self.stats["db_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        """寫入記憶體 LRU"""
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    async def _get_from_db(self, key: str) -> tuple[Optional[str], Optional[datetime]]:
+        now = datetime.utcnow()
+        async with self._session_factory() as session:
+            entry = await session.get(LLMCacheEntry, key)
+            if entry is None or entry.expires_at <= now:
+                return None, None
+            if entry.last_accessed_at is None or now - entry.last_accessed_at >= self.touch_interval:
+                entry.last_accessed_at = now
+                await session.commit()
+            return entry.response, entry.expires_at
+
+    async def _save_to_db(self, key: str, value: str, prompt_type: str, expires_at: datetime) -> None:
+        now = datetime.utcnow()
+        async with self._session_factory() as session:
+            stmt = dialect_insert(session, LLMCacheEntry).values(
+                key=key,
+                prompt_type=prompt_type,
+                response=value,
+                created_at=now,
+                expires_at=expires_at,
+                last_accessed_at=now,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["key"],
+                set_={
+                    "response": stmt.excluded.response,
+                    "expires_at": stmt.excluded.expires_at,
+                    "last_accessed_at": stmt.excluded.last_accessed_at,
+                },
+            )
+            await session.execute(stmt)
+            self._sets_since_evict += 1
+            if self._sets_since_evict >= self.evict_every:
+                self._sets_since_evict = 0
+                await self._evict(session, now)
+            await session.commit()
+
+    async def _evict(self, session: AsyncSession, now: datetime) -> None:
+        """刪除過期項目，並在超過上限時淘汰最久未使用者"""
+        expired = await session.execute(
+            delete(LLMCacheEntry).where(LLMCacheEntry.expires_at <= now)
+        )
+        count = (await session.execute(select(func.count(LLMCacheEntry.key)))).scalar_one()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            oldest = (
+                select(LLMCacheEntry.key)
+                .order_by(LLMCacheEntry.last_accessed_at)
+                .limit(overflow)
+            )
+            await session.execute(delete(LLMCacheEntry).where(LLMCacheEntry.key.in_(oldest)))
+        self.stats["evictions"] += max(expired.rowcount, 0) + max(overflow, 0)
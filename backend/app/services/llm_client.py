@@ -1,60 +1,256 @@
 """Vercel API 客戶端服務"""
+import asyncio
+import importlib.util
+import json
+import re
 import httpx
-from typing import Optional
+from contextlib import AsyncExitStack
+from typing import AsyncIterator, Optional
 
 from app.core.config import get_settings
+from app.core.exceptions import LLMRateLimitError
+from app.services.llm_cache import LLMCache
+from app.services.rate_limiter import RateLimiter, estimate_tokens, parse_retry_after
 
 
 class VercelLLMClient:
-    """Vercel API LLM 客戶端"""
+    """Vercel API LLM 客戶端
+
+    持有一個長期存在的 httpx.AsyncClient（連線池 + keep-alive，可用時啟用 HTTP/2），
+    避免每次呼叫都重新進行 TCP / TLS 交握；由應用程式 lifespan 負責開啟與關閉。
+    注入 LLMCache 時，相同 (model, prompt, temperature, max_tokens) 的呼叫直接回傳快取結果。
+    注入 RateLimiter 時，每次請求先取得並行名額與 RPM / TPM 額度；429 依 Retry-After
+    暫停後重試，重試用盡才拋出 LLMRateLimitError。
+    """
     
     # Vercel AI Gateway 端點（正確端點）
     BASE_URL = "https://ai-gateway.vercel.sh/v1"
     
-    def __init__(self):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[LLMCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
         self.settings = get_settings()
         self.api_key = self.settings.vercel_api_key
+        self.base_url = base_url or self.BASE_URL
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        # 實際送往 gateway 的請求與 token 用量（不含快取命中）
+        self.usage = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """取得共用 HTTP 客戶端（延遲建立）"""
+        if self._client is None or self._client.is_closed:
+            settings = self.settings
+            # HTTP/2 需要 h2 套件，未安裝時退回 HTTP/1.1 keep-alive
+            http2 = settings.llm_http2 and importlib.util.find_spec("h2") is not None
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=http2,
+                transport=self._transport,
+                limits=httpx.Limits(
+                    max_connections=settings.llm_max_connections,
+                    max_keepalive_connections=settings.llm_max_keepalive_connections,
+                    keepalive_expiry=settings.llm_keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(
+                    connect=settings.llm_connect_timeout,
+                    read=settings.llm_read_timeout,
+                    write=settings.llm_connect_timeout,
+                    pool=settings.llm_connect_timeout,
+                ),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+            )
+        return self._client
+
+    async def open(self) -> None:
+        """建立連線池（應用啟動時呼叫）"""
+        self._get_client()
+
+    async def aclose(self) -> None:
+        """關閉連線池（應用關閉時呼叫）"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
     
     async def complete(
         self,
         prompt: str,
         model: str = "openai/gpt-4o-mini",
         max_tokens: int = 1000,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        prompt_type: str = "default",
+        use_cache: bool = True,
+        background: bool = False,
     ) -> Optional[str]:
-        """呼叫 Vercel API 完成文字生成"""
+        """呼叫 Vercel API 完成文字生成
+
+        prompt_type 決定快取 TTL；取樣性質的呼叫（如點子生成）應傳入 use_cache=False。
+        background 表示可延後的批次呼叫（如標籤提取），限流時讓互動呼叫優先。
+        """
+        cache_key = None
+        if self.cache is not None:
+            if use_cache:
+                cache_key = self.cache.make_key(model, prompt, temperature, max_tokens)
+                cached = await self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            else:
+                self.cache.record_bypass()
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_tokens,
+            "temperature": temperature
         }
         
+        content = await self._post_with_retry(payload, estimate_tokens(prompt, max_tokens), background)
+        
+        if cache_key is not None and content:
+            await self.cache.set(cache_key, content, prompt_type)
+        return content
+    
+    async def stream(
+        self,
+        prompt: str,
+        model: str = "openai/gpt-4o-mini",
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        prompt_type: str = "default",
+        use_cache: bool = True,
+    ) -> AsyncIterator[str]:
+        """以 gateway 的 stream 模式逐段產生回應文字
+
+        快取命中時一次產生整段結果；完整串流結束後才寫入快取，中途關閉的串流不會被快取。
+        429 只在尚未產生任何內容前重試，之後的錯誤直接拋出。
+        """
+        cache_key = None
+        if self.cache is not None:
+            if use_cache:
+                cache_key = self.cache.make_key(model, prompt, temperature, max_tokens)
+                cached = await self.cache.get(cache_key)
+                if cached is not None:
+                    yield cached
+                    return
+            else:
+                self.cache.record_bypass()
+        
         payload = {
             "model": model,
             "messages": [
                 {"role": "user", "content": prompt}
             ],
             "max_tokens": max_tokens,
-            "temperature": temperature
+            "temperature": temperature,
+            "stream": True,
+            "stream_options": {"include_usage": True},
         }
+        estimated_tokens = estimate_tokens(prompt, max_tokens)
+        max_retries = self.settings.llm_max_retries
+        chunks: list[str] = []
+        
+        for attempt in range(max_retries + 1):
+            async with AsyncExitStack() as stack:
+                if self.rate_limiter is not None:
+                    await stack.enter_async_context(self.rate_limiter.slot(estimated_tokens))
+                try:
+                    response = await stack.enter_async_context(
+                        self._get_client().stream("POST", "/chat/completions", json=payload)
+                    )
+                    
+                    if response.status_code == 429:
+                        retry_after = parse_retry_after(response.headers.get("retry-after"))
+                        if self.rate_limiter is not None:
+                            retry_after = self.rate_limiter.record_rate_limited(retry_after)
+                        if attempt == max_retries:
+                            raise LLMRateLimitError(retry_after=retry_after)
+                        if self.rate_limiter is None:
+                            await asyncio.sleep(retry_after or self.settings.llm_backoff_base * 2 ** attempt)
+                        continue
+                    
+                    if response.is_error:
+                        await response.aread()
+                        response.raise_for_status()
+                    
+                    usage: dict = {}
+                    async for line in response.aiter_lines():
+                        delta, chunk_usage = parse_stream_line(line)
+                        if chunk_usage:
+                            usage = chunk_usage
+                        if delta:
+                            chunks.append(delta)
+                            yield delta
+                    
+                except httpx.HTTPStatusError as e:
+                    raise Exception(f"Vercel API 錯誤: {e.response.status_code} - {e.response.text}")
+                except httpx.RequestError as e:
+                    raise Exception(f"網路請求錯誤: {str(e)}")
+                
+                self._record_usage(usage)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.record_success()
+                    self.rate_limiter.settle(estimated_tokens, usage.get("total_tokens"))
+                break
         
-        async with httpx.AsyncClient() as client:
+        content = "".join(chunks)
+        if cache_key is not None and content:
+            await self.cache.set(cache_key, content, prompt_type)
+    
+    async def _post_with_retry(self, payload: dict, estimated_tokens: int, background: bool = False) -> str:
+        """送出請求；429 時依 Retry-After（或指數退避）暫停後重試"""
+        max_retries = self.settings.llm_max_retries
+        for attempt in range(max_retries + 1):
             try:
-                response = await client.post(
-                    f"{self.BASE_URL}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=30.0
-                )
-                response.raise_for_status()
+                if self.rate_limiter is not None:
+                    async with self.rate_limiter.slot(estimated_tokens, background):
+                        response = await self._get_client().post("/chat/completions", json=payload)
+                else:
+                    response = await self._get_client().post("/chat/completions", json=payload)
                 
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get("retry-after"))
+                    if self.rate_limiter is not None:
+                        retry_after = self.rate_limiter.record_rate_limited(retry_after)
+                    if attempt == max_retries:
+                        raise LLMRateLimitError(retry_after=retry_after)
+                    if self.rate_limiter is None:
+                        # 未設定限流器時自行等待；有限流器時由 slot() 統一暫停所有呼叫
+                        await asyncio.sleep(retry_after or self.settings.llm_backoff_base * 2 ** attempt)
+                    continue
+                
+                response.raise_for_status()
                 data = response.json()
-                return data.get("choices", [{}])[0].get("message", {}).get("content", "")
                 
             except httpx.HTTPStatusError as e:
                 raise Exception(f"Vercel API 錯誤: {e.response.status_code} - {e.response.text}")
             except httpx.RequestError as e:
                 raise Exception(f"網路請求錯誤: {str(e)}")
+            
+            usage = data.get("usage") or {}
+            self._record_usage(usage)
+            if self.rate_limiter is not None:
+                self.rate_limiter.record_success()
+                self.rate_limiter.settle(estimated_tokens, usage.get("total_tokens"))
+            return data.get("choices", [{}])[0].get("message", {}).get("content", "")
+        
+        raise LLMRateLimitError()
+    
+    def _record_usage(self, usage: dict) -> None:
+        """累計 token 用量"""
+        self.usage["requests"] += 1
+        self.usage["prompt_tokens"] += usage.get("prompt_tokens", 0) or 0
+        self.usage["completion_tokens"] += usage.get("completion_tokens", 0) or 0
     
     async def extract_tags(self, news_title: str, news_summary: str) -> list[str]:
         """從新聞中提取標籤"""
@@ -67,7 +263,9 @@ class VercelLLMClient:
         result = await self.complete(
             prompt=prompt,
             max_tokens=200,
-            temperature=0.3
+            temperature=0.3,
+            prompt_type="tags",
+            background=True,
         )
         
         if not result:
@@ -76,6 +274,109 @@ class VercelLLMClient:
         # 解析標籤（預期格式：逗號分隔）
         tags = [tag.strip() for tag in result.split(",") if tag.strip()]
         return tags[:5]  # 最多 5 個標籤
+    
+    async def extract_tags_batch(
+        self,
+        articles: list[tuple[int, str, str]],
+    ) -> dict[int, list[str]]:
+        """一次呼叫為多則新聞提取標籤
+
+        articles 為 (news_id, 標題, 摘要)；回傳成功解析的 {news_id: 標籤}，
+        缺漏或格式錯誤的項目不會出現在結果中，由呼叫端改以單篇呼叫補救。
+        """
+        if not articles:
+            return {}
+        
+        article_blocks = "\n\n".join(
+            f"[{news_id}]\n標題：{title}\n摘要：{summary[:BATCH_SUMMARY_CHARS]}"
+            for news_id, title, summary in articles
+        )
+        prompt = TAG_BATCH_EXTRACTION_PROMPT.format(articles=article_blocks)
+        
+        result = await self.complete(
+            prompt=prompt,
+            max_tokens=60 * len(articles) + 50,
+            temperature=0.3,
+            prompt_type="tags",
+            background=True,
+        )
+        
+        return parse_batch_tags(result or "", [news_id for news_id, _, _ in articles])
+
+
+def parse_stream_line(line: str) -> tuple[str, dict]:
+    """解析一行 SSE 串流資料，回傳（新增文字, usage）；非資料行與 [DONE] 回傳空值"""
+    if not line.startswith("data:"):
+        return "", {}
+    data = line[len("data:"):].strip()
+    if not data or data == "[DONE]":
+        return "", {}
+    try:
+        chunk = json.loads(data)
+    except json.JSONDecodeError:
+        return "", {}
+    
+    choices = chunk.get("choices") or [{}]
+    delta = (choices[0].get("delta") or {}).get("content") or ""
+    return delta, chunk.get("usage") or {}
+
+
+# 批次標籤提取時每則摘要的最大字數（控制 prompt 長度）
+BATCH_SUMMARY_CHARS = 500
+
+
+def parse_batch_tags(result: str, expected_ids: list[int]) -> dict[int, list[str]]:
+    """解析批次標籤提取的 JSON 回應
+
+    接受 {"<id>": [...]} 或 [{"id": ..., "tags": [...]}]，容忍 ```json 區塊與前後說明文字；
+    只保留預期 ID 中標籤格式正確的項目。
+    """
+    text = re.sub(r"```(?:json)?", "", result).strip()
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    end = max(text.rfind("}"), text.rfind("]"))
+    if start < 0 or end <= start:
+        return {}
+    
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    
+    if isinstance(data, list):
+        data = {
+            str(item.get("id")): item.get("tags")
+            for item in data
+            if isinstance(item, dict)
+        }
+    if not isinstance(data, dict):
+        return {}
+    
+    parsed = {}
+    for news_id in expected_ids:
+        tags = data.get(str(news_id))
+        if not isinstance(tags, list):
+            continue
+        cleaned = []
+        for tag in tags:
+            if isinstance(tag, str) and tag.strip() and tag.strip() not in cleaned:
+                cleaned.append(tag.strip())
+        if cleaned:
+            parsed[news_id] = cleaned[:5]
+    return parsed
+
+
+# AI 批次標籤提取 Prompt（多則新聞共用同一份指示）
+TAG_BATCH_EXTRACTION_PROMPT = """你是一個專業的新聞分析師。請為以下每則新聞各提取 3-5 個關鍵標籤。
+
+標籤應該：
+1. 反映新聞的核心主題和產業領域
+2. 包含可能激發商業靈感的關鍵詞
+3. 簡潔明確，每個標籤 2-4 個字
+
+{articles}
+
+請只輸出一個 JSON 物件，鍵為新聞編號（方括號內的數字），值為標籤陣列，不要加任何額外說明。
+範例輸出：{{"12": ["人工智慧", "醫療科技", "數據分析"], "15": ["電動車", "供應鏈"]}}"""
 
 
 # AI 標籤提取 Prompt
@@ -154,5 +455,6 @@ DEVIL_AUDIT_PROMPT = """你是一位極度挑剔的風險投資人，專門找
 
 
 def create_llm_client() -> VercelLLMClient:
-    """建立 LLM 客戶端實例"""
-    return VercelLLMClient()
+    """建立 LLM 客戶端實例（依設定啟用回應快取與速率限制）"""
+    cache = LLMCache() if get_settings().llm_cache_enabled else None
+    return VercelLLMClient(cache=cache, rate_limiter=RateLimiter.from_settings())
@@ -0,0 +1,185 @@
+"""本地標籤提取（TF-IDF + 已知標籤比對，不呼叫 LLM）"""
+import math
+import time
+from collections import Counter
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.config import get_settings
+from app.models.news import News, Tag
+from app.services.simhash import tokenize
+
+
+class TagPrediction(NamedTuple):
+    """本地預測結果（confidence 介於 0 與 1）"""
+    tags: list[str]
+    confidence: float
+
+
+class LocalTagger:
+    """以既有標籤與已標籤新聞訓練的快速標籤器
+
+    - 每個標籤的特徵為帶有該標籤之新聞的 TF-IDF 向量平均（只保留權重最高的詞），
+      以倒排索引計算新文章與各標籤的餘弦相似度，耗時只與文章長度有關。
+    - 標籤名稱直接出現在標題或摘要時額外加分，詞彙表中尚無訓練資料的標籤也能因此命中；
+      英數標籤須與斷詞後的完整單字（或連續單字）相同，「AI」不會命中「said」，
+      含中日韓文字的標籤才以子字串比對。
+    - confidence 為前 MIN_TAGS 個標籤分數的平均，不足 MIN_TAGS 個以 0 計；
+      低於門檻的文章應交給 LLM。
+    """
+
+    TITLE_WEIGHT = 2
+    MAX_TERMS_PER_TAG = 64
+    MIN_TAG_DOCS = 2  # 至少出現在幾則新聞才學習該標籤的詞彙特徵
+    LITERAL_BONUS = 0.5
+    MIN_TAG_SCORE = 0.1
+    MIN_TAGS = 2
+    MAX_TAGS = 5
+
+    def __init__(self):
+        self.idf: dict[str, float] = {}
+        self.default_idf = 0.0
+        self.tags: list[str] = []
+        # 詞 → [(標籤索引, 權重)]
+        self.index: dict[str, list[tuple[int, float]]] = {}
+        # 英數標籤斷詞後的單字序列 → 標籤索引（供字面比對）
+        self.token_literals: dict[tuple[str, ...], list[int]] = {}
+        # 含中日韓文字的標籤名稱（小寫，以子字串比對）
+        self.literals: list[tuple[int, str]] = []
+
+    @classmethod
+    def fit(
+        cls,
+        documents: Iterable[tuple[str, str, list[str]]],
+        vocabulary: Iterable[str] = (),
+    ) -> "LocalTagger":
+        """由 (標題, 摘要, 標籤) 語料與標籤詞彙表建立標籤器"""
+        tagger = cls()
+        documents = list(documents)
+        term_counts = [
+            tagger._term_counts(tokenize(title), tokenize(summary)) for title, summary, _ in documents
+        ]
+
+        doc_freq: Counter = Counter()
+        for counts in term_counts:
+            doc_freq.update(counts.keys())
+        total = len(documents)
+        tagger.idf = {term: math.log((1 + total) / (1 + df)) + 1 for term, df in doc_freq.items()}
+        tagger.default_idf = math.log(1 + total) + 1
+
+        tag_ids: dict[str, int] = {}
+        for name in vocabulary:
+            tag_ids.setdefault(name, len(tag_ids))
+
+        sums: dict[str, Counter] = {}
+        tag_docs: Counter = Counter()
+        for counts, (_, _, tag_names) in zip(term_counts, documents):
+            vector = tagger._vectorize(counts)
+            for name in set(tag_names):
+                tag_ids.setdefault(name, len(tag_ids))
+                tag_docs[name] += 1
+                sums.setdefault(name, Counter()).update(vector)
+
+        tagger.tags = list(tag_ids)
+        for name, tag_index in tag_ids.items():
+            literal = name.strip().lower()
+            tokens = tuple(tokenize(literal))
+            if literal.isascii():
+                if tokens:
+                    tagger.token_literals.setdefault(tokens, []).append(tag_index)
+            elif literal:
+                tagger.literals.append((tag_index, literal))
+            if tag_docs[name] < cls.MIN_TAG_DOCS:
+                continue
+            top = sums[name].most_common(cls.MAX_TERMS_PER_TAG)
+            norm = math.sqrt(sum(weight * weight for _, weight in top)) or 1.0
+            for term, weight in top:
+                tagger.index.setdefault(term, []).append((tag_index, weight / norm))
+
+        return tagger
+
+    def predict(self, title: str, summary: Optional[str]) -> TagPrediction:
+        """預測標籤與信心分數"""
+        scores: dict[int, float] = {}
+        title_tokens, summary_tokens = tokenize(title or ""), tokenize(summary or "")
+        vector = self._vectorize(self._term_counts(title_tokens, summary_tokens))
+        for term, weight in vector.items():
+            for tag_index, tag_weight in self.index.get(term, ()):
+                scores[tag_index] = scores.get(tag_index, 0.0) + weight * tag_weight
+
+        matched: set[int] = set()
+        for tokens in (title_tokens, summary_tokens):
+            for size in {len(literal) for literal in self.token_literals}:
+                for start in range(len(tokens) - size + 1):
+                    matched.update(self.token_literals.get(tuple(tokens[start:start + size]), ()))
+        text = f"{title or ''} {summary or ''}".lower()
+        matched.update(tag_index for tag_index, literal in self.literals if literal in text)
+        for tag_index in matched:
+            scores[tag_index] = scores.get(tag_index, 0.0) + self.LITERAL_BONUS
+
+        ranked = sorted(
+            (item for item in scores.items() if item[1] >= self.MIN_TAG_SCORE),
+            key=lambda item: item[1],
+            reverse=True,
+        )[:self.MAX_TAGS]
+        top_scores = [min(score, 1.0) for _, score in ranked[:self.MIN_TAGS]]
+        confidence = sum(top_scores) / self.MIN_TAGS
+        return TagPrediction([self.tags[tag_index] for tag_index, _ in ranked], confidence)
+
+    @property
+    def is_empty(self) -> bool:
+        """沒有任何可預測的標籤"""
+        return not self.tags
+
+    def _term_counts(self, title_tokens: list[str], summary_tokens: list[str]) -> Counter:
+        """標題詞頻加權後與摘要詞頻合併"""
+        counts = Counter(summary_tokens)
+        for token in title_tokens:
+            counts[token] += self.TITLE_WEIGHT
+        return counts
+
+    def _vectorize(self, counts: Counter) -> dict[str, float]:
+        """詞頻轉為 L2 正規化的 TF-IDF 向量（次線性詞頻）"""
+        vector = {
+            term: (1 + math.log(count)) * self.idf.get(term, self.default_idf)
+            for term, count in counts.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items()}
+
+
+# 快取的本地標籤器與訓練時間（time.monotonic）
+_cached_tagger: Optional[tuple[float, LocalTagger]] = None
+
+
+async def load_local_tagger(db: AsyncSession, corpus_size: Optional[int] = None) -> LocalTagger:
+    """以資料庫中的標籤詞彙與最近由 LLM 標籤的新聞建立本地標籤器
+
+    只以 tag_source 為 llm 的新聞訓練：本地預測與沿用群組的標籤不回頭當訓練資料，避免放大自身的錯誤。
+    """
+    corpus_size = corpus_size or get_settings().local_tagger_corpus_size
+    vocabulary = (await db.execute(select(Tag.name))).scalars().all()
+    stmt = (
+        select(News)
+        .where(News.tag_source == "llm")
+        .order_by(News.id.desc())
+        .limit(corpus_size)
+        .options(selectinload(News.tags))
+    )
+    tagged = (await db.execute(stmt)).scalars().all()
+    return LocalTagger.fit(
+        ((news.title or "", news.summary or "", [tag.name for tag in news.tags]) for news in tagged),
+        vocabulary,
+    )
+
+
+async def get_local_tagger(db: AsyncSession) -> LocalTagger:
+    """取得本地標籤器，快取超過 local_tagger_retrain_interval 分鐘才重新訓練"""
+    global _cached_tagger
+    interval = get_settings().local_tagger_retrain_interval * 60
+    if _cached_tagger is None or time.monotonic() - _cached_tagger[0] >= interval:
+        _cached_tagger = (time.monotonic(), await load_local_tagger(db))
+    return _cached_tagger[1]
@@ -0,0 +1,92 @@
+"""隨機新聞取樣（成本與資料表大小無關）"""
+import random
+from itertools import combinations
+
+from sqlalchemy import exists, func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.exceptions import InsufficientDataError
+from app.models.news import News, news_tags
+from app.services.pair_history import PAIR_CANDIDATES, first_unused_pair
+
+# 每輪以一次 IN 查詢檢查的隨機 ID 數，與最多嘗試輪數
+PROBES_PER_ROUND = 32
+MAX_ROUNDS = 4
+
+# 可供配對的新聞：帶有標籤，且不是近似重複群組的成員
+SAMPLEABLE = (
+    exists().where(news_tags.c.news_id == News.id),
+    News.cluster_id.is_(None),
+)
+
+
+async def sample_news_ids(db: AsyncSession, count: int) -> list[int]:
+    """在已標籤新聞的 ID 範圍內隨機取樣可配對的新聞 ID（拒絕取樣）
+
+    範圍取自 news_tags 主鍵的兩端：標籤由舊到新寫入，大量待標籤新聞不會稀釋命中率。
+    每輪隨機抽 PROBES_PER_ROUND 個 ID，以主鍵 IN 查詢留下存在且符合條件者；
+    成本只與取樣數有關，不隨資料表大小成長。命中過少時改從多個隨機 ID 沿 news_tags
+    主鍵向後（到底則從頭）找下一筆，只會跳過已標籤的群組成員，不會掃過未標籤的新聞；
+    所有起點合併為一次查詢，不會每缺一筆就多一次來回。結果不足 count 表示資料不足。
+    """
+    # min 與 max 分開查詢：SQLite 只有單一 min()/max() 時才會直接讀主鍵兩端，合併會全表掃描
+    low = (await db.execute(select(func.min(news_tags.c.news_id)))).scalar()
+    high = (await db.execute(select(func.max(news_tags.c.news_id)))).scalar()
+    if low is None:
+        return []
+
+    chosen: list[int] = []
+    for _ in range(MAX_ROUNDS):
+        probes = {random.randint(low, high) for _ in range(PROBES_PER_ROUND)} - set(chosen)
+        result = await db.execute(select(News.id).where(News.id.in_(probes), *SAMPLEABLE))
+        hits = list(result.scalars())
+        random.shuffle(hits)
+        chosen.extend(hits[:count - len(chosen)])
+        if len(chosen) >= count:
+            return chosen
+
+    while len(chosen) < count:
+        starts = [random.randint(low, high) for _ in range(count - len(chosen))]
+        walks = [select(_walk(start, chosen, 1).subquery()) for start in starts]
+        found = list((await db.execute(union_all(*walks))).scalars())
+        # 起點之後已沒有符合的新聞時從頭找；不同起點找到同一筆時由下一輪補足
+        wrapped = len(starts) - len(found)
+        if wrapped:
+            found.extend((await db.execute(_walk(low, chosen + found, wrapped))).scalars())
+        found = list(dict.fromkeys(found))
+        if not found:
+            break
+        chosen.extend(found[:count - len(chosen)])
+    return chosen
+
+
+def _walk(start: int, excluded: list[int], limit: int):
+    """從 start 沿 news_tags 主鍵向後找可配對新聞 ID 的查詢"""
+    return (
+        select(news_tags.c.news_id)
+        .join(News, News.id == news_tags.c.news_id)
+        .where(news_tags.c.news_id >= start, news_tags.c.news_id.notin_(excluded), News.cluster_id.is_(None))
+        .distinct()
+        .order_by(news_tags.c.news_id)
+        .limit(limit)
+    )
+
+
+async def sample_news_pair(db: AsyncSession, avoid_used: bool = True) -> tuple[News, News]:
+    """隨機選取兩則帶標籤的新聞（排除近似重複的群組成員），只載入選中的兩筆與其標籤
+
+    avoid_used 時取樣 PAIR_CANDIDATES 則新聞，以一次主鍵查詢排除已生成過點子的配對；
+    候選配對都用過時仍回傳其中一組（由呼叫端決定是否沿用既有點子）。
+    """
+    news_ids = await sample_news_ids(db, PAIR_CANDIDATES if avoid_used else 2)
+    if len(news_ids) < 2:
+        raise InsufficientDataError("資料庫中沒有足夠的新聞（需要至少 2 則帶標籤的新聞）")
+
+    pair = (news_ids[0], news_ids[1])
+    if avoid_used:
+        pair = await first_unused_pair(db, list(combinations(news_ids, 2))) or pair
+
+    stmt = select(News).where(News.id.in_(pair)).options(selectinload(News.tags))
+    by_id = {news.id: news for news in (await db.execute(stmt)).scalars()}
+    return by_id[pair[0]], by_id[pair[1]]
@@ -1,13 +1,31 @@
 """新聞查詢服務（非同步版本）"""
-import random
 from typing import Optional
 
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.models.news import News, Tag
-from app.core.exceptions import NotFoundError, InsufficientDataError
+from app.core.pagination import Page, paginate
+from app.models.news import News, Tag, news_tags
+from app.core.exceptions import NotFoundError
+from app.services.counters import get_count
+from app.services.news_sampler import sample_news_pair
+
+
+async def load_news_by_tag_ids(db: AsyncSession, tag_ids: list[int], *conditions) -> list[News]:
+    """載入帶有任一指定標籤的新聞與其標籤（conditions 為額外的篩選條件）"""
+    if not tag_ids:
+        return []
+
+    # 以 IN 子查詢從 (tag_id, news_id) 索引取得新聞 ID；EXISTS 寫法會逐列掃描 news
+    tagged_ids = select(news_tags.c.news_id).where(news_tags.c.tag_id.in_(tag_ids))
+    stmt = (
+        select(News)
+        .where(News.id.in_(tagged_ids), *conditions)
+        .options(selectinload(News.tags))
+    )
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
 
 
 class NewsService:
@@ -17,20 +35,8 @@ class NewsService:
         self.db = db
     
     async def get_random_news_pair(self) -> tuple[News, News]:
-        """隨機選取兩則帶標籤的新聞"""
-        stmt = (
-            select(News)
-            .where(News.tags.any())
-            .options(selectinload(News.tags))
-        )
-        result = await self.db.execute(stmt)
-        news_with_tags = result.scalars().all()
-        
-        if len(news_with_tags) < 2:
-            raise InsufficientDataError("資料庫中沒有足夠的新聞（需要至少 2 則帶標籤的新聞）")
-        
-        selected = random.sample(list(news_with_tags), 2)
-        return selected[0], selected[1]
+        """隨機選取兩則帶標籤的新聞（排除近似重複的群組成員）"""
+        return await sample_news_pair(self.db)
     
     async def get_news_by_ids(self, news_ids: list[int]) -> list[News]:
         """根據新聞 ID 獲取新聞"""
@@ -47,34 +53,21 @@ class NewsService:
     
     async def get_news_by_tag_ids(self, tag_ids: list[int]) -> list[News]:
         """根據標籤 ID 獲取新聞"""
-        if not tag_ids:
-            return []
-        
-        stmt = (
-            select(News)
-            .where(News.tags.any(Tag.id.in_(tag_ids)))
-            .options(selectinload(News.tags))
-        )
-        result = await self.db.execute(stmt)
-        return list(result.scalars().all())
+        return await load_news_by_tag_ids(self.db, tag_ids)
     
-    async def get_news_list(self, skip: int = 0, limit: int = 20) -> list[News]:
-        """獲取新聞列表"""
-        stmt = (
-            select(News)
-            .order_by(News.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .options(selectinload(News.tags))
-        )
-        result = await self.db.execute(stmt)
-        return list(result.scalars().all())
+    async def get_news_list(
+        self,
+        skip: int = 0,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Page:
+        """獲取新聞列表（依 (created_at, id) 由新到舊，有游標時以 keyset 分頁）"""
+        stmt = select(News).options(selectinload(News.tags))
+        return await paginate(self.db, stmt, (News.created_at, News.id), limit, cursor, skip)
     
     async def get_news_count(self) -> int:
-        """獲取新聞總數"""
-        stmt = select(func.count(News.id))
-        result = await self.db.execute(stmt)
-        return result.scalar_one()
+        """獲取新聞總數（讀取計數器）"""
+        return await get_count(self.db, "news")
     
     async def get_news_by_id(self, news_id: int) -> News:
         """獲取單一新聞"""
@@ -91,14 +84,17 @@ class NewsService:
         
         return news
     
-    async def get_tags_list(self, skip: int = 0, limit: int = 50) -> list[Tag]:
-        """獲取標籤列表"""
-        stmt = select(Tag).order_by(Tag.name).offset(skip).limit(limit)
-        result = await self.db.execute(stmt)
-        return list(result.scalars().all())
+    async def get_tags_list(
+        self,
+        skip: int = 0,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Page:
+        """獲取標籤列表（依 (name, id) 排序，有游標時以 keyset 分頁）"""
+        return await paginate(
+            self.db, select(Tag), (Tag.name, Tag.id), limit, cursor, skip, descending=False
+        )
     
     async def get_tags_count(self) -> int:
-        """獲取標籤總數"""
-        stmt = select(func.count(Tag.id))
-        result = await self.db.execute(stmt)
-        return result.scalar_one()
+        """獲取標籤總數（讀取計數器）"""
+        return await get_count(self.db, "tags")
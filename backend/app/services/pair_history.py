@@ -0,0 +1,61 @@
+"""已生成點子的新聞配對紀錄（避免同一組新聞重複呼叫 LLM）"""
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import dialect_insert
+from app.models.news import Idea, idea_news_pairs
+
+# 取樣時一次產生並以單一查詢檢查的候選配對數
+PAIR_CANDIDATES = 8
+
+
+def pair_key(news_id_a: int, news_id_b: int) -> tuple[int, int]:
+    """無序配對的鍵（小的 ID 在前）"""
+    return (news_id_a, news_id_b) if news_id_a < news_id_b else (news_id_b, news_id_a)
+
+
+def _matches(keys: Iterable[tuple[int, int]]):
+    """以主鍵比對多個配對的條件"""
+    return or_(*(
+        and_(idea_news_pairs.c.news_id_low == low, idea_news_pairs.c.news_id_high == high)
+        for low, high in keys
+    ))
+
+
+async def used_pairs(db: AsyncSession, pairs: Iterable[tuple[int, int]]) -> set[tuple[int, int]]:
+    """回傳 pairs 中已生成過點子的配對（以無序鍵表示）"""
+    keys = {pair_key(a, b) for a, b in pairs if a != b}
+    if not keys:
+        return set()
+    stmt = select(idea_news_pairs.c.news_id_low, idea_news_pairs.c.news_id_high).where(_matches(keys))
+    return set((await db.execute(stmt)).tuples())
+
+
+async def first_unused_pair(db: AsyncSession, pairs: list[tuple[int, int]]) -> Optional[tuple[int, int]]:
+    """依序找出第一組還沒生成過點子的配對（都用過時回傳 None）"""
+    used = await used_pairs(db, pairs)
+    return next((pair for pair in pairs if pair[0] != pair[1] and pair_key(*pair) not in used), None)
+
+
+async def find_pair_idea(db: AsyncSession, news_id_a: int, news_id_b: int) -> Optional[Idea]:
+    """取得這組新聞最早生成的點子（沒有時回傳 None）"""
+    if news_id_a == news_id_b:
+        return None
+    stmt = (
+        select(Idea)
+        .join(idea_news_pairs, idea_news_pairs.c.idea_id == Idea.id)
+        .where(_matches([pair_key(news_id_a, news_id_b)]))
+    )
+    return (await db.execute(stmt)).scalar_one_or_none()
+
+
+def record_pair(db: AsyncSession, news_id_a: int, news_id_b: int, idea_id: int):
+    """記錄配對的語句（由呼叫端在寫入點子的同一個交易中執行；已有紀錄時保留最早的點子）"""
+    low, high = pair_key(news_id_a, news_id_b)
+    return (
+        dialect_insert(db, idea_news_pairs)
+        .values(news_id_low=low, news_id_high=high, idea_id=idea_id)
+        .on_conflict_do_nothing()
+    )
@@ -0,0 +1,109 @@
+"""RSS 來源自適應輪詢策略"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+@dataclass
+class SourcePollState:
+    """單一來源的輪詢狀態"""
+    name: str
+    interval_seconds: float
+    publish_rate: Optional[float] = None  # 觀測到的每小時新文章數（EWMA）
+    hint_seconds: Optional[float] = None  # <ttl> / Cache-Control 建議的最短間隔
+    failures: int = 0
+    last_status: str = "pending"
+    last_new_articles: int = 0
+    last_polled_at: Optional[datetime] = None
+    next_run_at: Optional[datetime] = None
+
+
+class AdaptivePollPolicy:
+    """依來源的發布頻率調整輪詢間隔
+
+    - 目標是每次輪詢約有 target_new_articles 篇新文章：間隔 ≈ target / 發布速率
+    - 沒有新文章時逐步拉長間隔（idle_backoff 倍）
+    - feed 的 <ttl> 與 Cache-Control max-age 作為間隔下限
+    - 失敗時以指數退避，成功後恢復
+    - 所有間隔限制在 [min_seconds, max_seconds]，並加上 ±jitter 比例的隨機抖動
+    """
+
+    def __init__(
+        self,
+        base_seconds: float,
+        min_seconds: float,
+        max_seconds: float,
+        jitter: float = 0.1,
+        smoothing: float = 0.3,
+        target_new_articles: float = 1.0,
+        idle_backoff: float = 1.5,
+    ):
+        self.base_seconds = base_seconds
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.jitter = jitter
+        self.smoothing = smoothing
+        self.target_new_articles = target_new_articles
+        self.idle_backoff = idle_backoff
+
+    def new_state(self, name: str) -> SourcePollState:
+        """建立來源的初始狀態"""
+        return SourcePollState(name=name, interval_seconds=self._clamp(self.base_seconds))
+
+    def record_success(
+        self,
+        state: SourcePollState,
+        new_articles: int,
+        hint_seconds: Optional[float] = None,
+        now: Optional[datetime] = None,
+    ) -> float:
+        """記錄成功的輪詢並回傳下一次的間隔（秒）"""
+        now = now or datetime.utcnow()
+        elapsed = (now - state.last_polled_at).total_seconds() if state.last_polled_at else None
+
+        if elapsed and elapsed > 0:
+            observed_rate = new_articles / (elapsed / 3600)
+            if state.publish_rate is None:
+                state.publish_rate = observed_rate
+            else:
+                state.publish_rate = (
+                    self.smoothing * observed_rate + (1 - self.smoothing) * state.publish_rate
+                )
+
+        if new_articles > 0 and state.publish_rate:
+            interval = self.target_new_articles / state.publish_rate * 3600
+        elif state.last_polled_at is None:
+            interval = self.base_seconds
+        else:
+            interval = state.interval_seconds * self.idle_backoff
+
+        if hint_seconds is not None:
+            state.hint_seconds = hint_seconds
+        if state.hint_seconds:
+            interval = max(interval, state.hint_seconds)
+
+        state.failures = 0
+        state.last_status = "ok"
+        state.last_new_articles = new_articles
+        state.last_polled_at = now
+        state.interval_seconds = self._clamp(interval)
+        return state.interval_seconds
+
+    def record_failure(self, state: SourcePollState, now: Optional[datetime] = None) -> float:
+        """記錄失敗的輪詢並回傳退避後的間隔（秒）"""
+        state.failures += 1
+        state.last_status = "failed"
+        state.last_new_articles = 0
+        state.last_polled_at = now or datetime.utcnow()
+        state.interval_seconds = self._clamp(self.min_seconds * 2 ** state.failures)
+        return state.interval_seconds
+
+    def next_run(self, state: SourcePollState, now: Optional[datetime] = None) -> datetime:
+        """計算含抖動的下一次執行時間"""
+        delay = state.interval_seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+        state.next_run_at = (now or datetime.utcnow()) + timedelta(seconds=delay)
+        return state.next_run_at
+
+    def _clamp(self, seconds: float) -> float:
+        return min(max(seconds, self.min_seconds), self.max_seconds)
@@ -0,0 +1,216 @@
+"""LLM 速率限制（token bucket + 並行上限 + 429 自適應退避）"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from app.core.config import get_settings
+
+
+class TokenBucket:
+    """每分鐘補充 rate_per_minute 單位的 token bucket
+
+    容量預設等於每分鐘額度，允許一開始就用掉一整分鐘的配額。
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, factor: float) -> None:
+        """依經過時間補充 token（factor 為退避後的速率比例）"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate * factor)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, factor: float = 1.0, reserve: float = 0.0) -> float:
+        """取得足夠 token 前需等待的秒數（0 表示可立即取用）
+
+        reserve 為取用後必須保留在桶內的 token 數（留給優先度較高的呼叫）。
+        """
+        self._refill(factor)
+        amount = min(amount, self.capacity - reserve) + reserve
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / (self.rate * factor)
+
+    def consume(self, amount: float) -> None:
+        """扣除 token（超過容量的請求以容量計）"""
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        """歸還預估過多的 token"""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """LLM gateway 的請求數 / token 數速率限制
+
+    - 每次呼叫先取得並行 semaphore，再依序從 RPM 與 TPM 兩個 bucket 取用額度；
+      TPM 先以預估值扣除，回應後再依實際用量歸還差額。
+    - 收到 429 時所有呼叫一起暫停到 Retry-After（無此標頭則指數退避），
+      並把補充速率減半；之後每次成功再逐步恢復（AIMD）。
+    - 背景呼叫（標籤提取）最多只用 max_concurrency - interactive_slots 個並行名額，
+      取用額度後兩個 bucket 仍須保留 interactive_reserve 比例給互動呼叫；
+      背景呼叫等待補充時不持有鎖，互動呼叫可以先取得額度。
+    rpm / tpm 為 0 表示不限制該項。
+    """
+
+    MIN_FACTOR = 0.1
+    RECOVERY_STEP = 0.1
+
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        max_concurrency: int,
+        backoff_base: float = 2.0,
+        backoff_max: float = 60.0,
+        interactive_slots: int = 0,
+        interactive_reserve: float = 0.0,
+    ):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_concurrency = max_concurrency
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.factor = 1.0
+        self.strikes = 0
+        self.paused_until = 0.0
+        self.interactive_reserve = interactive_reserve
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._background_semaphore = asyncio.Semaphore(max(1, max_concurrency - interactive_slots))
+        self._lock = asyncio.Lock()
+        self._background_lock = asyncio.Lock()
+        self.stats = {"acquired": 0, "background_acquired": 0, "waited_seconds": 0.0, "rate_limited": 0}
+
+    @classmethod
+    def from_settings(cls) -> "RateLimiter":
+        """依應用程式設定建立"""
+        settings = get_settings()
+        return cls(
+            rpm=settings.llm_rpm_limit,
+            tpm=settings.llm_tpm_limit,
+            max_concurrency=settings.llm_max_concurrency,
+            backoff_base=settings.llm_backoff_base,
+            backoff_max=settings.llm_backoff_max,
+            interactive_slots=settings.llm_interactive_slots,
+            interactive_reserve=settings.llm_interactive_reserve,
+        )
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0, background: bool = False) -> AsyncIterator[None]:
+        """取得一次呼叫的並行名額與速率額度（background 為可延後的批次呼叫）"""
+        if not background:
+            async with self._semaphore:
+                await self.acquire(estimated_tokens)
+                yield
+            return
+
+        async with self._background_semaphore, self._semaphore:
+            await self.acquire(estimated_tokens, background=True)
+            yield
+
+    async def acquire(self, estimated_tokens: int = 0, background: bool = False) -> None:
+        """等待直到暫停結束且兩個 bucket 都有足夠額度
+
+        以鎖讓同一優先度的等待者依序取得額度，避免大請求被小請求持續插隊。
+        互動呼叫持有鎖等待；背景呼叫只在檢查額度時短暫取得鎖，
+        等待補充期間讓互動呼叫先行。
+        """
+        started = time.monotonic()
+        if background:
+            async with self._background_lock:
+                while True:
+                    async with self._lock:
+                        delay = self._delay(estimated_tokens, self.interactive_reserve)
+                        if delay <= 0:
+                            self._consume(estimated_tokens)
+                            break
+                    await asyncio.sleep(delay)
+            self.stats["background_acquired"] += 1
+        else:
+            async with self._lock:
+                while True:
+                    delay = self._delay(estimated_tokens)
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(delay)
+                self._consume(estimated_tokens)
+        self.stats["acquired"] += 1
+        self.stats["waited_seconds"] += time.monotonic() - started
+
+    def _delay(self, estimated_tokens: int, reserve: float = 0.0) -> float:
+        """距離暫停結束且兩個 bucket 都有額度的秒數（reserve 為須保留的容量比例）"""
+        delay = self.paused_until - time.monotonic()
+        if self.requests is not None:
+            delay = max(delay, self.requests.wait_time(1, self.factor, self.requests.capacity * reserve))
+        if self.tokens is not None and estimated_tokens:
+            delay = max(delay, self.tokens.wait_time(estimated_tokens, self.factor, self.tokens.capacity * reserve))
+        return delay
+
+    def _consume(self, estimated_tokens: int) -> None:
+        """從兩個 bucket 扣除本次呼叫的額度"""
+        if self.requests is not None:
+            self.requests.consume(1)
+        if self.tokens is not None and estimated_tokens:
+            self.tokens.consume(estimated_tokens)
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """以實際 token 用量修正預估值"""
+        if self.tokens is None or actual_tokens is None:
+            return
+        if actual_tokens < estimated_tokens:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+        else:
+            self.tokens.consume(actual_tokens - estimated_tokens)
+
+    def record_success(self) -> None:
+        """成功回應後逐步恢復速率"""
+        self.strikes = 0
+        self.factor = min(1.0, self.factor + self.RECOVERY_STEP)
+
+    def record_rate_limited(self, retry_after: Optional[float] = None) -> float:
+        """收到 429：暫停所有呼叫並降低速率，回傳暫停秒數"""
+        self.stats["rate_limited"] += 1
+        if retry_after is None:
+            retry_after = min(self.backoff_max, self.backoff_base * 2 ** self.strikes)
+        self.strikes += 1
+        self.factor = max(self.MIN_FACTOR, self.factor / 2)
+        self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+        return retry_after
+
+    def get_stats(self) -> dict:
+        """取得限流統計"""
+        return {
+            **self.stats,
+            "waited_seconds": round(self.stats["waited_seconds"], 3),
+            "rate_factor": round(self.factor, 2),
+            "paused_seconds": round(max(0.0, self.paused_until - time.monotonic()), 3),
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 標頭（秒數或 HTTP 日期）"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """粗估一次呼叫佔用的 token 數（中文約一字一 token，再加上回應上限）"""
+    return len(prompt) + max_tokens
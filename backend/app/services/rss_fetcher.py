@@ -1,118 +1,352 @@
-"""RSS 抓取服務（非同步包裝版本）"""
+"""RSS 抓取服務（非同步下載與寫入，解析在執行緒或行程池）"""
 import asyncio
-import feedparser
-from datetime import datetime
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.news import News, Tag
+from app.models.feed import FeedState
 from app.services.rss_sources import RSS_SOURCES
-from app.core.database import SyncSessionLocal
+from app.services.feed_downloader import FeedDownload, FeedDownloader, get_feed_downloader
+from app.services.feed_parser import FeedEntry, FeedParser, ParsedFeed
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal, dialect_insert
+from app.services.counters import increment
+from app.services.embedding import get_embedder
+from app.services.simhash import hamming_distance, news_fingerprint
+from app.services.url_canonical import url_hash64
+from app.services.vector_index import VectorIndex, get_news_index
 
 
 class RSSFetcher:
     """RSS 抓取器類別
 
-    feedparser 為同步函式庫，透過 asyncio.to_thread 包裝為非同步操作。
-    DB 操作使用 SyncSessionLocal 以確保與 feedparser 的相容性。
+    所有來源透過共用連線池的 FeedDownloader 同時下載，下載完成後才把 bytes
+    交給 FeedParser 解析（執行緒或行程池，依 rss_parse_mode 設定）。
+    每個來源的 ETag / Last-Modified / 內容雜湊存於 feed_states，下次以條件式請求抓取；
+    304 或內容雜湊未變的來源會直接略過解析與逐筆 DB 作業。
+    DB 操作使用非同步 Session（與 API 共用連線池）；同一輪的條目合併為批次寫入。
+    注入 VectorIndex 時，新條目提交後寫入語意向量。
     """
 
-    def __init__(self, db: Session):
+    # 單一 IN 查詢 / 多列 INSERT 的最大筆數（避免超過 SQLite 參數上限）
+    BULK_CHUNK_SIZE = 500
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        downloader: Optional[FeedDownloader] = None,
+        parser: Optional[FeedParser] = None,
+        news_index: Optional[VectorIndex] = None,
+    ):
         self.db = db
+        self.downloader = downloader or get_feed_downloader()
+        self.parser = parser or FeedParser()
+        self.news_index = news_index
+
+    async def fetch_all_sources_async(self, sources: Optional[list[dict]] = None) -> dict:
+        """同時從所有來源抓取 RSS 資料"""
+        sources = RSS_SOURCES if sources is None else sources
+        started = time.perf_counter()
 
-    def fetch_all_sources(self) -> dict:
-        """從所有來源抓取 RSS 資料（同步版本）"""
         results = {
-            "total_sources": len(RSS_SOURCES),
+            "total_sources": len(sources),
             "success": 0,
             "failed": 0,
             "new_articles": 0,
+            "near_duplicates": 0,
+            "skipped": 0,
+            "skipped_sources": [],
+            "bytes_downloaded": 0,
+            "sources": {},
             "errors": []
         }
 
-        for source in RSS_SOURCES:
-            try:
-                count = self._fetch_source(source)
-                results["success"] += 1
-                results["new_articles"] += count
-            except Exception as e:
-                results["failed"] += 1
-                results["errors"].append({
+        states = await self._load_feed_states(sources)
+
+        # 下載與解析同時進行，整輪耗時約等於最慢的單一來源
+        outcomes = await asyncio.gather(
+            *(
+                self._download_and_parse(source, states.get(source["name"]))
+                for source in sources
+            ),
+            return_exceptions=True,
+        )
+
+        # 先整理下載結果，再把所有有變更的來源合併成一批寫入
+        changed: list[list[FeedEntry]] = []
+        changed_sources: list[dict] = []
+        downloads: list[tuple[dict, FeedDownload]] = []
+        for source, outcome in zip(sources, outcomes):
+            if isinstance(outcome, BaseException):
+                self._record_error(results, source, outcome)
+                continue
+
+            download, parsed = outcome
+            results["bytes_downloaded"] += len(download.content)
+            downloads.append((source, download))
+            results["sources"][source["name"]] = {
+                "status": "ok",
+                "new_articles": 0,
+                "ttl_minutes": parsed.ttl_minutes if parsed else None,
+                "max_age_seconds": download.max_age,
+            }
+
+            if parsed is None:
+                results["skipped"] += 1
+                results["sources"][source["name"]]["status"] = "skipped"
+                results["skipped_sources"].append({
                     "source": source["name"],
-                    "error": str(e)
+                    "reason": "not_modified" if download.not_modified else "unchanged"
                 })
+            else:
+                changed.append(parsed.entries)
+                changed_sources.append(source)
+
+        try:
+            if changed:
+                new_counts, clustered = await self._save_entries(changed)
+                results["near_duplicates"] = clustered
+                for name, count in new_counts.items():
+                    results["sources"][name]["new_articles"] = count
+                results["new_articles"] = sum(new_counts.values())
+            await self._save_feed_states(downloads)
+            results["success"] = len(downloads)
+        except Exception as e:
+            # 只有要寫入條目的來源記為失敗；未變更的來源沒有寫入任何資料，維持 skipped
+            for source in changed_sources:
+                self._record_error(results, source, e)
+            results["success"] = len(downloads) - len(changed_sources)
 
+        results["duration_seconds"] = round(time.perf_counter() - started, 3)
         return results
 
-    async def fetch_all_sources_async(self) -> dict:
-        """從所有來源抓取 RSS 資料（非同步包裝）"""
-        return await asyncio.to_thread(self.fetch_all_sources)
+    async def _download_and_parse(
+        self,
+        source: dict,
+        state: Optional[dict] = None,
+    ) -> tuple[FeedDownload, Optional[ParsedFeed]]:
+        """下載單一來源後再交給解析器
+
+        來源未變更（304 或內容雜湊相同）時回傳的解析結果為 None。
+        """
+        state = state or {}
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
 
-    def _fetch_source(self, source: dict) -> int:
-        """從單一來源抓取 RSS 資料"""
-        feed = feedparser.parse(source["url"])
+        download = await self.downloader.fetch(source, headers=headers)
+        if download.not_modified or download.content_hash == state.get("content_hash"):
+            return download, None
 
-        if feed.bozo and not feed.entries:
-            raise Exception(f"無法解析 RSS: {feed.bozo_exception}")
+        parsed = await self.parser.parse(download.content, source["name"], download.url)
+        return download, parsed
 
-        new_count = 0
+    async def _load_feed_states(self, sources: list[dict]) -> dict[str, dict]:
+        """讀取來源的條件式請求快取"""
+        names = [source["name"] for source in sources]
+        result = await self.db.execute(select(FeedState).where(FeedState.source.in_(names)))
+        return {
+            state.source: {
+                "etag": state.etag,
+                "last_modified": state.last_modified,
+                "content_hash": state.content_hash,
+            }
+            for state in result.scalars()
+        }
 
-        for entry in feed.entries:
-            # 檢查是否已存在
-            existing = self.db.query(News).filter(
-                News.link == entry.get("link", "")
-            ).first()
+    async def _save_feed_states(self, downloads: list[tuple[dict, FeedDownload]]) -> None:
+        """更新來源的條件式請求快取（僅在條目成功寫入後呼叫）"""
+        now = datetime.utcnow()
+        names = [source["name"] for source, _ in downloads]
+        result = await self.db.execute(select(FeedState).where(FeedState.source.in_(names)))
+        states = {state.source: state for state in result.scalars()}
+        for source, download in downloads:
+            state = states.get(source["name"])
+            if state is None:
+                state = FeedState(source=source["name"], url=source["url"])
+                self.db.add(state)
 
-            if existing:
-                continue
+            state.url = source["url"]
+            state.last_checked_at = now
+
+            # 304 回應可能不帶驗證標頭，沿用既有值
+            if not download.not_modified:
+                state.etag = download.headers.get("etag")
+                state.last_modified = download.headers.get("last-modified")
+                if state.content_hash != download.content_hash:
+                    state.content_hash = download.content_hash
+                    state.last_changed_at = now
+            else:
+                state.etag = download.headers.get("etag", state.etag)
+                state.last_modified = download.headers.get("last-modified", state.last_modified)
 
-            # 解析發布時間
-            published_at = self._parse_published_date(entry)
+        try:
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
 
-            # 建立新聞記錄
-            news = News(
-                title=entry.get("title", "無標題"),
-                link=entry.get("link", ""),
-                summary=entry.get("summary", entry.get("description", "")),
-                source=source["name"],
-                published_at=published_at
+    @staticmethod
+    def _record_error(results: dict, source: dict, error: BaseException) -> None:
+        """記錄單一來源的失敗"""
+        results["sources"][source["name"]] = {"status": "failed", "new_articles": 0}
+        results["failed"] += 1
+        results["errors"].append({
+            "source": source["name"],
+            "error": str(error) or error.__class__.__name__
+        })
+
+    async def _save_entries(self, batch: list[list[FeedEntry]]) -> tuple[dict[str, int], int]:
+        """將一批來源的條目寫入資料庫（集合式去重 + 多列 INSERT）
+
+        以正規化連結雜湊（link_hash）的一次 IN 查詢找出已存在的條目，再以
+        INSERT ... ON CONFLICT DO NOTHING（link / link_hash 任一衝突即略過）寫入新條目，
+        並依 SimHash 將近似重複的新條目歸入既有群組。
+        回傳（各來源實際新增筆數, 歸入群組筆數）。沒有連結的條目無法去重，直接略過。
+        """
+        rows: dict[int, dict] = {}
+        for entries in batch:
+            for entry in entries:
+                if not entry.link:
+                    continue
+                link_hash = url_hash64(entry.link)
+                if link_hash in rows:
+                    continue
+                rows[link_hash] = {
+                    "title": entry.title,
+                    "link": entry.link,
+                    "link_hash": link_hash,
+                    "summary": entry.summary,
+                    "source": entry.source,
+                    "published_at": self._to_datetime(entry.published_ts),
+                    "simhash": news_fingerprint(entry.title, entry.summary),
+                }
+
+        hashes = list(rows)
+        existing: set[int] = set()
+        for start in range(0, len(hashes), self.BULK_CHUNK_SIZE):
+            chunk = hashes[start:start + self.BULK_CHUNK_SIZE]
+            existing.update(
+                (await self.db.execute(
+                    select(News.link_hash).where(News.link_hash.in_(chunk))
+                )).scalars()
             )
 
-            self.db.add(news)
-            new_count += 1
+        new_rows = [row for link_hash, row in rows.items() if link_hash not in existing]
+        new_counts: dict[str, int] = {}
+        inserted: list[tuple[int, int]] = []
+        inserted_rows: dict[int, dict] = {}
+        try:
+            for start in range(0, len(new_rows), self.BULK_CHUNK_SIZE):
+                stmt = (
+                    dialect_insert(self.db, News)
+                    .values(new_rows[start:start + self.BULK_CHUNK_SIZE])
+                    .on_conflict_do_nothing()
+                    .returning(News.id, News.source, News.simhash, News.link_hash)
+                )
+                for news_id, source_name, simhash, link_hash in await self.db.execute(stmt):
+                    new_counts[source_name] = new_counts.get(source_name, 0) + 1
+                    inserted.append((news_id, simhash))
+                    inserted_rows[news_id] = rows[link_hash]
+            if inserted:
+                await self.db.execute(increment("news", len(inserted)))
+            clustered = await self._assign_clusters(inserted)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        await self._index_vectors(inserted_rows)
+        return new_counts, clustered
+
+    async def _index_vectors(self, inserted_rows: dict[int, dict]) -> None:
+        """在執行緒中寫入新條目的語意向量，不卡住事件迴圈（失敗時留待啟動時的補寫任務）"""
+        if self.news_index is None or not inserted_rows:
+            return
+        texts = [(row["title"], row["summary"]) for row in inserted_rows.values()]
+
+        def write() -> None:
+            self.news_index.add_many(list(inserted_rows), get_embedder().embed_many(texts))
+
+        try:
+            await asyncio.to_thread(write)
+        except Exception as e:
+            print(f"[向量索引] 新聞向量寫入失敗: {str(e)}")
 
-        self.db.commit()
-        return new_count
+    async def _assign_clusters(self, inserted: list[tuple[int, int]]) -> int:
+        """將新條目連結到時間窗內近似重複的代表新聞，回傳歸入群組的筆數
 
-    def _parse_published_date(self, entry: dict) -> Optional[datetime]:
-        """解析 RSS 條目的發布日期"""
-        published = entry.get("published_parsed") or entry.get("updated_parsed")
+        只與各群組的代表新聞（cluster_id 為 NULL）比對；同批次中較早寫入的新條目
+        也可成為代表。
+        """
+        if not inserted:
+            return 0
+
+        settings = get_settings()
+        inserted.sort()
+        since = datetime.utcnow() - timedelta(hours=settings.dedup_window_hours)
+        candidates = list((await self.db.execute(
+            select(News.id, News.simhash).where(
+                News.id < inserted[0][0],
+                News.created_at >= since,
+                News.cluster_id.is_(None),
+                News.simhash.isnot(None),
+                News.simhash != 0,
+            )
+        )).tuples())
+
+        updates = []
+        for news_id, simhash in inserted:
+            if not simhash:
+                continue
+            match = next(
+                (
+                    candidate_id
+                    for candidate_id, candidate_hash in candidates
+                    if hamming_distance(simhash, candidate_hash) <= settings.dedup_hamming_threshold
+                ),
+                None,
+            )
+            if match is None:
+                candidates.append((news_id, simhash))
+            else:
+                updates.append({"id": news_id, "cluster_id": match})
 
-        if published:
-            try:
-                return datetime(*published[:6])
-            except (TypeError, ValueError):
-                pass
+        if updates:
+            await self.db.execute(update(News), updates)
+        return len(updates)
 
-        return None
+    @staticmethod
+    def _to_datetime(timestamp: Optional[float]) -> Optional[datetime]:
+        """UTC epoch 秒轉為（不含時區的）UTC datetime"""
+        if timestamp is None:
+            return None
+        return datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(tzinfo=None)
 
-    def get_recent_news(self, limit: int = 50) -> list[News]:
+    async def get_recent_news(self, limit: int = 50) -> list[News]:
         """取得最近的新聞列表"""
-        return self.db.query(News).order_by(
-            News.created_at.desc()
-        ).limit(limit).all()
+        result = await self.db.execute(
+            select(News).order_by(News.created_at.desc()).limit(limit)
+        )
+        return list(result.scalars().all())
 
-    def get_news_without_tags(self, limit: int = 20) -> list[News]:
+    async def get_news_without_tags(self, limit: int = 20) -> list[News]:
         """取得尚未標籤的新聞"""
-        return self.db.query(News).filter(
-            ~News.tags.any()
-        ).order_by(
-            News.created_at.desc()
-        ).limit(limit).all()
+        result = await self.db.execute(
+            select(News)
+            .where(News.tagged_at.is_(None))
+            .order_by(News.created_at.desc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
 
 
 def create_rss_fetcher() -> RSSFetcher:
-    """建立 RSS 抓取器實例（使用 SyncSessionLocal）"""
-    db = SyncSessionLocal()
-    return RSSFetcher(db)
+    """建立 RSS 抓取器實例（使用 AsyncSessionLocal + 共用下載器 + 新聞向量索引）"""
+    db = AsyncSessionLocal()
+    return RSSFetcher(db, news_index=get_news_index())
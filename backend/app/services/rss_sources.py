@@ -1,6 +1,7 @@
 """RSS 來源設定"""
 
 # 高品質新聞 RSS 來源列表
+# 可選欄位 connect_timeout / read_timeout（秒）覆寫全域逾時設定
 RSS_SOURCES = [
     {
         "name": "TechCrunch",
@@ -45,11 +46,15 @@ RSS_SOURCES = [
     {
         "name": "Reuters Business",
         "url": "https://www.reutersagency.com/feed/?best-topics=business-finance",
-        "category": "business"
+        "category": "business",
+        "connect_timeout": 3.0,
+        "read_timeout": 8.0
     },
     {
         "name": "Bloomberg",
         "url": "https://feeds.bloomberg.com/markets/news.rss",
-        "category": "business"
+        "category": "business",
+        "connect_timeout": 3.0,
+        "read_timeout": 8.0
     }
 ]
@@ -1,51 +1,230 @@
 """排程任務管理（非同步版本）"""
+import random
+from datetime import datetime, timedelta, timezone
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.date import DateTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
 from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal, checkpoint_wal, uses_sqlite_profile
+from app.services.counters import reconcile_counters
+from app.services.embedding import get_embedder
+from app.services.poll_policy import AdaptivePollPolicy, SourcePollState
 from app.services.rss_fetcher import create_rss_fetcher
+from app.services.rss_sources import RSS_SOURCES
+from app.services.similarity_service import SimilarityService
 from app.services.tag_extractor import create_tag_extractor
+from app.services.vector_index import get_idea_index, get_news_index
 
 
 # 全域排程器實例
 scheduler = AsyncIOScheduler()
 
+# 各來源的自適應輪詢狀態
+_poll_policy: AdaptivePollPolicy | None = None
+poll_states: dict[str, SourcePollState] = {}
+
+
+def get_poll_policy() -> AdaptivePollPolicy:
+    """取得輪詢策略（依設定建立）"""
+    global _poll_policy
+    if _poll_policy is None:
+        settings = get_settings()
+        _poll_policy = AdaptivePollPolicy(
+            base_seconds=settings.rss_update_interval * 60,
+            min_seconds=settings.rss_min_interval * 60,
+            max_seconds=settings.rss_max_interval * 60,
+            jitter=settings.rss_poll_jitter,
+        )
+    return _poll_policy
+
+
+def _get_poll_state(name: str) -> SourcePollState:
+    """取得來源的輪詢狀態（不存在時建立）"""
+    if name not in poll_states:
+        poll_states[name] = get_poll_policy().new_state(name)
+    return poll_states[name]
+
+
+def _apply_poll_results(result: dict, rescheduled: set[str]) -> None:
+    """依抓取結果更新各來源的輪詢間隔，並重新排定下一次執行（已排定的來源記入 rescheduled）"""
+    policy = get_poll_policy()
+    for name, detail in result["sources"].items():
+        state = _get_poll_state(name)
+        if detail["status"] == "failed":
+            policy.record_failure(state)
+        else:
+            hints = [
+                detail["ttl_minutes"] * 60 if detail.get("ttl_minutes") else None,
+                detail.get("max_age_seconds"),
+            ]
+            hints = [hint for hint in hints if hint]
+            policy.record_success(
+                state,
+                new_articles=detail["new_articles"],
+                hint_seconds=max(hints) if hints else None,
+            )
+        _schedule_source(state)
+        rescheduled.add(name)
+
+
+def _schedule_source(state: SourcePollState, delay_seconds: float | None = None) -> None:
+    """排定單一來源的下一次抓取（排程器啟動前只記錄時間，由 setup_scheduler 排入）"""
+    policy = get_poll_policy()
+    if delay_seconds is None:
+        run_at = policy.next_run(state)
+    else:
+        run_at = datetime.utcnow() + timedelta(seconds=delay_seconds)
+        state.next_run_at = run_at
+
+    if scheduler.running:
+        _add_source_job(state)
+
+
+def _add_source_job(state: SourcePollState) -> None:
+    """將來源的下一次抓取排入排程器
+
+    單次觸發的任務錯過時間（事件迴圈卡住、休眠喚醒）仍要執行，否則該來源不會再被排程。
+    """
+    scheduler.add_job(
+        fetch_source_job,
+        trigger=DateTrigger(run_date=state.next_run_at.replace(tzinfo=timezone.utc)),
+        args=[state.name],
+        id=f"fetch_rss:{state.name}",
+        name=f"RSS 抓取任務（{state.name}）",
+        replace_existing=True,
+        misfire_grace_time=None,
+        coalesce=True,
+    )
+
+
+async def fetch_source_job(source_name: str):
+    """單一來源的 RSS 抓取任務（依自適應間隔排程）"""
+    source = next((s for s in RSS_SOURCES if s["name"] == source_name), None)
+    if source is None:
+        return None
+    return await _run_fetch([source])
+
 
 async def fetch_rss_job():
-    """RSS 抓取排程任務（透過 asyncio.to_thread 非同步執行）"""
+    """RSS 抓取排程任務（所有來源同時下載）"""
+    return await _run_fetch(RSS_SOURCES)
+
+
+async def _run_fetch(sources: list[dict]):
+    """執行抓取並更新輪詢狀態
+
+    抓取或更新狀態途中出錯時，尚未重新排程的來源一律記為失敗並依退避間隔排定下一次。
+    """
+    fetcher = create_rss_fetcher()
+    rescheduled: set[str] = set()
     try:
-        fetcher = create_rss_fetcher()
-        result = await fetcher.fetch_all_sources_async()
-        print(f"[RSS 排程] 抓取完成: {result['new_articles']} 篇新文章")
+        result = await fetcher.fetch_all_sources_async(sources)
+        _apply_poll_results(result, rescheduled)
+        print(
+            f"[RSS 排程] 抓取完成: {result['new_articles']} 篇新文章"
+            f"（{result['near_duplicates']} 篇為近似重複），"
+            f"略過 {result['skipped']} 個未變更來源（耗時 {result['duration_seconds']} 秒）"
+        )
         return result
     except Exception as e:
         print(f"[RSS 排程] 錯誤: {str(e)}")
+    finally:
+        policy = get_poll_policy()
+        for source in sources:
+            if source["name"] not in rescheduled:
+                state = _get_poll_state(source["name"])
+                policy.record_failure(state)
+                _schedule_source(state)
+        await fetcher.db.close()
 
 
 async def extract_tags_job():
     """標籤提取排程任務（完全非同步）"""
     try:
         extractor = await create_tag_extractor()
-        result = await extractor.process_untagged_news(limit=10)
-        print(f"[標籤排程] 處理完成: {result['processed']} 篇已標籤")
+        result = await extractor.process_untagged_news(limit=get_settings().tag_job_limit)
+        print(
+            f"[標籤排程] 處理完成: {result['processed']} 篇已標籤"
+            f"（本地標籤 {result['local_tagged']} 篇），"
+            f"沿用群組標籤省下 {result['llm_calls_avoided']} 次 LLM 呼叫，"
+            f"{result['deferred']} 篇因限流留待下次"
+        )
         return result
     except Exception as e:
         print(f"[標籤排程] 錯誤: {str(e)}")
 
 
+async def reconcile_counters_job():
+    """計數器對帳排程任務：以 COUNT(*) 校正資料表筆數計數器"""
+    try:
+        async with AsyncSessionLocal() as db:
+            drift = await reconcile_counters(db)
+        if drift:
+            print(f"[計數器對帳] 已校正漂移: {drift}")
+        return drift
+    except Exception as e:
+        print(f"[計數器對帳] 錯誤: {str(e)}")
+
+
+async def index_vectors_job():
+    """向量補寫任務：啟動時補上索引中缺少的新聞與點子向量，達門檻時建立 IVF 分區"""
+    try:
+        async with AsyncSessionLocal() as db:
+            service = SimilarityService(db, get_news_index(), get_idea_index(), get_embedder())
+            added = await service.backfill()
+        print(
+            f"[向量索引] 補寫 {added['news']} 則新聞、{added['ideas']} 個點子"
+            f"（索引共 {len(service.news_index)} 則新聞，{service.news_index.partitions} 個分區）"
+        )
+        return added
+    except Exception as e:
+        print(f"[向量索引] 錯誤: {str(e)}")
+
+
+async def checkpoint_wal_job():
+    """WAL checkpoint 排程任務：把 WAL 寫回資料庫檔並截斷，避免 WAL 無限成長拖慢讀取"""
+    try:
+        result = await checkpoint_wal()
+        if result and result[0]:
+            print(f"[WAL 排程] checkpoint 因讀取中的交易未完成（{result[2]}/{result[1]} 頁）")
+        return result
+    except Exception as e:
+        print(f"[WAL 排程] 錯誤: {str(e)}")
+
+
+def get_source_schedules() -> list[dict]:
+    """取得各來源目前的輪詢間隔與下一次執行時間"""
+    return [
+        {
+            "source": source["name"],
+            "interval_seconds": round(state.interval_seconds, 1),
+            "next_run_at": state.next_run_at,
+            "last_polled_at": state.last_polled_at,
+            "last_status": state.last_status,
+            "last_new_articles": state.last_new_articles,
+            "publish_rate_per_hour": (
+                round(state.publish_rate, 3) if state.publish_rate is not None else None
+            ),
+            "hint_seconds": state.hint_seconds,
+            "failures": state.failures,
+        }
+        for source in RSS_SOURCES
+        for state in [_get_poll_state(source["name"])]
+    ]
+
+
 def setup_scheduler():
     """設定排程任務"""
     settings = get_settings()
-    interval_minutes = settings.rss_update_interval
 
-    # 新增 RSS 抓取任務（依設定間隔）
-    scheduler.add_job(
-        fetch_rss_job,
-        trigger=IntervalTrigger(minutes=interval_minutes),
-        id="fetch_rss",
-        name="RSS 抓取任務",
-        replace_existing=True
-    )
+    # 每個來源各自排程；首次抓取分散在最短間隔內，避免同時湧入
+    spread_seconds = settings.rss_min_interval * 60
+    for source in RSS_SOURCES:
+        state = _get_poll_state(source["name"])
+        _schedule_source(state, delay_seconds=random.uniform(0, spread_seconds))
+        _add_source_job(state)
 
     # 新增標籤提取任務（每 10 分鐘）
     scheduler.add_job(
@@ -56,8 +235,40 @@ def setup_scheduler():
         replace_existing=True
     )
 
-    print(f"[排程器] 已設定 RSS 抓取間隔: {interval_minutes} 分鐘")
+    # 新增計數器對帳任務
+    scheduler.add_job(
+        reconcile_counters_job,
+        trigger=IntervalTrigger(minutes=settings.counter_reconcile_interval),
+        id="reconcile_counters",
+        name="計數器對帳任務",
+        replace_existing=True
+    )
+
+    # 啟動時補寫一次向量索引
+    scheduler.add_job(
+        index_vectors_job,
+        trigger=DateTrigger(run_date=datetime.now(timezone.utc)),
+        id="index_vectors",
+        name="向量補寫任務",
+        replace_existing=True
+    )
+
+    # 新增 WAL checkpoint 任務（僅檔案型 SQLite）
+    if uses_sqlite_profile(settings.database_url):
+        scheduler.add_job(
+            checkpoint_wal_job,
+            trigger=IntervalTrigger(minutes=settings.sqlite_checkpoint_interval),
+            id="checkpoint_wal",
+            name="WAL checkpoint 任務",
+            replace_existing=True
+        )
+
+    print(
+        f"[排程器] 已設定 {len(RSS_SOURCES)} 個來源的自適應 RSS 抓取"
+        f"（{settings.rss_min_interval}-{settings.rss_max_interval} 分鐘）"
+    )
     print("[排程器] 已設定標籤提取間隔: 10 分鐘")
+    print(f"[排程器] 已設定計數器對帳間隔: {settings.counter_reconcile_interval} 分鐘")
 
 
 def start_scheduler():
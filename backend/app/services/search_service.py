@@ -0,0 +1,205 @@
+"""全文搜尋服務（SQLite FTS5）
+
+新聞（標題、摘要）與點子（標題、內容、魔鬼審計）各有一張 FTS5 外部內容表，
+由觸發器與原資料表同步（見 migrations._migrate_search_indexes）。
+索引使用 trigram 分詞：中文沒有空白斷詞，trigram 讓任意三字以上的子字串都能走索引。
+
+排序有兩種：
+- bm25：命中數不超過 search_rank_limit 時依相關度排序。BM25 需先統計所有命中才能排序，
+  成本與命中數成正比。
+- recent：命中過多（近似停用詞）的關鍵字，或只有短關鍵字時，依新到舊排序，取滿一頁即停止。
+少於三字的關鍵字（如「晶片」）無法以 MATCH 查詢，改為在候選列上以 LIKE 過濾。
+"""
+import re
+from datetime import datetime
+from typing import Literal, NamedTuple, Optional
+
+from sqlalchemy import and_, func, literal, literal_column, or_, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.exceptions import InvalidCursorError, InvalidSearchQueryError, SearchUnavailableError
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.news import Idea, News
+
+Ranking = Literal["bm25", "recent"]
+
+
+class SearchIndex(NamedTuple):
+    """一張 FTS5 索引：來源資料表、索引欄位與各欄位的 BM25 權重"""
+    fts_table: str
+    content_table: str
+    columns: tuple[str, ...]
+    weights: tuple[float, ...]
+
+
+SEARCH_INDEXES = {
+    "news": SearchIndex("news_fts", "news", ("title", "summary"), (10.0, 1.0)),
+    "ideas": SearchIndex("ideas_fts", "ideas", ("title", "content", "devil_audit"), (10.0, 2.0, 1.0)),
+}
+
+SEARCH_MODELS = {"news": News, "ideas": Idea}
+
+
+class SearchHit(NamedTuple):
+    """一筆搜尋結果（score 為 BM25，越小越相關；依新到舊排序時為 0）"""
+    id: int
+    title: str
+    snippet: str
+    score: float
+    created_at: Optional[datetime]
+
+
+class SearchPage(NamedTuple):
+    """一頁搜尋結果、下一頁游標與本次的排序方式"""
+    items: list[SearchHit]
+    next_cursor: Optional[str]
+    ranking: Ranking
+
+
+class SearchService:
+    """全文搜尋服務"""
+
+    # trigram 分詞：少於三字的關鍵字無法 MATCH
+    MIN_MATCH_LENGTH = 3
+    MAX_TERMS = 8
+    SNIPPET_TOKENS = 32
+    MARK_OPEN = "<mark>"
+    MARK_CLOSE = "</mark>"
+    ELLIPSIS = "…"
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def search(
+        self,
+        query: str,
+        scope: str = "news",
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> SearchPage:
+        """搜尋新聞或點子並以游標分頁
+
+        關鍵字以空白分隔，全部符合才會命中。新聞不回傳近似重複的群組成員。
+        游標記住第一頁決定的排序方式與上一頁最後一筆的位置；bm25 排序在分頁期間有新資料寫入時，
+        統計變動可能讓少數結果重複或略過。
+        """
+        if self.db.get_bind().dialect.name != "sqlite":
+            raise SearchUnavailableError()
+        terms = self._parse_terms(query)
+        if not terms:
+            raise InvalidSearchQueryError()
+
+        index, model = SEARCH_INDEXES[scope], SEARCH_MODELS[scope]
+        long_terms = [term for term in terms if len(term) >= self.MIN_MATCH_LENGTH]
+        short_terms = [term for term in terms if len(term) < self.MIN_MATCH_LENGTH]
+        fts = literal_column(index.fts_table)
+        text_columns = [getattr(model, column) for column in index.columns]
+        match = " ".join(self._quote(term) for term in long_terms)
+
+        last_score, last_id = self._decode_cursor(cursor) if cursor else (None, None)
+        if cursor:
+            ranking: Ranking = "recent" if last_score is None else "bm25"
+        elif long_terms and await self._match_count(index, match) <= get_settings().search_rank_limit:
+            ranking = "bm25"
+        else:
+            ranking = "recent"
+
+        if long_terms:
+            # 依 FTS 表的 rowid 排序與分頁，查詢規劃器才會從 MATCH 出發並在取滿一頁時停止
+            row_id = literal_column(f"{index.fts_table}.rowid")
+            score = func.bm25(fts, *index.weights) if ranking == "bm25" else literal(0.0)
+            snippet = func.snippet(
+                fts, -1, self.MARK_OPEN, self.MARK_CLOSE, self.ELLIPSIS, self.SNIPPET_TOKENS
+            )
+            stmt = (
+                select(model.id, model.title, model.created_at, score.label("score"), snippet.label("snippet"))
+                .select_from(table(index.fts_table))
+                .join(model, model.id == row_id)
+                .where(fts.match(match))
+            )
+        else:
+            row_id = model.id
+            score = literal(0.0)
+            stmt = select(
+                model.id, model.title, model.created_at, score.label("score"),
+                *(column.label(f"text_{column.key}") for column in text_columns),
+            )
+
+        for term in short_terms:
+            stmt = stmt.where(or_(*(column.contains(term, autoescape=True) for column in text_columns)))
+        if model is News:
+            stmt = stmt.where(News.cluster_id.is_(None))
+
+        if ranking == "bm25":
+            if cursor:
+                stmt = stmt.where(or_(score > last_score, and_(score == last_score, row_id < last_id)))
+            stmt = stmt.order_by(score, row_id.desc())
+        else:
+            if cursor:
+                stmt = stmt.where(row_id < last_id)
+            stmt = stmt.order_by(row_id.desc())
+
+        rows = (await self.db.execute(stmt.limit(limit + 1))).all()
+        hits = [
+            SearchHit(
+                row.id,
+                row.title,
+                row.snippet if long_terms else self._highlight(
+                    [getattr(row, f"text_{column}") for column in index.columns], terms
+                ),
+                row.score,
+                row.created_at,
+            )
+            for row in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor([hits[-1].score if ranking == "bm25" else None, hits[-1].id])
+        return SearchPage(hits, next_cursor, ranking)
+
+    async def _match_count(self, index: SearchIndex, match: str) -> int:
+        """命中數（最多數到 search_rank_limit + 1，FTS5 依序讀取，數到上限即停止）"""
+        fts = literal_column(index.fts_table)
+        matches = (
+            select(literal_column("rowid"))
+            .select_from(table(index.fts_table))
+            .where(fts.match(match))
+            .limit(get_settings().search_rank_limit + 1)
+            .subquery()
+        )
+        return (await self.db.execute(select(func.count()).select_from(matches))).scalar_one()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple[Optional[float], int]:
+        """游標為 [BM25 分數（依新到舊排序時為 None）, id]"""
+        last_score, last_id = decode_cursor(cursor, 2)
+        if not (last_score is None or isinstance(last_score, (int, float))) or not isinstance(last_id, int):
+            raise InvalidCursorError()
+        return last_score, last_id
+
+    def _parse_terms(self, query: str) -> list[str]:
+        """以空白切出關鍵字（去除 FTS5 語法用的引號，重複的只保留一個）"""
+        terms = (term.replace('"', "") for term in query.split())
+        return list(dict.fromkeys(term for term in terms if term))[:self.MAX_TERMS]
+
+    @staticmethod
+    def _quote(term: str) -> str:
+        """關鍵字包成 FTS5 片語，避免被解析為 AND / OR / NEAR 等語法"""
+        return f'"{term}"'
+
+    def _highlight(self, texts: list[Optional[str]], terms: list[str]) -> str:
+        """沒有 MATCH 時自行擷取片段：取第一個含關鍵字的欄位，標記所有關鍵字"""
+        pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+        for text_value in texts:
+            if not text_value or not (found := pattern.search(text_value)):
+                continue
+            start = max(0, found.start() - self.SNIPPET_TOKENS // 2)
+            end = start + self.SNIPPET_TOKENS
+            excerpt = pattern.sub(
+                lambda m: f"{self.MARK_OPEN}{m.group(0)}{self.MARK_CLOSE}", text_value[start:end]
+            )
+            prefix = self.ELLIPSIS if start > 0 else ""
+            suffix = self.ELLIPSIS if end < len(text_value) else ""
+            return f"{prefix}{excerpt}{suffix}"
+        return ""
@@ -0,0 +1,64 @@
+"""SimHash 指紋（新聞近似重複偵測）"""
+import hashlib
+import html
+import re
+
+# 英數單字，或連續的中日韓文字
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[぀-ヿ㐀-䶿一-鿿가-힯]+")
+_TAG_RE = re.compile(r"<[^>]+>")
+
+_MASK_64 = (1 << 64) - 1
+
+# 標題特徵權重與摘要取用長度
+TITLE_WEIGHT = 3
+SUMMARY_CHARS = 400
+
+
+def tokenize(text: str) -> list[str]:
+    """斷詞：英文以單字為單位，中日韓文字以字元 bigram 為單位"""
+    text = html.unescape(_TAG_RE.sub(" ", text or "")).lower()
+    tokens: list[str] = []
+    for chunk in _TOKEN_RE.findall(text):
+        if chunk.isascii():
+            tokens.append(chunk)
+        elif len(chunk) == 1:
+            tokens.append(chunk)
+        else:
+            tokens.extend(chunk[i:i + 2] for i in range(len(chunk) - 1))
+    return tokens
+
+
+def simhash64(features: dict[str, int]) -> int:
+    """由（特徵 → 權重）計算 64-bit SimHash，回傳有號整數（可直接存入 SQLite INTEGER）"""
+    weights = [0] * 64
+    if not features:
+        return 0
+
+    for token, weight in features.items():
+        digest = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += weight if digest >> bit & 1 else -weight
+
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """兩個 SimHash 的漢明距離"""
+    return ((a ^ b) & _MASK_64).bit_count()
+
+
+def news_fingerprint(title: str, summary: str | None) -> int:
+    """以標題與摘要計算新聞指紋
+
+    各家媒體的摘要寫法差異大，標題特徵給予較高權重，摘要只取開頭一段。
+    """
+    features: dict[str, int] = {}
+    for token in tokenize((summary or "")[:SUMMARY_CHARS]):
+        features[token] = features.get(token, 0) + 1
+    for token in tokenize(title):
+        features[token] = features.get(token, 0) + TITLE_WEIGHT
+    return simhash64(features)
@@ -0,0 +1,116 @@
+"""語意相似服務（新聞與點子的向量近鄰）"""
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.exceptions import NotFoundError
+from app.models.news import Idea, News
+from app.services.embedding import HashingEmbedder
+from app.services.vector_index import VectorIndex
+
+
+class SimilarityService:
+    """以本地向量索引查詢相似的新聞與點子（非同步 DB + DI）
+
+    索引中還沒有向量的項目（例如寫入索引前中斷）在查詢時即時計算並補寫。
+    向量計算、寫入與查詢都在執行緒中進行，不卡住事件迴圈。
+    """
+
+    # 相似新聞會濾掉近似重複的群組成員，向索引多取一些候選
+    OVERFETCH = 3
+    BACKFILL_BATCH = 2000
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        news_index: VectorIndex,
+        idea_index: VectorIndex,
+        embedder: HashingEmbedder,
+    ):
+        self.db = db
+        self.news_index = news_index
+        self.idea_index = idea_index
+        self.embedder = embedder
+
+    async def similar_news(self, news_id: int, limit: int = 10) -> list[tuple[News, float]]:
+        """與指定新聞最相似的新聞與餘弦相似度（排除自身所屬的群組與群組成員）"""
+        news = await self.db.get(News, news_id)
+        if news is None:
+            raise NotFoundError("新聞不存在")
+        vector = await self._vector(self.news_index, news.id, news.title, news.summary)
+        if vector is None:
+            return []
+
+        hits = await asyncio.to_thread(
+            self.news_index.search, vector, limit * self.OVERFETCH, [news.id, news.cluster_id or news.id]
+        )
+        stmt = (
+            select(News)
+            .where(News.id.in_([item_id for item_id, _ in hits]), News.cluster_id.is_(None))
+            .options(selectinload(News.tags))
+        )
+        by_id = {item.id: item for item in (await self.db.execute(stmt)).scalars()}
+        return [(by_id[item_id], score) for item_id, score in hits if item_id in by_id][:limit]
+
+    async def similar_ideas(self, idea_id: int, limit: int = 10) -> list[tuple[Idea, float]]:
+        """與指定點子最相似的點子與餘弦相似度"""
+        idea = await self.db.get(Idea, idea_id)
+        if idea is None:
+            raise NotFoundError("點子不存在")
+        vector = await self._vector(self.idea_index, idea.id, idea.title, idea.content)
+        if vector is None:
+            return []
+
+        hits = await asyncio.to_thread(self.idea_index.search, vector, limit, [idea.id])
+        stmt = select(Idea).where(Idea.id.in_([item_id for item_id, _ in hits]))
+        by_id = {item.id: item for item in (await self.db.execute(stmt)).scalars()}
+        return [(by_id[item_id], score) for item_id, score in hits if item_id in by_id]
+
+    async def _vector(self, index: VectorIndex, item_id: int, title: str, body: str | None):
+        """索引中的向量，沒有時即時計算並寫入；沒有任何詞時回傳 None"""
+        def load():
+            vector = index.get(item_id)
+            if vector is None:
+                vector = self.embedder.embed(title, body)
+                if not vector.any():
+                    return None
+                index.add(item_id, vector)
+            return vector
+
+        return await asyncio.to_thread(load)
+
+    async def backfill(self) -> dict[str, int]:
+        """補寫索引中缺少的新聞與點子向量，達門檻時建立 IVF 分區，回傳各自補寫的筆數"""
+        return {
+            "news": await self._backfill(self.news_index, News.id, News.title, News.summary),
+            "ideas": await self._backfill(self.idea_index, Idea.id, Idea.title, Idea.content),
+        }
+
+    async def _backfill(self, index: VectorIndex, id_column, title_column, body_column) -> int:
+        """依 ID 分批找出缺少向量的列，計算後寫入"""
+        added, last_id = 0, 0
+        while True:
+            ids = list((await self.db.execute(
+                select(id_column).where(id_column > last_id).order_by(id_column).limit(self.BACKFILL_BATCH)
+            )).scalars())
+            if not ids:
+                break
+            last_id = ids[-1]
+            missing = index.missing(ids)
+            if not missing:
+                continue
+            rows = (await self.db.execute(
+                select(id_column, title_column, body_column).where(id_column.in_(missing))
+            )).tuples().all()
+            texts = [(title, body) for _, title, body in rows]
+
+            def write() -> None:
+                # add_many 可能擴充 memmap 並重建 IVF 成員，與向量計算一起在執行緒中進行
+                index.add_many([row_id for row_id, _, _ in rows], self.embedder.embed_many(texts))
+
+            await asyncio.to_thread(write)
+            added += len(rows)
+        await asyncio.to_thread(index.maybe_train)
+        return added
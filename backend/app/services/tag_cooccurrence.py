@@ -0,0 +1,180 @@
+"""標籤共現矩陣（行程內，啟動時預熱，標籤寫入提交後增量更新）
+
+供點子生成挑選新聞配對：
+- complementary：兩則新聞沒有共同標籤，但標籤之間常一起出現（PMI > 0），主題相關而角度不同
+- distant：兩則新聞的標籤一起出現的頻率不高於隨機（PMI ≤ 0），跨領域配對
+- random：均勻隨機
+配對只讀記憶體中的結構，不查資料庫。
+"""
+import math
+import random
+from array import array
+from functools import lru_cache
+from typing import Iterable, Literal, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.news import News, news_tags
+
+PairStrategy = Literal["complementary", "distant", "random"]
+
+
+class TagCooccurrence:
+    """news_tags 的稀疏共現矩陣與 PMI
+
+    只統計群組代表新聞（近似重複的成員會讓同一事件重複計數）。
+    共現次數以 dict of dict 儲存（稀疏 DOK 格式，可逐筆增量更新），
+    每個標籤另有新聞 ID 的 array，可在 O(1) 內隨機抽出帶有該標籤的新聞。
+    complementary 依 PMI 加權抽樣共現標籤時使用快取的累積權重，
+    新聞數成長超過 NEIGHBOR_REFRESH 比例後才重新計算該標籤的權重。
+    """
+
+    # 每次配對最多嘗試的候選數
+    MAX_ATTEMPTS = 32
+    NEIGHBOR_REFRESH = 0.01
+
+    def __init__(self):
+        # 標籤 → 帶有該標籤的新聞數
+        self._counts: dict[int, int] = {}
+        # 標籤 → {共現標籤: 同時帶有兩者的新聞數}（對稱）
+        self._pairs: dict[int, dict[int, int]] = {}
+        # 標籤 → 帶有該標籤的新聞 ID
+        self._postings: dict[int, array] = {}
+        # 新聞 → 已計入的標籤（重複寫入同一關聯時不重複計數）
+        self._news_tags: dict[int, tuple[int, ...]] = {}
+        self._news_ids = array("q")
+        # 標籤 → (計算時的新聞數, PMI > 0 的共現標籤, 累積 PMI 權重)
+        self._neighbors: dict[int, tuple[int, list[int], list[float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._news_tags)
+
+    async def warm(self, db: AsyncSession) -> int:
+        """載入所有代表新聞的標籤，回傳新聞數"""
+        stmt = (
+            select(news_tags.c.news_id, news_tags.c.tag_id)
+            .join(News, News.id == news_tags.c.news_id)
+            .where(News.cluster_id.is_(None))
+            .order_by(news_tags.c.news_id)
+        )
+        news_id, tag_ids = None, []
+        for row_news_id, tag_id in (await db.execute(stmt)).tuples():
+            if row_news_id != news_id:
+                if tag_ids:
+                    self.add(news_id, tag_ids)
+                news_id, tag_ids = row_news_id, []
+            tag_ids.append(tag_id)
+        if tag_ids:
+            self.add(news_id, tag_ids)
+        return len(self)
+
+    def add(self, news_id: int, tag_ids: Iterable[int]) -> None:
+        """計入一則新聞新增的標籤（已提交的關聯；已計入的標籤略過）"""
+        known = self._news_tags.get(news_id, ())
+        added = [tag_id for tag_id in dict.fromkeys(tag_ids) if tag_id not in known]
+        if not added:
+            return
+        if not known:
+            self._news_ids.append(news_id)
+
+        merged = list(known)
+        for tag_id in added:
+            self._counts[tag_id] = self._counts.get(tag_id, 0) + 1
+            self._postings.setdefault(tag_id, array("q")).append(news_id)
+            row = self._pairs.setdefault(tag_id, {})
+            for other_id in merged:
+                row[other_id] = row.get(other_id, 0) + 1
+                other_row = self._pairs.setdefault(other_id, {})
+                other_row[tag_id] = other_row.get(tag_id, 0) + 1
+            merged.append(tag_id)
+        self._news_tags[news_id] = tuple(merged)
+
+    def count(self, tag_a: int, tag_b: int) -> int:
+        """同時帶有兩個標籤的新聞數"""
+        return self._pairs.get(tag_a, {}).get(tag_b, 0)
+
+    def pmi(self, tag_a: int, tag_b: int) -> float:
+        """點互資訊 log(P(a,b) / (P(a)P(b)))，從未共現時為 -inf"""
+        together = self.count(tag_a, tag_b)
+        if not together:
+            return -math.inf
+        return math.log(together * len(self) / (self._counts[tag_a] * self._counts[tag_b]))
+
+    def pick_pair(self, strategy: PairStrategy = "random") -> Optional[tuple[int, int]]:
+        """依策略挑出兩則新聞 ID，新聞不足兩則時回傳 None
+
+        嘗試 MAX_ATTEMPTS 次仍找不到符合策略的配對時，distant 取嘗試過最不相關的一組，
+        其餘改為隨機配對。
+        """
+        if len(self._news_ids) < 2:
+            return None
+        pair = None
+        if strategy == "complementary":
+            pair = self._pick_complementary()
+        elif strategy == "distant":
+            pair = self._pick_distant()
+        return pair or self._random_pair()
+
+    def _random_pair(self) -> tuple[int, int]:
+        first, second = random.sample(range(len(self._news_ids)), 2)
+        return self._news_ids[first], self._news_ids[second]
+
+    def _pick_complementary(self) -> Optional[tuple[int, int]]:
+        """從隨機新聞的一個標籤出發，依 PMI 加權走到常與它共現、但該新聞沒有的標籤，再抽出帶該標籤的新聞"""
+        for _ in range(self.MAX_ATTEMPTS):
+            news_a = random.choice(self._news_ids)
+            tags_a = self._news_tags[news_a]
+            candidates, cum_weights = self._positive_neighbors(random.choice(tags_a))
+            if not candidates:
+                continue
+            tag = random.choices(candidates, cum_weights=cum_weights)[0]
+            if tag in tags_a:
+                continue
+            postings = self._postings[tag]
+            news_b = postings[random.randrange(len(postings))]
+            if set(tags_a).isdisjoint(self._news_tags[news_b]):
+                return news_a, news_b
+        return None
+
+    def _positive_neighbors(self, tag_id: int) -> tuple[list[int], list[float]]:
+        """PMI > 0 的共現標籤與累積權重（快取，新聞數成長超過 NEIGHBOR_REFRESH 才重新計算）"""
+        cached = self._neighbors.get(tag_id)
+        if cached is not None and len(self) <= cached[0] * (1 + self.NEIGHBOR_REFRESH):
+            return cached[1], cached[2]
+        candidates, cum_weights, total = [], [], 0.0
+        scale = len(self) / self._counts[tag_id]
+        for other_id, together in self._pairs.get(tag_id, {}).items():
+            score = math.log(together * scale / self._counts[other_id])
+            if score > 0:
+                total += score
+                candidates.append(other_id)
+                cum_weights.append(total)
+        self._neighbors[tag_id] = (len(self), candidates, cum_weights)
+        return candidates, cum_weights
+
+    def _pick_distant(self) -> Optional[tuple[int, int]]:
+        """隨機抽兩則新聞，直到兩者的標籤間最大的 PMI 不超過 0"""
+        best, best_score = None, math.inf
+        for _ in range(self.MAX_ATTEMPTS):
+            news_a, news_b = self._random_pair()
+            score = self._relatedness(self._news_tags[news_a], self._news_tags[news_b])
+            if score is None:
+                continue
+            if score <= 0:
+                return news_a, news_b
+            if score < best_score:
+                best, best_score = (news_a, news_b), score
+        return best
+
+    def _relatedness(self, tags_a: tuple[int, ...], tags_b: tuple[int, ...]) -> Optional[float]:
+        """兩組標籤間最大的 PMI；有共同標籤（同一主題）時回傳 None"""
+        if not set(tags_a).isdisjoint(tags_b):
+            return None
+        return max(self.pmi(tag_a, tag_b) for tag_a in tags_a for tag_b in tags_b)
+
+
+@lru_cache(maxsize=1)
+def get_tag_cooccurrence() -> TagCooccurrence:
+    """取得標籤共現矩陣（單例）"""
+    return TagCooccurrence()
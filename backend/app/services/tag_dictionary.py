@@ -0,0 +1,94 @@
+"""標籤名稱 → ID 的行程內字典（啟動時預熱，新增標籤提交後更新）"""
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import dialect_insert
+from app.models.news import Tag
+from app.services.counters import increment
+
+
+class ResolvedTags(NamedTuple):
+    """名稱對應的 ID，以及本次交易新建的標籤（提交後才可交給 remember）"""
+    ids: dict[str, int]
+    created: dict[str, int]
+
+
+class TagDictionary:
+    """標籤名稱 → ID 快取
+
+    字典中只放已提交的標籤：查詢到的既有標籤立即加入，本次新建的標籤要等
+    呼叫端提交後以 remember 加入，交易回滾時字典不會留下不存在的 ID。
+    標籤不會被刪除，因此快取不需要失效。
+    """
+
+    # 找不到的名稱最多重新嘗試寫入的次數（並行寫入者回滾時才會發生）
+    MAX_ATTEMPTS = 2
+
+    def __init__(self):
+        self._ids: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    async def warm(self, db: AsyncSession) -> int:
+        """載入所有標籤，回傳字典大小"""
+        result = await db.execute(select(Tag.name, Tag.id))
+        self._ids.update(result.tuples().all())
+        return len(self._ids)
+
+    def remember(self, tags: dict[str, int]) -> None:
+        """加入已提交的標籤"""
+        self._ids.update(tags)
+
+    async def resolve(self, db: AsyncSession, tag_names: Iterable[str]) -> ResolvedTags:
+        """取得標籤 ID，不存在的以一次 INSERT ... ON CONFLICT DO NOTHING RETURNING 建立
+
+        與其他寫入者同時建立同名標籤時，衝突的名稱不會回傳 ID，再以一次查詢取得對方已提交的標籤。
+        """
+        ids: dict[str, int] = {}
+        created: dict[str, int] = {}
+        missing = set()
+        for name in tag_names:
+            if name in self._ids:
+                ids[name] = self._ids[name]
+            else:
+                missing.add(name)
+
+        for _ in range(self.MAX_ATTEMPTS):
+            if not missing:
+                break
+            now = datetime.utcnow()
+            stmt = (
+                dialect_insert(db, Tag)
+                .values([{"name": name, "created_at": now} for name in sorted(missing)])
+                .on_conflict_do_nothing(index_elements=["name"])
+                .returning(Tag.name, Tag.id)
+            )
+            inserted = dict((await db.execute(stmt)).tuples().all())
+            if inserted:
+                await db.execute(increment("tags", len(inserted)))
+                created.update(inserted)
+                missing -= inserted.keys()
+
+            if missing:
+                result = await db.execute(select(Tag.name, Tag.id).where(Tag.name.in_(missing)))
+                existing = dict(result.tuples().all())
+                self._ids.update(existing)
+                ids.update(existing)
+                missing -= existing.keys()
+
+        if missing:
+            raise RuntimeError(f"無法建立標籤: {', '.join(sorted(missing))}")
+
+        ids.update(created)
+        return ResolvedTags(ids, created)
+
+
+@lru_cache(maxsize=1)
+def get_tag_dictionary() -> TagDictionary:
+    """取得標籤字典（單例）"""
+    return TagDictionary()
@@ -1,21 +1,48 @@
 """標籤提取服務（非同步版本）"""
-from sqlalchemy import select
+import asyncio
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import literal, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from app.models.news import News, Tag
+from app.models.news import News, news_tags
 from app.services.llm_client import VercelLLMClient
-from app.core.database import AsyncSessionLocal
+from app.services.local_tagger import LocalTagger, get_local_tagger
+from app.services.tag_cooccurrence import TagCooccurrence, get_tag_cooccurrence
+from app.services.tag_dictionary import ResolvedTags, TagDictionary, get_tag_dictionary
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal, dialect_insert
+from app.core.exceptions import LLMRateLimitError
 
 
 class TagExtractor:
-    """標籤提取器類別（非同步 DB + DI）"""
+    """標籤提取器類別（非同步 DB + DI）
+
+    注入 LocalTagger 時先以本地標籤器處理，信心達 local_tagger_threshold 的新聞不呼叫 LLM。
+    標籤名稱經 TagDictionary 解析為 ID，寫入時不載入 Tag 物件。
+    注入 TagCooccurrence 時，提交後把代表新聞的標籤計入共現矩陣。
+    """
 
-    def __init__(self, db: AsyncSession, llm_client: VercelLLMClient):
+    def __init__(
+        self,
+        db: AsyncSession,
+        llm_client: VercelLLMClient,
+        local_tagger: Optional[LocalTagger] = None,
+        tag_dictionary: Optional[TagDictionary] = None,
+        cooccurrence: Optional[TagCooccurrence] = None,
+    ):
         self.db = db
         self.llm_client = llm_client
+        self.local_tagger = local_tagger
+        # 未注入時使用獨立的空字典（只查資料庫），正式環境注入行程共用的字典
+        self.tag_dictionary = tag_dictionary if tag_dictionary is not None else TagDictionary()
+        self.cooccurrence = cooccurrence
 
-    async def extract_and_save_tags(self, news: News) -> list[Tag]:
-        """從新聞中提取標籤並儲存"""
+    async def extract_and_save_tags(self, news: News) -> list[str]:
+        """從新聞中提取標籤並儲存，回傳標籤名稱"""
         # 取得新聞標題和摘要（確保為字串類型）
         news_title: str = str(news.title) if news.title else ""
         news_summary: str = str(news.summary) if news.summary else ""
@@ -25,38 +52,107 @@ class TagExtractor:
             news_summary=news_summary
         )
 
-        tags = []
-        for tag_name in tag_names:
-            # 查找或建立標籤
-            tag = await self._get_or_create_tag(tag_name)
-            tags.append(tag)
+        return await self._save_tags(news, tag_names, "llm")
 
-        # 關聯標籤到新聞
-        news.tags = tags
-        await self.db.commit()
+    async def _save_tags(self, news: News, tag_names: list[str], source: str) -> list[str]:
+        """將標籤名稱寫入並關聯到新聞（source 為標籤來源）"""
+        items = [(news, tag_names)]
+        try:
+            resolved = await self._write_tags(items, source)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        self._remember(items, resolved)
+        return list(dict.fromkeys(tag_names))
 
-        return tags
+    async def _write_tags(self, items: list[tuple[News, list[str]]], source: str) -> ResolvedTags:
+        """寫入多則新聞的標籤（不提交），回傳標籤名稱解析結果（提交後交給 _remember）
 
-    async def _get_or_create_tag(self, tag_name: str) -> Tag:
-        """取得或建立標籤（非同步）"""
-        stmt = select(Tag).where(Tag.name == tag_name)
-        result = await self.db.execute(stmt)
-        tag = result.scalar_one_or_none()
+        標籤 ID 由標籤字典解析（新標籤一次 upsert），news_tags 以一次多列 INSERT 寫入，
+        已存在的關聯（並行的標籤任務寫過同一則新聞）直接略過。
+        沒有任何標籤的新聞不標記 tagged_at，留在待標籤佇列。
+        """
+        resolved = await self.tag_dictionary.resolve(
+            self.db, (name for _, tag_names in items for name in tag_names)
+        )
+        rows = [
+            {"news_id": news.id, "tag_id": resolved.ids[name]}
+            for news, tag_names in items
+            for name in dict.fromkeys(tag_names)
+        ]
+        if rows:
+            await self.db.execute(dialect_insert(self.db, news_tags).values(rows).on_conflict_do_nothing())
+            await self._mark_tagged({row["news_id"] for row in rows}, source)
+        # 關聯是以 SQL 直接寫入，讓已載入的標籤集合在下次查詢時重新載入
+        for news, _ in items:
+            self.db.expire(news, ["tags"])
+        return resolved
+
+    def _remember(self, items: list[tuple[News, list[str]]], resolved: ResolvedTags) -> None:
+        """提交後更新標籤字典與共現矩陣（近似重複的群組成員不計入共現）"""
+        self.tag_dictionary.remember(resolved.created)
+        if self.cooccurrence is None:
+            return
+        for news, tag_names in items:
+            if news.cluster_id is None and tag_names:
+                self.cooccurrence.add(news.id, [resolved.ids[name] for name in tag_names])
+
+    async def _mark_tagged(self, news_ids: set[int], source: str) -> None:
+        """標記新聞的已標籤時間（離開待標籤佇列）與標籤來源"""
+        await self.db.execute(
+            update(News).where(News.id.in_(news_ids)).values(tagged_at=datetime.utcnow(), tag_source=source)
+        )
 
-        if not tag:
-            tag = Tag(name=tag_name)
-            self.db.add(tag)
-            await self.db.flush()
+    async def reuse_cluster_tags(self, news: News) -> int:
+        """近似重複的新聞沿用群組代表新聞的標籤（不呼叫 LLM），回傳沿用的標籤數
 
-        return tag
+        以一次 INSERT ... SELECT 複製代表新聞的關聯；代表新聞尚未有標籤時回傳 0。
+        """
+        if news.cluster_id is None:
+            return 0
 
-    async def process_untagged_news(self, limit: int = 10) -> dict:
-        """處理尚未標籤的新聞"""
-        # 取得未標籤的新聞
+        copy_tags = dialect_insert(self.db, news_tags).from_select(
+            ["news_id", "tag_id"],
+            select(literal(news.id), news_tags.c.tag_id).where(news_tags.c.news_id == news.cluster_id),
+        ).on_conflict_do_nothing()
+        try:
+            copied = (await self.db.execute(copy_tags)).rowcount
+            if copied:
+                await self._mark_tagged({news.id}, "cluster")
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        self.db.expire(news, ["tags"])
+        return copied
+
+    async def process_untagged_news(
+        self,
+        limit: int = 10,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ) -> dict:
+        """處理尚未標籤的新聞
+
+        本地標籤器有信心的新聞直接寫入；其餘群組代表新聞以每批 batch_size 則合併成一次 LLM 呼叫，
+        回應無法解析的項目才改為單篇呼叫。
+        concurrency 個 worker 同時呼叫 LLM（實際速率由 LLM 客戶端的 RateLimiter 控制），
+        結果經佇列交給單一寫入者累積後一次 commit，DB 寫入不會卡住 LLM 呼叫。
+        重試後仍被限流時停止派發新的批次，剩餘新聞留待下次排程（計入 deferred）。
+        之後近似重複的新聞沿用代表新聞的標籤，省下重複的 LLM 呼叫。
+        """
+        settings = get_settings()
+        batch_size = batch_size or settings.tag_batch_size
+        concurrency = concurrency or settings.llm_max_concurrency
+        # 取得未標籤的新聞（代表新聞優先，群組成員的 ID 必大於代表新聞）
+        # 預先載入（空的）標籤集合，避免指派 news.tags 時在非同步 Session 觸發 lazy load
         stmt = (
             select(News)
-            .where(~News.tags.any())
+            .where(News.tagged_at.is_(None))
+            .order_by(News.cluster_id.isnot(None), News.id)
             .limit(limit)
+            .options(selectinload(News.tags))
         )
         result = await self.db.execute(stmt)
         untagged_news = list(result.scalars().all())
@@ -64,26 +160,183 @@ class TagExtractor:
         results = {
             "processed": 0,
             "failed": 0,
+            "deferred": 0,
+            "local_tagged": 0,
+            "llm_calls_avoided": 0,
+            "batch_calls": 0,
+            "fallback_calls": 0,
             "errors": []
         }
 
-        for news in untagged_news:
+        canonical_news = [news for news in untagged_news if news.cluster_id is None]
+        cluster_members = [news for news in untagged_news if news.cluster_id is not None]
+
+        tagged: asyncio.Queue = asyncio.Queue()
+        llm_news = []
+        for news in canonical_news:
+            local_tags = self._predict_locally(news)
+            if local_tags:
+                results["local_tagged"] += 1
+                await tagged.put((news, local_tags, "local"))
+            else:
+                llm_news.append(news)
+
+        pending = deque(
+            llm_news[start:start + batch_size]
+            for start in range(0, len(llm_news), batch_size)
+        )
+        rate_limited = asyncio.Event()
+
+        async def worker() -> None:
+            while pending:
+                batch = pending.popleft()
+                if rate_limited.is_set():
+                    results["deferred"] += len(batch)
+                    continue
+                await self._tag_batch(batch, results, tagged, rate_limited)
+
+        writer = asyncio.create_task(self._write_tagged(tagged, results))
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(pending))))))
+        await tagged.put(None)
+        await writer
+
+        for news in cluster_members:
             try:
-                await self.extract_and_save_tags(news)
+                if await self.reuse_cluster_tags(news):
+                    results["llm_calls_avoided"] += 1
+                elif local_tags := self._predict_locally(news):
+                    results["local_tagged"] += 1
+                    await self._save_tags(news, local_tags, "local")
+                elif rate_limited.is_set():
+                    results["deferred"] += 1
+                    continue
+                else:
+                    await self.extract_and_save_tags(news)
                 results["processed"] += 1
+            except LLMRateLimitError:
+                rate_limited.set()
+                results["deferred"] += 1
             except Exception as e:
-                results["failed"] += 1
-                results["errors"].append({
-                    "news_id": news.id,
-                    "error": str(e)
-                })
+                self._record_failure(results, news, e)
 
         return results
 
+    def _predict_locally(self, news: News) -> Optional[list[str]]:
+        """本地標籤器信心達門檻時回傳標籤，否則回傳 None（交給 LLM）"""
+        if self.local_tagger is None:
+            return None
+        prediction = self.local_tagger.predict(str(news.title or ""), str(news.summary or ""))
+        if prediction.confidence < get_settings().local_tagger_threshold:
+            return None
+        return prediction.tags
+
+    async def _tag_batch(
+        self,
+        batch: list[News],
+        results: dict,
+        tagged: asyncio.Queue,
+        rate_limited: asyncio.Event,
+    ) -> None:
+        """以一次 LLM 呼叫標籤一批新聞，解析失敗的項目改以單篇呼叫補救
+
+        只呼叫 LLM，(新聞, 標籤名稱, 來源) 放入佇列交給寫入者。
+        """
+        tag_map: dict[int, list[str]] = {}
+        if len(batch) > 1:
+            try:
+                tag_map = await self.llm_client.extract_tags_batch([
+                    (news.id, str(news.title or ""), str(news.summary or ""))
+                    for news in batch
+                ])
+                results["batch_calls"] += 1
+            except LLMRateLimitError:
+                rate_limited.set()
+                results["deferred"] += len(batch)
+                return
+            except Exception as e:
+                # 請求本身失敗（非解析問題）時逐篇重試同樣會失敗，整批記為失敗
+                for news in batch:
+                    self._record_failure(results, news, e)
+                return
+
+        for news in batch:
+            if news.id in tag_map:
+                await tagged.put((news, tag_map[news.id], "llm"))
+                continue
+            if rate_limited.is_set():
+                results["deferred"] += 1
+                continue
+            try:
+                tag_names = await self.llm_client.extract_tags(
+                    news_title=str(news.title or ""),
+                    news_summary=str(news.summary or "")
+                )
+            except LLMRateLimitError:
+                rate_limited.set()
+                results["deferred"] += 1
+                continue
+            except Exception as e:
+                self._record_failure(results, news, e)
+                continue
+            if len(batch) > 1:
+                results["fallback_calls"] += 1
+            await tagged.put((news, tag_names, "llm"))
+
+    async def _write_tagged(self, tagged: asyncio.Queue, results: dict) -> None:
+        """單一寫入者：把佇列中已累積的結果合併成一次 commit，收到 None 時結束"""
+        done = False
+        while not done:
+            items = [await tagged.get()]
+            while not tagged.empty():
+                items.append(tagged.get_nowait())
+            if items[-1] is None:
+                done = True
+                items.pop()
+            by_source: dict[str, list[tuple[News, list[str]]]] = {}
+            for news, tag_names, source in items:
+                by_source.setdefault(source, []).append((news, tag_names))
+            for source, group in by_source.items():
+                await self._save_tag_results(group, results, source)
+
+    async def _save_tag_results(
+        self,
+        items: list[tuple[News, list[str]]],
+        results: dict,
+        source: str = "llm",
+    ) -> None:
+        """批次寫入多則新聞的標籤（一次標籤 upsert + 一次關聯 INSERT + 一次 commit）"""
+        try:
+            resolved = await self._write_tags(items, source)
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            for news, _ in items:
+                self._record_failure(results, news, e)
+            return
+        self._remember(items, resolved)
+        results["processed"] += len(items)
+
+    @staticmethod
+    def _record_failure(results: dict, news: News, error: Exception) -> None:
+        """記錄單篇新聞的失敗"""
+        results["failed"] += 1
+        results["errors"].append({
+            "news_id": news.id,
+            "error": str(error)
+        })
+
 
 async def create_tag_extractor() -> TagExtractor:
-    """建立標籤提取器實例（使用 AsyncSessionLocal + singleton LLM client）"""
+    """建立標籤提取器實例（使用 AsyncSessionLocal + singleton LLM client + 共用標籤字典與共現矩陣）
+
+    啟用本地標籤器時沿用快取的模型，超過 local_tagger_retrain_interval 才重新訓練。
+    """
     from app.core.dependencies import get_llm_client
     db = AsyncSessionLocal()
     llm_client = get_llm_client()
-    return TagExtractor(db, llm_client)
+    local_tagger = None
+    if get_settings().local_tagger_enabled:
+        local_tagger = await get_local_tagger(db)
+        if local_tagger.is_empty:
+            local_tagger = None
+    return TagExtractor(db, llm_client, local_tagger, get_tag_dictionary(), get_tag_cooccurrence())
@@ -0,0 +1,51 @@
+"""新聞連結正規化與雜湊"""
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 不影響內容的追蹤參數
+TRACKING_PARAMS = {
+    "guccounter", "guce_referrer", "guce_referrer_sig",
+    "ref", "ref_src", "ref_url", "referrer",
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "cmpid", "ocid", "smid", "sr_share",
+    "_hsenc", "_hsmi", "mkt_tok",
+}
+TRACKING_PREFIXES = ("utm_", "itm_", "pk_", "__twitter")
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """將連結正規化，讓同一篇文章的不同寫法得到相同結果
+
+    - 一律使用 https，主機名稱轉小寫並去除 www. 與預設埠號
+    - 移除追蹤參數（utm_*、guccounter、ref= 等）與 fragment，其餘參數排序
+    - 去除路徑結尾的斜線
+    """
+    url = (url or "").strip()
+    parts = urlsplit(url)
+    if not parts.netloc:
+        return url
+
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name)
+    ))
+    return urlunsplit(("https", host, path, query, ""))
+
+
+def url_hash64(url: str) -> int:
+    """正規化連結的 64-bit 雜湊，回傳有號整數（可直接存入 SQLite INTEGER）"""
+    digest = hashlib.blake2b(canonicalize_url(url).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
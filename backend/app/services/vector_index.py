@@ -0,0 +1,247 @@
+"""本地向量索引（以 ID 為列號的 memmap，top-k 餘弦查詢，可選 IVF 分區）"""
+import math
+import os
+import threading
+from functools import lru_cache
+from typing import Iterable, Optional
+
+import numpy as np
+
+from app.core.config import get_settings
+
+
+class VectorIndex:
+    """以 News.id / Idea.id 為列號的 float32 向量檔
+
+    檔案（皆為 memmap，延伸時補零）：
+    - {path}.vectors：capacity × dim 的 L2 正規化向量，內積即為餘弦相似度
+    - {path}.lists：每列所屬分區 + 1（0 表示沒有向量；未分區時皆為 1）
+    - {path}.centroids.npy：IVF 分區中心（train_ivf 之後才有）
+    未分區時查詢分段全掃描；分區後只掃描與查詢最接近的 probes 個分區，
+    分區後新增的向量先放在待併入清單（查詢時一律掃描），累積 REBUILD_PENDING 筆後重建分區成員。
+    新增與查詢可在不同執行緒進行（查詢在鎖內只取狀態快照）。
+    寫入不逐筆 msync（對整個映射區執行，成本隨檔案大小成長），由作業系統回寫；
+    系統當機遺失的向量由啟動時的補寫任務補上。
+    """
+
+    MIN_CAPACITY = 1024
+    SCAN_CHUNK = 65536
+    REBUILD_PENDING = 10_000
+    KMEANS_ITERATIONS = 8
+    KMEANS_SAMPLE_PER_LIST = 32
+
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._centroids: Optional[np.ndarray] = None
+        self._members: list[np.ndarray] = []
+        self._pending: list[int] = []
+
+        vectors_size = os.path.getsize(f"{path}.vectors") if os.path.exists(f"{path}.vectors") else 0
+        lists_size = os.path.getsize(f"{path}.lists") if os.path.exists(f"{path}.lists") else 0
+        capacity = vectors_size // (dim * 4)
+        if vectors_size % (dim * 4) or lists_size != capacity * 4:
+            print(f"[向量索引] {path} 與維度 {dim} 不符，重建索引")
+            for suffix in (".vectors", ".lists", ".centroids.npy"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            capacity = 0
+        self._resize(max(capacity, self.MIN_CAPACITY))
+
+        present = np.flatnonzero(self._lists)
+        self._count = len(present)
+        self._high = int(present[-1]) + 1 if len(present) else 0
+        if os.path.exists(f"{path}.centroids.npy"):
+            self._centroids = np.load(f"{path}.centroids.npy")
+            self._rebuild_members()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def partitions(self) -> int:
+        """IVF 分區數（未分區時為 0）"""
+        return 0 if self._centroids is None else len(self._centroids)
+
+    def _resize(self, capacity: int) -> None:
+        """延伸檔案到 capacity 列並重新映射"""
+        for suffix, row_bytes in ((".vectors", self.dim * 4), (".lists", 4)):
+            with open(self.path + suffix, "ab") as f:
+                if f.tell() < capacity * row_bytes:
+                    f.truncate(capacity * row_bytes)
+        self._vectors = np.memmap(f"{self.path}.vectors", dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._lists = np.memmap(f"{self.path}.lists", dtype=np.int32, mode="r+", shape=(capacity,))
+
+    def contains(self, item_id: int) -> bool:
+        return 0 <= item_id < len(self._lists) and bool(self._lists[item_id])
+
+    def missing(self, item_ids: Iterable[int]) -> list[int]:
+        """還沒有向量的 ID"""
+        ids = np.fromiter(item_ids, dtype=np.int64)
+        inside = ids < len(self._lists)
+        present = np.zeros(len(ids), dtype=bool)
+        present[inside] = self._lists[ids[inside]] > 0
+        return ids[~present].tolist()
+
+    def get(self, item_id: int) -> Optional[np.ndarray]:
+        """取得向量（沒有時回傳 None）"""
+        if not self.contains(item_id):
+            return None
+        return np.array(self._vectors[item_id])
+
+    def add(self, item_id: int, vector: np.ndarray) -> None:
+        self.add_many([item_id], vector[np.newaxis, :])
+
+    def add_many(self, item_ids: Iterable[int], vectors: np.ndarray) -> None:
+        """寫入（或覆寫）多筆向量；零向量（沒有任何詞）略過"""
+        ids = np.fromiter(item_ids, dtype=np.int64)
+        keep = np.linalg.norm(vectors, axis=1) > 0
+        ids, vectors = ids[keep], vectors[keep]
+        if not len(ids):
+            return
+        with self._lock:
+            top = int(ids.max())
+            if top >= len(self._lists):
+                self._resize(max(top + 1, len(self._lists) * 2))
+            self._count += int(np.count_nonzero(self._lists[ids] == 0))
+            self._vectors[ids] = vectors
+            self._lists[ids] = self._assign(vectors) + 1
+            self._high = max(self._high, top + 1)
+            if self._centroids is not None:
+                self._pending.extend(ids.tolist())
+                if len(self._pending) >= self.REBUILD_PENDING:
+                    self._rebuild_members()
+
+    def _assign(self, vectors: np.ndarray, centroids: Optional[np.ndarray] = None) -> np.ndarray:
+        """每個向量最接近的分區（未分區時皆為 0）"""
+        centroids = self._centroids if centroids is None else centroids
+        if centroids is None:
+            return np.zeros(len(vectors), dtype=np.int32)
+        assigned = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), self.SCAN_CHUNK):
+            chunk = np.asarray(vectors[start:start + self.SCAN_CHUNK])
+            assigned[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        return assigned
+
+    def _rebuild_members(self) -> None:
+        """由 lists 重建各分區的成員 ID，清空待併入清單"""
+        lists = np.asarray(self._lists[:self._high])
+        order = np.argsort(lists, kind="stable")
+        bounds = np.searchsorted(lists[order], np.arange(1, len(self._centroids) + 2))
+        self._members = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+        self._pending = []
+
+    def search(
+        self,
+        vector: np.ndarray,
+        k: int,
+        exclude: Iterable[int] = (),
+        probes: Optional[int] = None,
+    ) -> list[tuple[int, float]]:
+        """回傳 (ID, 餘弦相似度) 由高到低的前 k 筆"""
+        with self._lock:
+            vectors, lists, high = self._vectors, self._lists, self._high
+            centroids, members, pending = self._centroids, self._members, list(self._pending)
+        excluded = np.fromiter(exclude, dtype=np.int64)
+        query = vector.astype(np.float32)
+
+        if centroids is None:
+            best_ids, best_scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            for start in range(0, high, self.SCAN_CHUNK):
+                end = min(start + self.SCAN_CHUNK, high)
+                scores = np.asarray(vectors[start:end]) @ query
+                scores[np.asarray(lists[start:end]) == 0] = -np.inf
+                ids = np.arange(start, end)
+                best_ids, best_scores = self._top_k(
+                    np.concatenate([best_ids, ids]), np.concatenate([best_scores, scores]), excluded, k
+                )
+        else:
+            probes = min(probes or get_settings().vector_ivf_probes, len(centroids))
+            nearest = np.argpartition(-(centroids @ query), probes - 1)[:probes]
+            candidates = np.unique(np.concatenate(
+                [members[i] for i in nearest] + [np.array(pending, dtype=np.int64)]
+            ))
+            scores = np.asarray(vectors[candidates]) @ query
+            best_ids, best_scores = self._top_k(candidates, scores, excluded, k)
+
+        return [(int(item_id), float(score)) for item_id, score in zip(best_ids, best_scores) if score > -np.inf]
+
+    @staticmethod
+    def _top_k(ids: np.ndarray, scores: np.ndarray, excluded: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """依分數由高到低取前 k 筆（排除 excluded）"""
+        if len(excluded):
+            scores = np.where(np.isin(ids, excluded), -np.inf, scores)
+        if len(ids) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return ids[order], scores[order]
+
+    def train_ivf(self, partitions: Optional[int] = None, seed: int = 0) -> int:
+        """以球面 k-means 建立 IVF 分區並重新指派所有向量，回傳分區數
+
+        訓練與指派在鎖外以快照進行（可在背景執行緒執行），期間新增的向量最後在鎖內補上分區。
+        """
+        with self._lock:
+            high = self._high
+        present = np.flatnonzero(np.asarray(self._lists[:high]))
+        if not len(present):
+            return 0
+        partitions = partitions or max(1, int(4 * math.sqrt(len(present))))
+        partitions = min(partitions, len(present))
+
+        rng = np.random.default_rng(seed)
+        sample_size = min(len(present), partitions * self.KMEANS_SAMPLE_PER_LIST)
+        sample = np.sort(rng.choice(present, sample_size, replace=False))
+        data = np.asarray(self._vectors[sample])
+        centroids = data[rng.choice(len(data), partitions, replace=False)].copy()
+        for _ in range(self.KMEANS_ITERATIONS):
+            assigned = self._assign(data, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assigned, data)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # 空分區改以隨機樣本重新起始
+            sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+            norms[empty] = 1
+            centroids = (sums / norms).astype(np.float32)
+
+        assigned = np.empty(len(present), dtype=np.int32)
+        for start in range(0, len(present), self.SCAN_CHUNK):
+            chunk = present[start:start + self.SCAN_CHUNK]
+            assigned[start:start + len(chunk)] = self._assign(np.asarray(self._vectors[chunk]), centroids)
+
+        with self._lock:
+            self._lists[present] = assigned + 1
+            late = np.flatnonzero(np.asarray(self._lists[high:self._high])) + high
+            if len(late):
+                self._lists[late] = self._assign(np.asarray(self._vectors[late]), centroids) + 1
+            self._centroids = centroids
+            np.save(f"{self.path}.centroids.npy", centroids)
+            self._rebuild_members()
+        return partitions
+
+    def maybe_train(self) -> int:
+        """向量數達 vector_ivf_min_vectors 且尚未分區時建立 IVF 分區，回傳新建的分區數"""
+        if self._centroids is not None or len(self) < get_settings().vector_ivf_min_vectors:
+            return 0
+        return self.train_ivf()
+
+
+def _open_index(name: str) -> VectorIndex:
+    settings = get_settings()
+    os.makedirs(settings.vector_index_dir, exist_ok=True)
+    return VectorIndex(os.path.join(settings.vector_index_dir, name), settings.vector_dim)
+
+
+@lru_cache(maxsize=1)
+def get_news_index() -> VectorIndex:
+    """取得新聞向量索引（單例）"""
+    return _open_index("news")
+
+
+@lru_cache(maxsize=1)
+def get_idea_index() -> VectorIndex:
+    """取得點子向量索引（單例）"""
+    return _open_index("ideas")
@@ -0,0 +1,105 @@
+"""Benchmark news dedup lookups: long link string vs 64-bit link_hash
+
+Seeds a temporary SQLite database with the production news schema and
+compares point lookups and 500-item IN batches on each unique index.
+
+Usage (from backend/):
+    python -m benchmarks.bench_link_lookup [--rows 1000000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from app.core.database import Base
+from app.models import news as _news_models  # noqa: F401 註冊資料表
+from app.services.url_canonical import url_hash64
+
+
+def make_link(i: int) -> str:
+    """Realistic-length article URL with tracking parameters"""
+    return (
+        f"https://www.example-news-site.com/2025/01/06/technology/"
+        f"article-about-something-interesting-{i:08d}/?utm_source=rss&utm_medium=feed"
+    )
+
+
+def seed(path: str, rows: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    batch = 50_000
+    for start in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO news (title, link, link_hash, source, created_at) "
+            "VALUES (?, ?, ?, 'bench', '2025-01-06 00:00:00')",
+            (
+                (f"title {i}", make_link(i), url_hash64(make_link(i)))
+                for i in range(start, min(start + batch, rows))
+            ),
+        )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def timed(conn: sqlite3.Connection, sql: str, params: list) -> float:
+    """Average microseconds per query"""
+    started = time.perf_counter()
+    for param in params:
+        conn.execute(sql, param).fetchall()
+    return (time.perf_counter() - started) / len(params) * 1e6
+
+
+def index_size(conn: sqlite3.Connection, name: str) -> str:
+    try:
+        pages = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (name,)).fetchone()[0]
+        return f"{pages / 1e6:.1f} MB"
+    except sqlite3.OperationalError:
+        return "n/a"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--rows", type=int, default=1_000_000)
+    arg_parser.add_argument("--lookups", type=int, default=20_000)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        started = time.perf_counter()
+        seed(path, args.rows)
+        print(f"Seeded {args.rows:,} rows in {time.perf_counter() - started:.1f}s")
+
+        conn = sqlite3.connect(path)
+        ids = [random.randrange(args.rows) for _ in range(args.lookups)]
+        links = [(make_link(i),) for i in ids]
+        hashes = [(url_hash64(make_link(i)),) for i in ids]
+
+        print(f"Point lookup by link:      {timed(conn, 'SELECT id FROM news WHERE link = ?', links):7.2f} us")
+        print(f"Point lookup by link_hash: {timed(conn, 'SELECT id FROM news WHERE link_hash = ?', hashes):7.2f} us")
+
+        size = 500
+        placeholders = ",".join("?" * size)
+        link_batches = [tuple(l for (l,) in links[i:i + size]) for i in range(0, len(links) - size + 1, size)]
+        hash_batches = [tuple(h for (h,) in hashes[i:i + size]) for i in range(0, len(hashes) - size + 1, size)]
+        print(f"IN ({size}) by link:         "
+              f"{timed(conn, f'SELECT link FROM news WHERE link IN ({placeholders})', link_batches) / 1000:7.2f} ms")
+        print(f"IN ({size}) by link_hash:    "
+              f"{timed(conn, f'SELECT link_hash FROM news WHERE link_hash IN ({placeholders})', hash_batches) / 1000:7.2f} ms")
+
+        print(f"Index size link:      {index_size(conn, 'sqlite_autoindex_news_1')}")
+        print(f"Index size link_hash: {index_size(conn, 'ix_news_link_hash')}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark per-call LLM latency: new client per call vs persistent pool
+
+Starts a local mock gateway (uvicorn) that answers /v1/chat/completions
+immediately, then compares the old behaviour (a fresh httpx.AsyncClient
+per call) with the pooled VercelLLMClient. Against the real gateway the
+saving is larger because every fresh connection also pays a TLS handshake.
+
+Usage (from backend/):
+    python -m benchmarks.bench_llm_client [--calls 200] [--concurrency 1]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+os.environ.setdefault("VERCEL_API_KEY", "bench")
+
+from app.services.llm_client import VercelLLMClient  # noqa: E402
+
+gateway = FastAPI()
+
+
+@gateway.post("/v1/chat/completions")
+async def chat_completions():
+    return {"choices": [{"message": {"content": "AI, 晶片, 雲端"}}]}
+
+
+def start_gateway() -> tuple[uvicorn.Server, str]:
+    """Run the mock gateway on a free local port in a background thread"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(gateway, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}/v1"
+
+
+async def call_fresh_client(base_url: str) -> None:
+    """Previous behaviour: one AsyncClient (and connection) per call"""
+    async with httpx.AsyncClient() as client:
+        response = await client.post(
+            f"{base_url}/chat/completions",
+            json={"model": "bench", "messages": [{"role": "user", "content": "hi"}]},
+            timeout=30.0,
+        )
+        response.raise_for_status()
+
+
+async def measure(call, calls: int, concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    print(
+        f"{name:>10}: mean {statistics.mean(latencies):6.2f} ms, "
+        f"p50 {statistics.median(latencies):6.2f} ms, "
+        f"p99 {statistics.quantiles(latencies, n=100)[98]:6.2f} ms"
+    )
+
+
+async def run(base_url: str, calls: int, concurrency: int) -> None:
+    fresh = await measure(lambda: call_fresh_client(base_url), calls, concurrency)
+
+    client = VercelLLMClient(base_url=base_url)
+    await client.open()
+    try:
+        await client.complete("warmup")
+        pooled = await measure(lambda: client.complete("hi"), calls, concurrency)
+    finally:
+        await client.aclose()
+
+    report("fresh", fresh)
+    report("pooled", pooled)
+    saved = statistics.mean(fresh) - statistics.mean(pooled)
+    print(f"Saved per call: {saved:.2f} ms ({saved / statistics.mean(fresh):.0%})")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--calls", type=int, default=200)
+    arg_parser.add_argument("--concurrency", type=int, default=1)
+    args = arg_parser.parse_args()
+
+    server, base_url = start_gateway()
+    try:
+        asyncio.run(run(base_url, args.calls, args.concurrency))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
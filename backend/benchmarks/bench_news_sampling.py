@@ -0,0 +1,117 @@
+"""Benchmark random tagged-news pair sampling: full-table load vs rejection sampling
+
+Seeds temporary SQLite databases where about half the news is tagged and a
+tenth of the tagged news is a near-duplicate cluster member, then times the
+old strategy (load every eligible row with its tags, random.sample in
+Python) against app.services.news_sampler.sample_news_pair.
+With --tagged-oldest N only the N oldest news are tagged, as when a large
+untagged backlog is still waiting for the tagger.
+
+Usage (from backend/):
+    python -m benchmarks.bench_news_sampling [--rows 10000 100000 1000000] [--legacy-max-rows 100000]
+    python -m benchmarks.bench_news_sampling --rows 300000 --tagged-oldest 3000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from app.core.database import Base
+from app.models.news import News
+from app.services.news_sampler import sample_news_pair
+
+TAGS = 500
+
+
+def seed(path: str, rows: int, tagged_oldest: int = 0) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executemany("INSERT INTO tags (id, name) VALUES (?, ?)", ((i, f"tag {i}") for i in range(1, TAGS + 1)))
+    batch = 50_000
+    for start in range(1, rows + 1, batch):
+        ids = range(start, min(start + batch, rows + 1))
+        conn.executemany(
+            "INSERT INTO news (id, title, link, summary, source, cluster_id, created_at) "
+            "VALUES (?, ?, ?, ?, 'bench', ?, '2025-01-06 00:00:00')",
+            (
+                (i, f"title {i}", f"https://example.com/{i}", "summary " * 40,
+                 i - 1 if i % 20 == 0 else None)
+                for i in ids
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO news_tags (news_id, tag_id) VALUES (?, ?)",
+            (
+                (i, tag_id)
+                for i in ids if (i <= tagged_oldest if tagged_oldest else i % 2 == 0)
+                for tag_id in random.sample(range(1, TAGS + 1), 4)
+            ),
+        )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+async def legacy_pair(db):
+    stmt = (
+        select(News)
+        .where(News.tags.any(), News.cluster_id.is_(None))
+        .options(selectinload(News.tags))
+    )
+    news_with_tags = list((await db.execute(stmt)).scalars().all())
+    return random.sample(news_with_tags, 2)
+
+
+async def timed(factory, sampler, repeat: int) -> float:
+    """Average milliseconds per pair, each call in a fresh session"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        async with factory() as db:
+            await sampler(db)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def run(path: str, rows: int, legacy: bool, repeat: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    sampled = await timed(factory, sample_news_pair, repeat)
+    line = f"{rows:>10,} rows  sampler {sampled:8.2f} ms"
+    if legacy:
+        line += f"  full load {await timed(factory, legacy_pair, max(1, repeat // 50)):10.1f} ms"
+    else:
+        line += "  full load    skipped"
+    print(line)
+    await engine.dispose()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    arg_parser.add_argument("--legacy-max-rows", type=int, default=100_000,
+                            help="skip the full-load strategy above this size (it takes minutes at 1M)")
+    arg_parser.add_argument("--repeat", type=int, default=200)
+    arg_parser.add_argument("--tagged-oldest", type=int, default=0,
+                            help="tag only the N oldest news instead of every other one")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"bench_{rows}.db")
+            seed(path, rows, args.tagged_oldest)
+            asyncio.run(run(path, rows, rows <= args.legacy_max_rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark strategy-based news pairing from the in-memory tag co-occurrence matrix
+
+Builds a TagCooccurrence the way TagExtractor feeds it: one add() per
+tagged news. Tags are grouped into topics. Each news draws 3-5 tags, mostly
+from one topic and sometimes from a second one, with Zipf-skewed
+popularity. The script then times pick_pair for every strategy and reports
+the median and p99 latency in microseconds. Each picked pair is classified
+by the highest PMI between the two tag sets: shared tag, PMI > 0,
+PMI <= 0, or never co-occur. The first picks per tag pay for building the
+cached neighbour weights, and that cost shows up in p99.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pair_selection [--news 1000000] [--tags 500] [--picks 20000]
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+
+from app.services.tag_cooccurrence import TagCooccurrence
+
+TOPIC_SIZE = 25
+CROSS_TOPIC_RATE = 0.2
+
+
+def build(news: int, tags: int, rng: random.Random) -> TagCooccurrence:
+    topics = [list(range(start, min(start + TOPIC_SIZE, tags))) for start in range(0, tags, TOPIC_SIZE)]
+    topic_weights = [1 / (rank + 1) for rank in range(len(topics))]
+    tag_weights = [1 / (rank + 1) for rank in range(TOPIC_SIZE)]
+
+    matrix = TagCooccurrence()
+    for news_id in range(1, news + 1):
+        home, away = rng.choices(topics, topic_weights, k=2)
+        count = rng.randint(3, 5)
+        picked = set(rng.choices(home, tag_weights[:len(home)], k=count))
+        if rng.random() < CROSS_TOPIC_RATE:
+            picked.add(rng.choice(away))
+        matrix.add(news_id, picked)
+    return matrix
+
+
+def classify(matrix: TagCooccurrence, pair: tuple[int, int]) -> str:
+    tags_a, tags_b = matrix._news_tags[pair[0]], matrix._news_tags[pair[1]]
+    score = matrix._relatedness(tags_a, tags_b)
+    if score is None:
+        return "shared tag"
+    if score == -math.inf:
+        return "never co-occur"
+    return "PMI > 0" if score > 0 else "PMI <= 0"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--news", type=int, default=1_000_000)
+    arg_parser.add_argument("--tags", type=int, default=500)
+    arg_parser.add_argument("--picks", type=int, default=20_000)
+    arg_parser.add_argument("--seed", type=int, default=7)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    started = time.perf_counter()
+    matrix = build(args.news, args.tags, rng)
+    elapsed = time.perf_counter() - started
+    nonzero = sum(len(row) for row in matrix._pairs.values())
+    print(
+        f"built matrix for {len(matrix)} news / {args.tags} tags in {elapsed:.1f}s "
+        f"({elapsed / len(matrix) * 1e6:.1f} µs per add, {nonzero} non-zero cells)"
+    )
+
+    print(f"{'strategy':<15}{'median µs':>11}{'p99 µs':>9}  outcome mix")
+    for strategy in ("random", "complementary", "distant"):
+        times, outcomes = [], {}
+        for _ in range(args.picks):
+            started = time.perf_counter()
+            pair = matrix.pick_pair(strategy)
+            times.append(time.perf_counter() - started)
+            outcome = classify(matrix, pair)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        times.sort()
+        mix = ", ".join(f"{label} {count / args.picks:.0%}" for label, count in sorted(outcomes.items()))
+        print(
+            f"{strategy:<15}{statistics.median(times) * 1e6:>11.1f}"
+            f"{times[int(len(times) * 0.99)] * 1e6:>9.1f}  {mix}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark API latency during an RSS parse cycle (thread vs process pool)
+
+Usage (from backend/):
+    python -m benchmarks.bench_parse_latency [--sources 10] [--items 1500]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.main import app
+from app.services.feed_parser import FeedParser, shutdown_parse_pool
+
+
+def build_large_feed(name: str, items: int) -> bytes:
+    """Build a synthetic RSS document with long HTML summaries"""
+    body = "<p>" + ("Lorem ipsum <b>dolor</b> sit amet, consectetur adipiscing elit. " * 20) + "</p>"
+    entries = "".join(
+        f"<item><title>{name} story {i}</title>"
+        f"<link>https://{name}.example.com/{i}</link>"
+        f"<description><![CDATA[{body}]]></description>"
+        f"<pubDate>Mon, 06 Jan 2025 10:00:00 GMT</pubDate></item>"
+        for i in range(items)
+    )
+    return (
+        f'<?xml version="1.0"?><rss version="2.0"><channel><title>{name}</title>'
+        f"{entries}</channel></rss>"
+    ).encode()
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list[float]):
+    """Issue API requests on the same event loop and record their latency"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/health")
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def run_cycle(mode: str, feeds: list[bytes]) -> dict:
+    """Parse every feed once while probing API latency"""
+    parser = FeedParser(mode)
+    # Warm up (spawns pool workers outside the measured window)
+    await parser.parse(feeds[0][:2000] + b"</channel></rss>", "warmup")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        latencies: list[float] = []
+        probe_task = asyncio.create_task(probe(client, stop, latencies))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(parser.parse(feed, f"src{i}") for i, feed in enumerate(feeds)))
+        cycle = time.perf_counter() - started
+
+        stop.set()
+        await probe_task
+
+    return {
+        "mode": mode,
+        "cycle_seconds": cycle,
+        "requests": len(latencies),
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": statistics.quantiles(latencies, n=100)[98] if len(latencies) > 1 else latencies[0],
+    }
+
+
+def main():
+    """Run the benchmark for both parse modes"""
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--sources", type=int, default=10)
+    arg_parser.add_argument("--items", type=int, default=1500)
+    args = arg_parser.parse_args()
+
+    feeds = [build_large_feed(f"src{i}", args.items) for i in range(args.sources)]
+    print(f"Feeds: {args.sources} x {args.items} items ({sum(map(len, feeds)) / 1e6:.1f} MB)")
+
+    try:
+        for mode in FeedParser.MODES:
+            stats = asyncio.run(run_cycle(mode, feeds))
+            print(
+                f"{stats['mode']:>8}: cycle {stats['cycle_seconds']:.2f}s, "
+                f"{stats['requests']} API requests, "
+                f"p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms"
+            )
+    finally:
+        shutdown_parse_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Query-plan harness: run every hot service path on large synthetic data and check EXPLAIN QUERY PLAN
+
+Seeds a temporary SQLite database (schema from create_all + migrations,
+as in production, and no ANALYZE). Then it drives the hot paths of
+NewsService, IdeaService, TagExtractor and RSSFetcher against it.
+Every SELECT / UPDATE / DELETE they issue is captured. The harness then
+explains it and times it, and exits non-zero if any of them falls back to
+a full table scan.
+
+A statement counts as a full scan in either of two cases:
+- Its plan reads a table or a whole index without a search key
+  ("SCAN news", "SCAN news USING INDEX ..."). Scans of partial indexes
+  are allowed, and so is an ordered walk that stops at LIMIT (the statement
+  has a LIMIT and no temp B-tree sort).
+- Re-running it costs at least one SQLite VM instruction per seeded news
+  row. This catches index searches that are not selective, e.g.
+  "SEARCH news USING INDEX ix (cluster_id=?)" for a value most rows share.
+Statements listed in INTENTIONAL_FULL_READS are exempt.
+
+Usage (from backend/):
+    python -m benchmarks.bench_query_plans [--rows 200000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.core.migrations import run_migrations
+from app.services.feed_parser import FeedEntry
+from app.services.idea_service import IdeaService
+from app.services.local_tagger import load_local_tagger
+from app.services.news_service import NewsService
+from app.services.rss_fetcher import RSSFetcher
+from app.services.tag_extractor import TagExtractor
+
+TAGS = 2_000
+TAGS_PER_NEWS = 3
+IDEAS_PER_NEWS = 0.1
+UNTAGGED_SHARE = 0.02
+EXPLAINED = ("SELECT", "UPDATE", "DELETE", "WITH")
+PROGRESS_GRANULARITY = 100
+# 刻意讀取整張表的語句（SQL → 理由），不列為失敗
+INTENTIONAL_FULL_READS = {
+    "SELECT tags.name FROM tags": "本地標籤器的詞彙表就是全部標籤，每次標籤任務讀取一次",
+}
+
+
+@dataclass
+class CapturedQuery:
+    """一條被擷取的語句（同一 SQL 只保留第一組參數，時間累加）"""
+    path: str
+    sql: str
+    parameters: tuple
+    calls: int = 0
+    seconds: float = 0.0
+    plan: list[str] = field(default_factory=list)
+    vm_steps: int = 0
+
+    def full_scans(self, partial_indexes: set[str], step_budget: int) -> list[str]:
+        """回傳屬於全表掃描的原因（空列表表示通過）"""
+        if " ".join(self.sql.split()) in INTENTIONAL_FULL_READS:
+            return []
+        reasons = full_scan_steps(self.sql, self.plan, partial_indexes)
+        if self.vm_steps >= step_budget:
+            reasons.append(f"{self.vm_steps} VM steps (budget {step_budget})")
+        return reasons
+
+
+def full_scan_steps(sql: str, plan: list[str], partial_indexes: set[str]) -> list[str]:
+    """回傳計畫中屬於全表（全索引）掃描的步驟"""
+    bounded = re.search(r"\bLIMIT\b", sql, re.IGNORECASE) and not any(
+        "TEMP B-TREE" in step for step in plan
+    )
+    if bounded:
+        return []
+    scans = []
+    for step in plan:
+        match = re.match(r"SCAN (?!CONSTANT ROW)\w+(?: USING (?:COVERING )?INDEX (\w+))?", step)
+        if match and "VIRTUAL TABLE" not in step and match.group(1) not in partial_indexes:
+            scans.append(step)
+    return scans
+
+
+def partial_index_names(conn: sqlite3.Connection) -> set[str]:
+    """資料庫中所有部分索引的名稱"""
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    return {
+        row[1]
+        for table in tables
+        for row in conn.execute(f"PRAGMA index_list('{table}')")
+        if row[4]
+    }
+
+
+class QueryRecorder:
+    """以引擎事件擷取執行過的語句與耗時"""
+
+    def __init__(self):
+        self.queries: dict[tuple[str, str], CapturedQuery] = {}
+        self.partial_indexes: set[str] = set()
+        self.path = ""
+
+    def attach(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    @contextmanager
+    def hot_path(self, name: str) -> Iterator[None]:
+        self.path = name
+        yield
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        if not statement.lstrip().upper().startswith(EXPLAINED):
+            return
+        if executemany:
+            parameters = parameters[0]
+        key = (self.path, statement)
+        query = self.queries.setdefault(key, CapturedQuery(self.path, statement, tuple(parameters)))
+        query.calls += 1
+        query.seconds += elapsed
+
+    def explain(self, path: str) -> list[CapturedQuery]:
+        """以原始 sqlite3 連線取得每條語句的 EXPLAIN QUERY PLAN 與 VM 指令數"""
+        conn = sqlite3.connect(path)
+        try:
+            self.partial_indexes = partial_index_names(conn)
+            for query in self.queries.values():
+                rows = conn.execute(f"EXPLAIN QUERY PLAN {query.sql}", query.parameters).fetchall()
+                query.plan = [row[3] for row in rows]
+                query.vm_steps = count_vm_steps(conn, query.sql, query.parameters)
+        finally:
+            conn.close()
+        return list(self.queries.values())
+
+
+def count_vm_steps(conn: sqlite3.Connection, sql: str, parameters: tuple) -> int:
+    """實際執行一次語句（寫入會回滾）並以 progress handler 計算 VM 指令數"""
+    steps = 0
+
+    def tick():
+        nonlocal steps
+        steps += PROGRESS_GRANULARITY
+
+    conn.set_progress_handler(tick, PROGRESS_GRANULARITY)
+    try:
+        conn.execute(sql, parameters).fetchall()
+    finally:
+        conn.set_progress_handler(None, 0)
+        conn.rollback()
+    return steps
+
+
+def seed(path: str, rows: int) -> None:
+    """建立正式結構並寫入合成資料（多數新聞已標籤，少數待標籤、部分為群組成員）"""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executemany(
+        "INSERT INTO tags (id, name, created_at) VALUES (?, ?, '2025-01-01 00:00:00')",
+        ((i, f"tag {i}") for i in range(1, TAGS + 1)),
+    )
+    untagged_from = int(rows * (1 - UNTAGGED_SHARE))
+    batch = 50_000
+    for start in range(1, rows + 1, batch):
+        ids = range(start, min(start + batch, rows + 1))
+        conn.executemany(
+            "INSERT INTO news (id, title, link, link_hash, summary, source, simhash, cluster_id, "
+            "created_at, tagged_at) VALUES (?, ?, ?, ?, ?, 'bench', ?, ?, "
+            "datetime('2025-01-01', ? || ' seconds'), ?)",
+            (
+                (i, f"title {i}", f"https://example.com/{i}", i, "summary " * 20,
+                 random.getrandbits(63), i - 1 if i % 20 == 0 else None, i * 60,
+                 "2025-06-01 00:00:00" if i < untagged_from else None)
+                for i in ids
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO news_tags (news_id, tag_id) VALUES (?, ?)",
+            (
+                (i, tag_id)
+                for i in ids if i < untagged_from
+                for tag_id in random.sample(range(1, TAGS + 1), TAGS_PER_NEWS)
+            ),
+        )
+    conn.executemany(
+        "INSERT INTO ideas (title, content, news_source_1, news_source_2, created_at) "
+        "VALUES (?, 'content', ?, ?, datetime('2025-01-01', ? || ' seconds'))",
+        (
+            (f"idea {i}", f"title {i}", f"title {i + 1}", i * 600)
+            for i in range(1, int(rows * IDEAS_PER_NEWS) + 1)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as migration_conn:
+        run_migrations(migration_conn)
+    engine.dispose()
+
+
+class FakeLLMClient:
+    """不呼叫外部服務的 LLM 客戶端（只為了讓服務走完整個寫入路徑）"""
+
+    async def extract_tags_batch(self, articles):
+        return {news_id: ["tag 1", f"new tag {news_id}"] for news_id, _, _ in articles}
+
+    async def extract_tags(self, news_title: str, news_summary: str) -> list[str]:
+        return ["tag 2", "single"]
+
+    async def complete(self, prompt: str, **kwargs) -> str:
+        return '{"title": "idea", "content": "content"}'
+
+
+async def run_async_paths(url: str, recorder: QueryRecorder) -> None:
+    engine = create_async_engine(url)
+    recorder.attach(engine.sync_engine)
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    llm_client = FakeLLMClient()
+    try:
+        async with factory() as db:
+            news_service = NewsService(db)
+            with recorder.hot_path("NewsService"):
+                page = await news_service.get_news_list(limit=20)
+                await news_service.get_news_list(limit=20, cursor=page.next_cursor)
+                await news_service.get_news_count()
+                news = await news_service.get_news_by_id(page.items[0].id)
+                await news_service.get_news_by_ids([item.id for item in page.items])
+                await news_service.get_news_by_tag_ids([tag.id for tag in news.tags])
+                tags = await news_service.get_tags_list(limit=50)
+                await news_service.get_tags_list(limit=50, cursor=tags.next_cursor)
+                await news_service.get_tags_count()
+                await news_service.get_random_news_pair()
+
+        async with factory() as db:
+            idea_service = IdeaService(db, llm_client, session_factory=factory)
+            with recorder.hot_path("IdeaService"):
+                news_a, news_b = await idea_service.get_random_news_pair()
+                await idea_service.get_news_by_tag_ids([tag.id for tag in news_a.tags])
+                await idea_service.get_news_by_ids([news_a.id, news_b.id])
+                idea = await idea_service.generate_idea(news_a, news_b)
+                await idea_service.generate_devil_audit(idea.id)
+                page = await idea_service.get_all_ideas(limit=20)
+                await idea_service.get_all_ideas(limit=20, cursor=page.next_cursor)
+                await idea_service.get_ideas_count()
+
+        async with factory() as db:
+            with recorder.hot_path("TagExtractor"):
+                local_tagger = await load_local_tagger(db, corpus_size=100)
+            # 本地標籤器不啟用，讓所有新聞都走 LLM 寫入路徑
+            extractor = TagExtractor(db, llm_client)
+            with recorder.hot_path("TagExtractor"):
+                await extractor.process_untagged_news(limit=100, batch_size=20, concurrency=2)
+
+        entries = [
+            FeedEntry(f"fresh {i}", f"https://example.com/fresh/{i}", f"summary {i}", "bench", None)
+            for i in range(100)
+        ]
+        # 一半為既有連結，觸發去重查詢
+        entries += [
+            FeedEntry(f"title {i}", f"https://example.com/{i}", "summary", "bench", None)
+            for i in range(1, 101)
+        ]
+        async with factory() as db:
+            fetcher = RSSFetcher(db, downloader=object(), parser=object())
+            with recorder.hot_path("RSSFetcher"):
+                await fetcher._load_feed_states([{"name": "bench", "url": "https://example.com/feed"}])
+                await fetcher._save_entries([entries])
+                await fetcher.get_recent_news()
+                await fetcher.get_news_without_tags()
+    finally:
+        await engine.dispose()
+
+
+def check_query_plans(rows: int) -> list[tuple[CapturedQuery, list[str]]]:
+    """在 rows 筆合成新聞上執行所有熱門路徑，回傳每條語句與其全表掃描原因"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "plans.db")
+        seed(path, rows)
+        recorder = QueryRecorder()
+        asyncio.run(run_async_paths(f"sqlite+aiosqlite:///{path}", recorder))
+        queries = recorder.explain(path)
+    return [(query, query.full_scans(recorder.partial_indexes, rows)) for query in queries]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--rows", type=int, default=200_000)
+    arg_parser.add_argument("--verbose", action="store_true", help="print SQL and every plan step")
+    args = arg_parser.parse_args()
+
+    started = time.perf_counter()
+    results = check_query_plans(args.rows)
+    print(f"{args.rows} news, {len(results)} distinct statements ({time.perf_counter() - started:.1f}s)")
+
+    failures = 0
+    for query, scans in results:
+        failures += bool(scans)
+        status = "FULL SCAN" if scans else "ok"
+        sql = " ".join(query.sql.split())
+        print(
+            f"[{status:>9}] {query.path:<12} {query.seconds / query.calls * 1000:8.2f} ms x{query.calls:<3} "
+            f"{query.vm_steps:>9} steps "
+            f"{sql if args.verbose else sql[:90]}"
+        )
+        for step in (query.plan if args.verbose else scans):
+            print(f"{'':>12}-> {step}")
+
+    if failures:
+        print(f"{failures} statement(s) fall back to a full scan")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
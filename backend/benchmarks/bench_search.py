@@ -0,0 +1,190 @@
+"""Benchmark full-text search: FTS5 trigram index + BM25 vs naive LIKE '%term%'
+
+Seeds a temporary SQLite database with the production schema and
+migrations. It then inserts synthetic news, so the FTS5 triggers index every
+row as it lands. Titles and summaries mix English words and Chinese phrases
+drawn from a Zipf distribution, so the corpus has common, mid-frequency and
+rare terms.
+
+Each query runs through SearchService (first page of 20, with snippets).
+The same query also runs as the naive scan the API would otherwise need:
+LIKE on title/summary, newest first, LIMIT 20.
+
+LIKE stops early for common terms, because the newest-first walk finds 20
+hits quickly. For rare terms it must scan the whole table. BM25 must score
+every match before it can sort. So terms with more than search_rank_limit
+matches are paged newest-first straight from the index (ranking "recent").
+
+Usage (from backend/):
+    python -m benchmarks.bench_search [--rows 1000000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import string
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, or_, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.core.migrations import run_migrations
+from app.models.news import News
+from app.services.search_service import SearchService
+
+ENGLISH_WORDS = 20_000
+CHINESE_WORDS = 5_000
+TITLE_WORDS = 8
+SUMMARY_WORDS = 24
+CHINESE_CHARS = (
+    "的一是在不了有和人這中大為上個國我以要他時來用們生到作地於出就分對成會可主發年動同工也能下過子說產種面而方後"
+    "多定行學法所民得經十三之進著等部度家電力裡如水化高自二理起小物現實加量都兩體制機當使點從業本去把性好應開它合還"
+    "因由其些然前外天政四日那社義事平形相全表間樣與關各重新線內數正心反你明看原又麼利比或但質氣第向道命此變條只沒結"
+)
+
+
+def make_vocabulary(rng: random.Random) -> tuple[list[str], list[str]]:
+    """Random 5-9 letter English-like words and 2-4 character Chinese phrases"""
+    english = set()
+    while len(english) < ENGLISH_WORDS:
+        english.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 9))))
+    chinese = set()
+    while len(chinese) < CHINESE_WORDS:
+        chinese.add("".join(rng.choices(CHINESE_CHARS, k=rng.randint(2, 4))))
+    # 先排序再洗牌，詞頻排名不受 set 的雜湊順序影響
+    english_words, chinese_words = sorted(english), sorted(chinese)
+    rng.shuffle(english_words)
+    rng.shuffle(chinese_words)
+    return english_words, chinese_words
+
+
+def zipf_weights(size: int) -> list[float]:
+    return [1 / (rank + 1) for rank in range(size)]
+
+
+def seed(path: str, rows: int, english: list[str], chinese: list[str], rng: random.Random) -> None:
+    """Create the production schema, then insert rows news (the FTS5 triggers index them as they land)"""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        run_migrations(conn)
+    engine.dispose()
+
+    english_cum = list(_cumulative(zipf_weights(len(english))))
+    chinese_cum = list(_cumulative(zipf_weights(len(chinese))))
+
+    def words(count: int) -> str:
+        picked = rng.choices(english, cum_weights=english_cum, k=count - count // 3)
+        picked += rng.choices(chinese, cum_weights=chinese_cum, k=count // 3)
+        rng.shuffle(picked)
+        return " ".join(picked)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    batch = 50_000
+    for start in range(1, rows + 1, batch):
+        conn.executemany(
+            "INSERT INTO news (id, title, link, summary, source, created_at) "
+            "VALUES (?, ?, ?, ?, 'bench', datetime('2025-01-01', ? || ' seconds'))",
+            (
+                (i, words(TITLE_WORDS), f"https://example.com/{i}", words(SUMMARY_WORDS), i * 60)
+                for i in range(start, min(start + batch, rows + 1))
+            ),
+        )
+    conn.commit()
+    conn.close()
+
+
+def _cumulative(weights: list[float]):
+    total = 0.0
+    for weight in weights:
+        total += weight
+        yield total
+
+
+def like_query(term_list: list[str]):
+    """What the API would run without an index: substring match, newest first"""
+    stmt = select(News.id, News.title).where(News.cluster_id.is_(None))
+    for term in term_list:
+        stmt = stmt.where(or_(News.title.contains(term, autoescape=True), News.summary.contains(term, autoescape=True)))
+    return stmt.order_by(News.created_at.desc(), News.id.desc()).limit(20)
+
+
+async def measure(path: str, queries: dict[str, str], repeat: int) -> list[tuple]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    results = []
+    try:
+        async with factory() as db:
+            service = SearchService(db)
+            for label, query in queries.items():
+                fts_times, like_times = [], []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    page = await service.search(query, limit=20)
+                    fts_times.append(time.perf_counter() - started)
+
+                    started = time.perf_counter()
+                    (await db.execute(like_query(query.split()))).all()
+                    like_times.append(time.perf_counter() - started)
+                matches = (await db.execute(
+                    select(func.count()).select_from(like_query(query.split()).limit(None).subquery())
+                )).scalar_one()
+                results.append((
+                    label, query, matches, page.ranking,
+                    statistics.median(fts_times) * 1000,
+                    statistics.median(like_times) * 1000,
+                ))
+    finally:
+        await engine.dispose()
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--rows", type=int, default=1_000_000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--seed", type=int, default=7)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(args.seed)
+    english, chinese = make_vocabulary(rng)
+    long_chinese = [word for word in chinese if len(word) >= 3]
+    short_chinese = [word for word in chinese if len(word) == 2]
+    # 最常見的詞出現在約一半的新聞中（相當於停用詞）
+    queries = {
+        "stopword-like en": english[0],
+        "common en": english[20],
+        "mid en": english[300],
+        "rare en": english[15_000],
+        "common zh (3+)": long_chinese[2],
+        "rare zh (3+)": long_chinese[3_000],
+        "two mid terms": f"{english[200]} {english[400]}",
+        "short zh (LIKE fallback)": short_chinese[5],
+        "rare short zh": short_chinese[-1],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "search.db")
+        started = time.perf_counter()
+        seed(path, args.rows, english, chinese, rng)
+        print(f"seeded {args.rows} news through the FTS5 triggers in {time.perf_counter() - started:.1f}s "
+              f"(database {os.path.getsize(path) / 2**20:.0f} MiB)")
+
+        results = asyncio.run(measure(path, queries, args.repeat))
+
+    print(f"{'query':<26}{'term':<20}{'matches':>9}  {'ranking':<8}{'FTS5 ms':>10}{'LIKE ms':>10}{'speedup':>9}")
+    for label, query, matches, ranking, fts_ms, like_ms in results:
+        print(
+            f"{label:<26}{query:<20}{matches:>9}  {ranking:<8}"
+            f"{fts_ms:>10.2f}{like_ms:>10.2f}{like_ms / fts_ms:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Benchmark API read throughput during sustained ingest: default SQLite vs the storage profile
+
+A writer process keeps inserting news batches (like the RSS ingest) while
+async readers page through the news list, for a fixed duration. The writer
+runs in its own process so the comparison measures SQLite locking, not the GIL. The
+"default" profile is plain engines in rollback-journal mode. The "profile"
+run uses app.core.database's WAL + pragmas + single writer + read-only pool.
+
+Usage (from backend/):
+    python -m benchmarks.bench_sqlite_concurrency [--seconds 10] [--readers 8] [--batch 200]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from app.core.database import (
+    Base,
+    create_async_engines,
+    create_routing_sessionmaker,
+    create_sync_engine,
+)
+from app.models import counter as _counter_models  # noqa: F401 註冊資料表
+from app.models.news import News
+
+SEED_ROWS = 20_000
+
+
+def make_rows(start: int, count: int) -> list[dict]:
+    return [
+        {
+            "title": f"story {i}",
+            "link": f"https://example.com/{i}",
+            "summary": "summary " * 40,
+            "source": "bench",
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def writer_process(name: str, url: str, stop, batch: int, results) -> None:
+    engine = make_sync_engine(name, url)
+    stats = {"batches": 0, "errors": 0, "commit_ms": [], "last_error": None}
+    next_id = SEED_ROWS
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(News), make_rows(next_id, batch))
+            stats["batches"] += 1
+            stats["commit_ms"].append((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            stats["errors"] += 1
+            stats["last_error"] = str(e).splitlines()[0]
+        next_id += batch
+    engine.dispose()
+    results.put(stats)
+
+
+def make_sync_engine(name: str, url: str):
+    if name == "profile":
+        return create_sync_engine(url)
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+
+async def reader_loop(factory, stop, stats: dict) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            async with factory() as db:
+                stmt = (
+                    select(News)
+                    .order_by(News.created_at.desc(), News.id.desc())
+                    .limit(20)
+                    .options(selectinload(News.tags))
+                )
+                (await db.execute(stmt)).scalars().all()
+            stats["latency_ms"].append((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            stats["errors"] += 1
+            stats["last_error"] = str(e).splitlines()[0]
+        await asyncio.sleep(0)
+
+
+async def run_profile(name: str, path: str, seconds: float, readers: int, batch: int) -> None:
+    url = f"sqlite:///{path}"
+    sync_engine = make_sync_engine(name, url)
+    if name == "profile":
+        writer, reader = create_async_engines(url)
+        factory = create_routing_sessionmaker(writer, reader)
+        engines = [writer, reader]
+    else:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        engines = [engine]
+
+    Base.metadata.create_all(bind=sync_engine)
+    with sync_engine.begin() as conn:
+        conn.execute(insert(News), make_rows(0, SEED_ROWS))
+
+    sync_engine.dispose()
+
+    read_stats = {"errors": 0, "latency_ms": [], "last_error": None}
+    stop = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    writer_proc = multiprocessing.Process(target=writer_process, args=(name, url, stop, batch, results))
+    writer_proc.start()
+    readers_task = asyncio.gather(*(reader_loop(factory, stop, read_stats) for _ in range(readers)))
+    await asyncio.sleep(seconds)
+    stop.set()
+    await readers_task
+    write_stats = results.get()
+    writer_proc.join()
+
+    latencies = sorted(read_stats["latency_ms"]) or [0.0]
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if len(latencies) > 1 else latencies[0]
+    print(
+        f"{name:>8}: {len(read_stats['latency_ms']) / seconds:8.0f} reads/s "
+        f"(p50 {statistics.median(latencies):6.1f} ms, p99 {p99:7.1f} ms, {read_stats['errors']} errors), "
+        f"{write_stats['batches'] * batch / seconds:8.0f} rows/s written "
+        f"(commit p50 {statistics.median(write_stats['commit_ms'] or [0]):5.1f} ms, "
+        f"{write_stats['errors']} errors)"
+    )
+    for stats in (read_stats, write_stats):
+        if stats["last_error"]:
+            print(f"          last error: {stats['last_error'][:100]}")
+
+    for engine in engines:
+        await engine.dispose()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--seconds", type=float, default=10.0)
+    arg_parser.add_argument("--readers", type=int, default=8)
+    arg_parser.add_argument("--batch", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("default", "profile"):
+            path = os.path.join(tmp, f"{name}.db")
+            asyncio.run(run_profile(name, path, args.seconds, args.readers, args.batch))
+
+
+if __name__ == "__main__":
+    main()
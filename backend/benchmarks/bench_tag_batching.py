@@ -0,0 +1,82 @@
+"""Benchmark tag extraction: one LLM call per article vs batched calls
+
+Reads stored news from the configured database (read-only) and tags them
+through the real gateway both ways, reporting tokens per tagged article,
+articles per minute and how many batched items needed a per-article
+fallback. Requires VERCEL_API_KEY; the response cache is not used.
+
+Usage (from backend/):
+    python -m benchmarks.bench_tag_batching [--articles 30] [--batch-size 10]
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.models.news import News
+from app.services.llm_client import VercelLLMClient
+
+
+async def load_articles(count: int) -> list[tuple[int, str, str]]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(News.id, News.title, News.summary).order_by(News.id.desc()).limit(count)
+        )
+        return [(row.id, row.title or "", row.summary or "") for row in result]
+
+
+def report(name: str, client: VercelLLMClient, tagged: int, elapsed: float, fallbacks: int = 0) -> None:
+    tokens = client.usage["prompt_tokens"] + client.usage["completion_tokens"]
+    print(
+        f"{name:>8}: {tagged} tagged, {client.usage['requests']} requests, "
+        f"{tokens / max(tagged, 1):.0f} tokens/article "
+        f"(prompt {client.usage['prompt_tokens'] / max(tagged, 1):.0f}), "
+        f"{tagged / elapsed * 60:.1f} articles/min, {fallbacks} fallbacks"
+    )
+
+
+async def run(articles: list[tuple[int, str, str]], batch_size: int) -> None:
+    single = VercelLLMClient()
+    started = time.perf_counter()
+    tagged = 0
+    for _, title, summary in articles:
+        if await single.extract_tags(title, summary):
+            tagged += 1
+    report("single", single, tagged, time.perf_counter() - started)
+    await single.aclose()
+
+    batched = VercelLLMClient()
+    started = time.perf_counter()
+    tagged = fallbacks = 0
+    for start in range(0, len(articles), batch_size):
+        batch = articles[start:start + batch_size]
+        tag_map = await batched.extract_tags_batch(batch)
+        tagged += len(tag_map)
+        for news_id, title, summary in batch:
+            if news_id not in tag_map:
+                fallbacks += 1
+                if await batched.extract_tags(title, summary):
+                    tagged += 1
+    report("batched", batched, tagged, time.perf_counter() - started, fallbacks)
+    await batched.aclose()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--articles", type=int, default=30)
+    arg_parser.add_argument("--batch-size", type=int, default=get_settings().tag_batch_size)
+    args = arg_parser.parse_args()
+
+    if not get_settings().vercel_api_key:
+        raise SystemExit("VERCEL_API_KEY is not set; this benchmark calls the real gateway.")
+
+    articles = asyncio.run(load_articles(args.articles))
+    print(f"Articles: {len(articles)}, batch size: {args.batch_size}")
+    asyncio.run(run(articles, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark the memmap vector index: flat scan vs IVF partitions at 1M vectors
+
+Fills a temporary VectorIndex with synthetic unit vectors. The vectors are
+noisy copies of topic centres, about 100 articles per topic, so
+neighbourhoods look like news clusters rather than uniform noise. --noise sets how far articles stray
+from their topic; at the default of 1.0 the cosine between articles of the
+same topic is about 0.5. The script reports:
+- write throughput
+- flat top-10 query latency
+- IVF training time
+- IVF latency and recall@10 against the flat result, for several probe counts
+- single-vector add latency after training
+- HashingEmbedder throughput on synthetic mixed Chinese/English text
+
+Usage (from backend/):
+    python -m benchmarks.bench_vector_index [--vectors 1000000] [--dim 256] [--queries 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.embedding import HashingEmbedder
+from app.services.vector_index import VectorIndex
+
+ARTICLES_PER_TOPIC = 100
+WRITE_BATCH = 20_000
+WORDS = [
+    "台積電", "先進製程", "晶片", "出口管制", "電動車", "電池", "央行", "升息", "通膨", "咖啡",
+    "semiconductor", "battery", "inflation", "startup", "funding", "robotics", "climate", "drone",
+]
+
+
+def unit_rows(rng: np.random.Generator, centres: np.ndarray, count: int, noise: float) -> np.ndarray:
+    """Topic centre plus a noise vector of norm about `noise`, normalised"""
+    rows = centres[rng.integers(len(centres), size=count)]
+    rows = rows + noise * rng.standard_normal(rows.shape, dtype=np.float32) / np.sqrt(centres.shape[1])
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def timed(fn, repeat: int) -> tuple[list, list[float]]:
+    results, times = [], []
+    for index in range(repeat):
+        started = time.perf_counter()
+        results.append(fn(index))
+        times.append(time.perf_counter() - started)
+    return results, times
+
+
+def summary(times: list[float]) -> str:
+    ordered = sorted(times)
+    return f"median {statistics.median(ordered) * 1000:7.2f} ms  p99 {ordered[int(len(ordered) * 0.99)] * 1000:7.2f} ms"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--vectors", type=int, default=1_000_000)
+    arg_parser.add_argument("--dim", type=int, default=256)
+    arg_parser.add_argument("--queries", type=int, default=200)
+    arg_parser.add_argument("--probes", type=int, nargs="+", default=[4, 16, 64])
+    arg_parser.add_argument("--partitions", type=int, default=None, help="IVF partitions (default: the index's own choice)")
+    arg_parser.add_argument("--noise", type=float, default=1.0)
+    arg_parser.add_argument("--seed", type=int, default=7)
+    args = arg_parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centres = rng.standard_normal((max(1, args.vectors // ARTICLES_PER_TOPIC), args.dim), dtype=np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    queries = unit_rows(rng, centres, args.queries, args.noise).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VectorIndex(os.path.join(tmp, "news"), args.dim)
+        started = time.perf_counter()
+        for start in range(1, args.vectors + 1, WRITE_BATCH):
+            count = min(WRITE_BATCH, args.vectors + 1 - start)
+            index.add_many(range(start, start + count), unit_rows(rng, centres, count, args.noise).astype(np.float32))
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(os.path.join(tmp, "news.vectors"))
+        print(f"wrote {len(index)} x {args.dim} float32 in {elapsed:.1f}s "
+              f"({len(index) / elapsed:,.0f} vectors/s, {size / 2**20:.0f} MiB memmap)")
+
+        flat, flat_times = timed(lambda i: index.search(queries[i], 10), args.queries)
+        print(f"flat scan           {summary(flat_times)}")
+
+        started = time.perf_counter()
+        partitions = index.train_ivf(args.partitions)
+        print(f"IVF training        {partitions} partitions in {time.perf_counter() - started:.1f}s")
+
+        for probes in args.probes:
+            hits, times = timed(lambda i: index.search(queries[i], 10, probes=probes), args.queries)
+            recall = statistics.mean(
+                len({item for item, _ in exact} & {item for item, _ in found}) / 10
+                for exact, found in zip(flat, hits)
+            )
+            print(f"IVF probes={probes:<7}{summary(times)}  recall@10 {recall:.3f}")
+
+        _, add_times = timed(
+            lambda i: index.add(args.vectors + 1 + i, unit_rows(rng, centres, 1, args.noise)[0].astype(np.float32)),
+            args.queries,
+        )
+        print(f"single add (IVF)    {summary(add_times)}")
+
+    text_rng = random.Random(args.seed)
+    texts = [
+        (" ".join(text_rng.choices(WORDS, k=8)), " ".join(text_rng.choices(WORDS, k=40)))
+        for _ in range(5000)
+    ]
+    embedder = HashingEmbedder(args.dim)
+    started = time.perf_counter()
+    embedder.embed_many(texts)
+    elapsed = time.perf_counter() - started
+    print(f"embedding           {elapsed / len(texts) * 1e6:.0f} µs per article ({len(texts) / elapsed:,.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Offline evaluation of the local TF-IDF tagger against stored LLM tags
+
+Loads LLM-tagged news from the configured database (read-only), trains the
+local tagger on the older part and predicts the newest --test-fraction.
+For each confidence threshold it reports how many articles would skip the
+LLM (coverage) and how well those predictions agree with the stored tags.
+
+Usage (from backend/):
+    python -m benchmarks.eval_local_tagger [--test-fraction 0.2] [--db sqlite+aiosqlite:///./ideageneration.db]
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.database import AsyncSessionLocal
+from app.models.news import News, Tag
+from app.services.local_tagger import LocalTagger
+
+THRESHOLDS = (0.0, 0.2, 0.3, 0.35, 0.4, 0.5, 0.6)
+
+
+async def load(db_url: str | None) -> tuple[list[tuple[str, str, list[str]]], list[str]]:
+    factory = AsyncSessionLocal
+    if db_url:
+        factory = async_sessionmaker(bind=create_async_engine(db_url))
+    async with factory() as db:
+        vocabulary = list((await db.execute(select(Tag.name))).scalars())
+        # 只以 LLM 標籤為標準答案，本地預測與沿用群組的標籤不列入（需已執行遷移 8）
+        stmt = (
+            select(News.id, News.title, News.summary, Tag.name)
+            .join(News.tags)
+            .where(News.tag_source == "llm")
+            .order_by(News.id)
+        )
+        documents: dict[int, tuple[str, str, list[str]]] = {}
+        for news_id, title, summary, tag_name in await db.execute(stmt):
+            documents.setdefault(news_id, (title or "", summary or "", []))[2].append(tag_name)
+    return list(documents.values()), vocabulary
+
+
+def evaluate(documents, vocabulary, test_fraction: float) -> None:
+    split = int(len(documents) * (1 - test_fraction))
+    train, test = documents[:split], documents[split:]
+    if not train or not test:
+        raise SystemExit("Not enough tagged news to evaluate.")
+
+    started = time.perf_counter()
+    tagger = LocalTagger.fit(train, vocabulary)
+    fit_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    predictions = [tagger.predict(title, summary) for title, summary, _ in test]
+    predict_us = (time.perf_counter() - started) / len(test) * 1e6
+
+    print(f"Train {len(train)} / test {len(test)} articles, {len(tagger.tags)} known tags")
+    print(f"Fit {fit_ms:.1f} ms, predict {predict_us:.1f} µs/article\n")
+    print(f"{'threshold':>9} {'coverage':>9} {'precision':>9} {'recall':>7} {'any-hit':>8}")
+    for threshold in THRESHOLDS:
+        covered = [
+            (prediction.tags, set(tags))
+            for prediction, (_, _, tags) in zip(predictions, test)
+            if prediction.tags and prediction.confidence >= threshold
+        ]
+        if not covered:
+            print(f"{threshold:>9.2f} {0:>8.0%} {'-':>9} {'-':>7} {'-':>8}")
+            continue
+        hits = sum(len(set(predicted) & expected) for predicted, expected in covered)
+        predicted_total = sum(len(predicted) for predicted, _ in covered)
+        expected_total = sum(len(expected) for _, expected in covered)
+        any_hit = sum(1 for predicted, expected in covered if set(predicted) & expected)
+        print(
+            f"{threshold:>9.2f} {len(covered) / len(test):>8.0%} "
+            f"{hits / predicted_total:>9.2f} {hits / expected_total:>7.2f} "
+            f"{any_hit / len(covered):>8.0%}"
+        )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--test-fraction", type=float, default=0.2)
+    arg_parser.add_argument("--db", default=None, help="async database URL (defaults to settings)")
+    args = arg_parser.parse_args()
+
+    documents, vocabulary = asyncio.run(load(args.db))
+    evaluate(documents, vocabulary, args.test_fraction)
+
+
+if __name__ == "__main__":
+    main()
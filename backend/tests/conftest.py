@@ -0,0 +1,211 @@
+"""Shared fixtures and helpers: run database tests against SQLite and PostgreSQL
+
+session_factory gives each test a freshly migrated, empty database on both
+backends; the SQLite leg is in memory. storage_backend adds the production
+engine setup (file SQLite with a single writer and read-only readers).
+
+The PostgreSQL leg uses TEST_POSTGRES_URL when set. Otherwise it starts a
+throwaway server with initdb/pg_ctl from PATH. It is skipped when neither is
+available or the asyncpg driver is not installed.
+"""
+import asyncio
+import importlib.util
+import os
+import shutil
+import socket
+import subprocess
+from typing import NamedTuple
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+from sqlalchemy.pool import NullPool, StaticPool
+
+from app.core.database import (
+    Base,
+    async_database_url,
+    create_async_engines,
+    create_routing_sessionmaker,
+    init_db,
+)
+from app.models.news import News
+
+
+class StorageBackend(NamedTuple):
+    """One freshly migrated database with production-style engines"""
+    name: str
+    url: str
+    async_engines: tuple[AsyncEngine, ...]
+    session_factory: async_sessionmaker[AsyncSession]
+
+    def run(self, coro):
+        """asyncio.run the test body, then dispose the pools on the same loop
+
+        Pooled asyncpg connections belong to the loop that opened them and
+        cannot be closed from the fixture's teardown loop.
+        """
+        async def body():
+            try:
+                return await coro
+            finally:
+                for engine in self.async_engines:
+                    await engine.dispose()
+
+        return asyncio.run(body())
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def postgres_url(tmp_path_factory):
+    if importlib.util.find_spec("asyncpg") is None:
+        pytest.skip("asyncpg not installed")
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if url:
+        yield url
+        return
+
+    initdb, pg_ctl = shutil.which("initdb"), shutil.which("pg_ctl")
+    if not (initdb and pg_ctl):
+        pytest.skip("TEST_POSTGRES_URL not set and initdb/pg_ctl not on PATH")
+    data_dir = tmp_path_factory.mktemp("pgdata")
+    port = _free_port()
+    try:
+        subprocess.run(
+            [initdb, "-D", str(data_dir), "-U", "postgres", "--auth=trust", "-E", "UTF8"],
+            check=True, capture_output=True,
+        )
+        subprocess.run(
+            [pg_ctl, "-D", str(data_dir), "-l", str(data_dir / "server.log"), "-w", "start",
+             "-o", f"-p {port} -k {data_dir} -c listen_addresses=127.0.0.1"],
+            check=True, capture_output=True,
+        )
+    except subprocess.CalledProcessError as e:
+        pytest.skip(f"could not start a local PostgreSQL: {e.stderr.decode(errors='replace')[:200]}")
+    try:
+        yield f"postgresql://postgres@127.0.0.1:{port}/postgres"
+    finally:
+        subprocess.run([pg_ctl, "-D", str(data_dir), "-m", "fast", "stop"], capture_output=True)
+
+
+async def _reset_postgres(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA public CASCADE"))
+        await conn.execute(text("CREATE SCHEMA public"))
+
+
+@pytest.fixture
+def memory_session_factory():
+    """A migrated, empty in-memory SQLite database (one shared connection)"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    asyncio.run(init_db(engine))
+    yield async_sessionmaker(bind=engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def session_factory(request):
+    """A migrated, empty database on each backend
+
+    PostgreSQL opens a new connection per checkout (NullPool), so tests that
+    call asyncio.run more than once never reuse a connection from a closed loop.
+    """
+    if request.param == "sqlite":
+        yield request.getfixturevalue("memory_session_factory")
+        return
+
+    engine = create_async_engine(async_database_url(request.getfixturevalue("postgres_url")), poolclass=NullPool)
+
+    async def bootstrap():
+        await _reset_postgres(engine)
+        await init_db(engine)
+
+    asyncio.run(bootstrap())
+    yield async_sessionmaker(bind=engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def storage_backend(request, tmp_path):
+    """A migrated, empty database on each backend"""
+    if request.param == "sqlite":
+        url = f"sqlite:///{tmp_path / 'storage.db'}"
+    else:
+        url = request.getfixturevalue("postgres_url")
+
+    writer, reader = create_async_engines(url)
+    engines = (writer,) if reader is writer else (writer, reader)
+
+    async def dispose():
+        for engine in engines:
+            await engine.dispose()
+
+    async def bootstrap():
+        if request.param == "postgresql":
+            await _reset_postgres(writer)
+        await init_db(writer)
+        # 每個測試在自己的事件迴圈執行，不把連線留到下一個迴圈
+        await dispose()
+
+    asyncio.run(bootstrap())
+    yield StorageBackend(
+        request.param,
+        url,
+        engines,
+        create_routing_sessionmaker(writer, reader),
+    )
+    asyncio.run(dispose())
+
+
+async def sync_id_sequences(db: AsyncSession) -> None:
+    """Move PostgreSQL id sequences past rows inserted with explicit ids (no-op on SQLite)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for table in Base.metadata.sorted_tables:
+        if "id" in table.c and table.c.id.primary_key:
+            await db.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), COALESCE(MAX(id), 0) + 1, false) "
+                f"FROM {table.name}"
+            ))
+    await db.commit()
+
+
+async def add_stories(db: AsyncSession, count: int) -> None:
+    """Insert `count` untagged news rows titled story 1 .. story N"""
+    db.add_all([
+        News(title=f"story {i}", link=f"https://example.com/{i}", source="test")
+        for i in range(1, count + 1)
+    ])
+    await db.commit()
+
+
+async def load_tags(db: AsyncSession) -> dict[int, list[str]]:
+    """Tag names per news id, sorted"""
+    stored = (await db.execute(select(News).options(selectinload(News.tags)))).scalars().all()
+    return {news.id: sorted(tag.name for tag in news.tags) for news in stored}
+
+
+class BatchLLMClient:
+    """Answers batches but 'forgets' some ids, like a sloppy model would"""
+
+    def __init__(self, drop_ids: set[int] = frozenset()):
+        self.drop_ids = drop_ids
+        self.batch_calls: list[list[int]] = []
+        self.single_calls: list[str] = []
+
+    async def extract_tags_batch(self, articles):
+        self.batch_calls.append([news_id for news_id, _, _ in articles])
+        return {
+            news_id: [f"tag-{news_id}", "shared"]
+            for news_id, _, _ in articles
+            if news_id not in self.drop_ids
+        }
+
+    async def extract_tags(self, news_title: str, news_summary: str) -> list[str]:
+        self.single_calls.append(news_title)
+        return ["single", "shared"]
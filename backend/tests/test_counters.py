@@ -0,0 +1,90 @@
+"""Test maintained row counters"""
+import asyncio
+
+from sqlalchemy import func, insert, select
+
+from app.models.counter import Counter
+from app.models.news import Idea, News, Tag
+from app.services.counters import get_count, reconcile_counters
+from app.services.feed_parser import FeedEntry
+from app.services.idea_service import IdeaService
+from app.services.rss_fetcher import RSSFetcher
+from app.services.tag_extractor import TagExtractor
+from tests.conftest import BatchLLMClient
+
+
+def entries(source: str, start: int, count: int) -> list[FeedEntry]:
+    # 各來源的連結互相重疊，同時寫入時會觸發 ON CONFLICT DO NOTHING
+    return [
+        FeedEntry(f"{source} story {i}", f"https://example.com/{i}", f"summary {i}", source, None)
+        for i in range(start, start + count)
+    ]
+
+
+def test_counters_stay_exact_under_concurrent_ingest_and_ideas(storage_backend):
+    """Parallel ingest, tagging and idea writes leave counters equal to COUNT(*)"""
+    factory = storage_backend.session_factory
+
+    async def ingest(worker: int) -> None:
+        async with factory() as db:
+            fetcher = RSSFetcher(db, downloader=object(), parser=object())
+            for round_ in range(5):
+                await fetcher._save_entries([entries(f"src{worker}", round_ * 10 + worker * 3, 12)])
+
+    async def generate(worker: int) -> None:
+        async with factory() as db:
+            service = IdeaService(db, llm_client=None, session_factory=factory)
+            for i in range(10):
+                await service._save_idea(db, f"點子名稱：idea {worker}-{i}", "a", "b")
+
+    async def tag() -> None:
+        async with factory() as db:
+            # 至少標籤三輪，且持續到有新聞可標籤為止（PostgreSQL 上匯入可能晚於前幾輪才提交）
+            processed = 0
+            for round_ in range(200):
+                result = await TagExtractor(db, BatchLLMClient()).process_untagged_news(limit=20, batch_size=5)
+                processed += result["processed"]
+                if round_ >= 2 and processed:
+                    break
+                await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(
+            *(ingest(worker) for worker in range(4)),
+            *(generate(worker) for worker in range(3)),
+            tag(),
+        )
+        async with factory() as db:
+            counted = {name: await get_count(db, name) for name in ("news", "tags", "ideas")}
+            actual = {
+                "news": (await db.execute(select(func.count()).select_from(News))).scalar_one(),
+                "tags": (await db.execute(select(func.count()).select_from(Tag))).scalar_one(),
+                "ideas": (await db.execute(select(func.count()).select_from(Idea))).scalar_one(),
+            }
+            drift = await reconcile_counters(db)
+        return counted, actual, drift
+
+    counted, actual, drift = storage_backend.run(run())
+
+    assert actual["news"] > 0 and actual["ideas"] == 30 and actual["tags"] > 0
+    assert counted == actual
+    assert drift == {}
+
+
+def test_reconcile_fixes_drift_from_direct_writes(session_factory):
+    """Rows written around the services are picked up by reconciliation"""
+    async def run():
+        async with session_factory() as db:
+            await db.execute(insert(Tag), [{"name": f"t{i}"} for i in range(3)])
+            await db.execute(Counter.__table__.delete().where(Counter.name == "ideas"))
+            await db.commit()
+            before = await get_count(db, "tags")
+            drift = await reconcile_counters(db)
+            after = {name: await get_count(db, name) for name in ("news", "tags", "ideas")}
+        return before, drift, after
+
+    before, drift, after = asyncio.run(run())
+
+    assert before == 0
+    assert drift == {"tags": 3, "ideas": 0}
+    assert after == {"news": 0, "tags": 3, "ideas": 0}
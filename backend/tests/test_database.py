@@ -0,0 +1,65 @@
+"""Test the SQLite storage profile (WAL, pragmas, read/write routing)"""
+import asyncio
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import select, text, update
+from sqlalchemy.exc import OperationalError
+
+from app.core.database import (
+    Base,
+    create_async_engines,
+    create_routing_sessionmaker,
+    create_sync_engine,
+    uses_sqlite_profile,
+)
+from app.models.news import News
+
+
+def test_profile_only_applies_to_file_databases():
+    """In-memory SQLite keeps a single plain engine"""
+    assert uses_sqlite_profile("sqlite:///./data.db")
+    assert not uses_sqlite_profile("sqlite://")
+    assert not uses_sqlite_profile("sqlite:///:memory:")
+
+
+def test_routing_session_sends_writes_to_writer_and_reads_to_reader():
+    """Writes go through the WAL writer; reads use read-only connections that see committed rows"""
+
+    async def scenario(path: str):
+        url = f"sqlite:///{path}"
+        sync_engine = create_sync_engine(url)
+        Base.metadata.create_all(bind=sync_engine)
+        sync_engine.dispose()
+
+        writer, reader = create_async_engines(url)
+        factory = create_routing_sessionmaker(writer, reader)
+        try:
+            async with factory() as db:
+                db.add(News(title="draft", link="https://example.com/1", source="test"))
+                await db.commit()
+                # ORM 依主鍵批次 UPDATE 只以 mapper 取得連線
+                news_id = (await db.execute(select(News.id))).scalar_one()
+                await db.execute(update(News), [{"id": news_id, "title": "story"}])
+                await db.commit()
+
+            async with factory() as db:
+                titles = (await db.execute(select(News.title))).scalars().all()
+                assert titles == ["story"]
+                assert db.get_bind(clause=select(News)) is reader.sync_engine
+
+            async with writer.connect() as conn:
+                assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+                # NORMAL = 1
+                assert (await conn.execute(text("PRAGMA synchronous"))).scalar() == 1
+
+            async with reader.connect() as conn:
+                with pytest.raises(OperationalError, match="readonly"):
+                    await conn.execute(text("DELETE FROM news"))
+        finally:
+            await writer.dispose()
+            await reader.dispose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(os.path.join(tmp, "profile.db")))
@@ -0,0 +1,147 @@
+"""Test the streaming idea and devil-audit endpoints"""
+import asyncio
+import json
+
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.news import Idea, News, Tag
+from app.routers import ideas
+from app.services.idea_service import IdeaService
+from app.services.llm_client import VercelLLMClient
+
+IDEA_TEXT = "點子名稱：晶片醫療\n\n概念說明：把 AI 晶片帶進診所。"
+
+
+def sse_body(text: str, pieces: int = 4) -> bytes:
+    step = max(1, len(text) // pieces)
+    lines = [
+        "data: " + json.dumps({"choices": [{"delta": {"content": text[i:i + step]}}]}, ensure_ascii=False)
+        for i in range(0, len(text), step)
+    ]
+    lines.append("data: " + json.dumps({"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": 5}}))
+    lines.append("data: [DONE]")
+    return ("\n\n".join(lines) + "\n\n").encode()
+
+
+def make_llm_client(text: str) -> VercelLLMClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, content=sse_body(text), headers={"content-type": "text/event-stream"})
+
+    return VercelLLMClient(transport=httpx.MockTransport(handler))
+
+
+async def seed(factory: async_sessionmaker) -> async_sessionmaker:
+    async with factory() as db:
+        tag = Tag(name="AI")
+        db.add_all([
+            News(title="AI chips", link="https://example.com/1", source="test", tags=[tag]),
+            News(title="Clinics go digital", link="https://example.com/2", source="test", tags=[tag]),
+        ])
+        await db.commit()
+    return factory
+
+
+def parse_events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+async def post(factory, llm_client, path: str, payload: dict) -> str:
+    from app.main import app
+
+    db = factory()
+    app.dependency_overrides[ideas._get_idea_service] = lambda: IdeaService(db, llm_client, factory)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(path, json=payload)
+        assert response.headers["content-type"].startswith("text/event-stream")
+        return response.text
+    finally:
+        app.dependency_overrides.clear()
+        await db.close()
+        await llm_client.aclose()
+
+
+def test_generate_stream_relays_deltas_then_persists_idea(session_factory):
+    """Deltas arrive as SSE events and the idea is saved once the stream ends"""
+    async def run():
+        factory = await seed(session_factory)
+        body = await post(factory, make_llm_client(IDEA_TEXT), "/api/ideas/generate/stream", {"news_ids": [1, 2]})
+        async with factory() as db:
+            stored = (await db.execute(select(Idea))).scalars().all()
+        return parse_events(body), stored
+
+    events, stored = asyncio.run(run())
+
+    deltas = [data["text"] for event, data in events if event == "delta"]
+    assert len(deltas) > 1
+    assert "".join(deltas) == IDEA_TEXT
+    assert events[-1][0] == "done"
+    assert events[-1][1]["title"] == "晶片醫療"
+    assert [idea.content for idea in stored] == [IDEA_TEXT]
+
+
+def test_save_failure_after_deltas_ends_with_error_event(session_factory, monkeypatch):
+    """A non-application error while saving still closes the stream with a 500 error event"""
+    async def failing_save(*args, **kwargs):
+        raise RuntimeError("database is gone")
+
+    monkeypatch.setattr(IdeaService, "_save_idea", failing_save)
+
+    async def run():
+        factory = await seed(session_factory)
+        body = await post(factory, make_llm_client(IDEA_TEXT), "/api/ideas/generate/stream", {"news_ids": [1, 2]})
+        return parse_events(body)
+
+    events = asyncio.run(run())
+
+    assert events[0][0] == "delta"
+    assert events[-1] == ("error", {"detail": "伺服器內部錯誤", "status_code": 500})
+
+
+def test_closed_stream_does_not_persist_partial_idea(session_factory):
+    """A client that goes away mid-stream leaves no half-written idea behind"""
+    async def run():
+        factory = await seed(session_factory)
+        llm_client = make_llm_client(IDEA_TEXT)
+        async with factory() as db:
+            service = IdeaService(db, llm_client, factory)
+            news_a, news_b = await service.get_news_by_ids([1, 2])
+            events = service.stream_idea(news_a, news_b)
+            first = await anext(events)
+            await events.aclose()
+            count = (await db.execute(select(func.count(Idea.id)))).scalar_one()
+        await llm_client.aclose()
+        return first, count
+
+    first, count = asyncio.run(run())
+
+    assert first[0] == "delta"
+    assert count == 0
+
+
+def test_devil_audit_stream_updates_idea(session_factory):
+    """The streamed audit is written back to the idea when complete"""
+    audit = "🔥 冷啟動怎麼解決？\n🔥 為什麼大公司不能複製？"
+
+    async def run():
+        factory = await seed(session_factory)
+        async with factory() as db:
+            db.add(Idea(title="x", content=IDEA_TEXT))
+            await db.commit()
+        body = await post(factory, make_llm_client(audit), "/api/ideas/devil-audit/stream", {"idea_id": 1})
+        async with factory() as db:
+            idea = await db.get(Idea, 1)
+        return parse_events(body), idea
+
+    events, idea = asyncio.run(run())
+
+    assert events[-1] == ("done", {"idea_id": 1, "audit_questions": audit})
+    assert idea.devil_audit == audit
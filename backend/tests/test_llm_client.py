@@ -0,0 +1,137 @@
+"""Test the pooled LLM client"""
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.llm_cache import LLMCacheEntry
+from app.services.llm_cache import LLMCache
+from app.services.llm_client import VercelLLMClient
+
+
+def make_client(handler) -> VercelLLMClient:
+    return VercelLLMClient(transport=httpx.MockTransport(handler))
+
+
+def chat_response(content: str, **extra) -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"content": content}}], **extra})
+
+
+def test_client_is_reused_across_calls():
+    """All calls share one long-lived AsyncClient until aclose()"""
+    paths = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        return chat_response("AI, 晶片")
+
+    async def run():
+        client = make_client(handler)
+        await client.open()
+        first = client._get_client()
+        results = [await client.complete("hi") for _ in range(3)]
+        same = client._get_client() is first
+        await client.aclose()
+        return results, same, first.is_closed
+
+    results, same, closed = asyncio.run(run())
+
+    assert results == ["AI, 晶片"] * 3
+    assert same and closed
+    assert paths == ["/v1/chat/completions"] * 3
+
+
+def make_cache(factory: async_sessionmaker, max_entries: int = 100) -> LLMCache:
+    cache = LLMCache(factory)
+    cache.max_entries = max_entries
+    return cache
+
+
+def test_cache_hits_memory_then_database_and_honors_bypass(session_factory):
+    """Repeated prompts are served from cache; bypassed calls always hit the gateway"""
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return chat_response(f"answer {len(calls)}")
+
+    cache = make_cache(session_factory)
+
+    async def run():
+        client = VercelLLMClient(transport=httpx.MockTransport(handler), cache=cache)
+        first = await client.complete("same prompt", prompt_type="tags")
+        second = await client.complete("same prompt", prompt_type="tags")
+        other_temperature = await client.complete("same prompt", temperature=0.1)
+        sampled = [await client.complete("idea", use_cache=False) for _ in range(2)]
+
+        # A fresh process only has the database tier
+        restarted = LLMCache(cache._session_factory)
+        client_after_restart = VercelLLMClient(transport=httpx.MockTransport(handler), cache=restarted)
+        third = await client_after_restart.complete("same prompt", prompt_type="tags")
+        await client.aclose()
+        await client_after_restart.aclose()
+        return first, second, other_temperature, sampled, third, restarted.get_stats()
+
+    first, second, other_temperature, sampled, third, restarted_stats = asyncio.run(run())
+
+    assert first == second == third == "answer 1"
+    assert other_temperature == "answer 2"
+    assert sampled == ["answer 3", "answer 4"]
+    assert len(calls) == 4
+    assert cache.stats["memory_hits"] == 1
+    assert cache.stats["bypassed"] == 2
+    assert restarted_stats["db_hits"] == 1
+
+
+def test_database_tier_is_size_bounded(session_factory):
+    """Least recently used entries are evicted past max_entries, every evict_every writes"""
+    cache = make_cache(session_factory, max_entries=2)
+    cache.evict_every = 2
+
+    async def keys():
+        async with cache._session_factory() as session:
+            return set((await session.execute(select(LLMCacheEntry.key))).scalars())
+
+    async def run():
+        for i in range(3):
+            await cache.set(f"key{i}", f"value{i}", "default")
+        between = await keys()
+        await cache.set("key3", "value3", "default")
+        return between, await keys()
+
+    between, after = asyncio.run(run())
+
+    assert between == {"key0", "key1", "key2"}
+    assert after == {"key2", "key3"}
+    assert cache.stats["evictions"] == 2
+
+
+def test_database_hits_only_touch_stale_access_times(session_factory):
+    """A hit rewrites last_accessed_at only when it is older than touch_interval"""
+    cache = make_cache(session_factory)
+    stale = datetime.utcnow() - cache.touch_interval - timedelta(minutes=1)
+
+    async def accessed_at(key: str) -> datetime:
+        async with cache._session_factory() as session:
+            return (await session.get(LLMCacheEntry, key)).last_accessed_at
+
+    async def run():
+        await cache.set("fresh", "a", "default")
+        await cache.set("stale", "b", "default")
+        async with cache._session_factory() as session:
+            await session.execute(
+                update(LLMCacheEntry).where(LLMCacheEntry.key == "stale").values(last_accessed_at=stale)
+            )
+            await session.commit()
+        fresh_before = await accessed_at("fresh")
+        restarted = LLMCache(cache._session_factory)
+        values = [await restarted.get("fresh"), await restarted.get("stale")]
+        return values, fresh_before, await accessed_at("fresh"), await accessed_at("stale")
+
+    values, fresh_before, fresh_after, stale_after = asyncio.run(run())
+
+    assert values == ["a", "b"]
+    assert fresh_after == fresh_before
+    assert stale_after > stale
@@ -0,0 +1,115 @@
+"""Test the local TF-IDF tagger and its LLM fallback"""
+import asyncio
+
+from sqlalchemy import insert, select
+
+from app.core.config import get_settings
+from app.models.news import News, Tag, news_tags
+from app.services.local_tagger import LocalTagger, load_local_tagger
+from app.services.tag_extractor import TagExtractor
+from tests.conftest import BatchLLMClient, load_tags
+
+CORPUS = [
+    ("Nvidia unveils new AI chip", "The GPU accelerates machine learning in data centers", ["人工智慧", "半導體"]),
+    ("AMD launches AI accelerator chip", "New GPU targets machine learning workloads", ["人工智慧", "半導體"]),
+    ("Intel shows AI chip roadmap", "Data center GPU and machine learning plans", ["人工智慧", "半導體", "資料中心"]),
+    ("Bank raises interest rates", "The central bank fights inflation with higher rates", ["貨幣政策", "通膨"]),
+    ("Central bank holds rates", "Inflation cools as the bank pauses rate hikes", ["貨幣政策", "通膨"]),
+    ("新款電動車 發表", "電動車 電池 續航力 提升", ["電動車", "電池"]),
+    ("電動車 銷量 創新高", "電池 成本 下降 帶動 電動車 需求", ["電動車", "電池"]),
+]
+
+
+def make_tagger() -> LocalTagger:
+    return LocalTagger.fit(CORPUS, vocabulary=["資料中心", "雲端"])
+
+
+def test_predicts_learned_tags_with_confidence():
+    """Articles close to the training corpus get its tags with high confidence"""
+    tagger = make_tagger()
+
+    prediction = tagger.predict("Qualcomm reveals AI chip", "A GPU for machine learning in the data center")
+
+    assert prediction.tags[:2] == ["人工智慧", "半導體"] or prediction.tags[:2] == ["半導體", "人工智慧"]
+    assert prediction.confidence >= get_settings().local_tagger_threshold
+
+    cjk = tagger.predict("電動車 電池 新技術", "")
+    assert {"電動車", "電池"} <= set(cjk.tags)
+
+
+def test_unfamiliar_article_has_low_confidence():
+    """Nothing in the corpus resembles the article, so it should go to the LLM"""
+    prediction = make_tagger().predict("Football club signs striker", "The transfer fee was record breaking")
+
+    assert prediction.confidence < get_settings().local_tagger_threshold
+
+
+def test_literal_match_hits_vocabulary_without_training_data():
+    """A known tag name appearing verbatim is suggested even with no examples"""
+    prediction = make_tagger().predict("企業 加速 導入 雲端", "")
+
+    assert "雲端" in prediction.tags
+
+
+def test_short_english_tag_names_match_whole_words_only():
+    """'AI' and 'EV' are not found inside 'said' or 'evacuation'; whole words and phrases still match"""
+    tagger = LocalTagger.fit([], ["AI", "EV", "5G", "Machine Learning", "雲端"])
+
+    unrelated = tagger.predict("Senator said the river levels remain high", "Officials maintain evacuation plans")
+    related = tagger.predict("New EV maker bets on AI", "Machine-learning chips over 5G networks")
+
+    assert unrelated.tags == []
+    assert unrelated.confidence < get_settings().local_tagger_threshold
+    assert set(related.tags) == {"AI", "EV", "5G", "Machine Learning"}
+
+
+def test_confident_articles_skip_the_llm(session_factory):
+    """Only low-confidence articles are sent to the LLM"""
+    llm = BatchLLMClient()
+
+    async def run():
+        async with session_factory() as db:
+            db.add_all([
+                News(title="Qualcomm reveals AI chip", summary="GPU for machine learning", link="https://e.com/1", source="t"),
+                News(title="Football club signs striker", summary="Record fee", link="https://e.com/2", source="t"),
+            ])
+            await db.commit()
+            extractor = TagExtractor(db, llm, local_tagger=make_tagger())
+            result = await extractor.process_untagged_news(limit=10, batch_size=5)
+            sources = dict((await db.execute(select(News.id, News.tag_source))).tuples().all())
+            return result, await load_tags(db), sources
+
+    result, tags, sources = asyncio.run(run())
+
+    assert sources == {1: "local", 2: "llm"}
+    assert result["local_tagged"] == 1
+    assert result["processed"] == 2
+    assert llm.single_calls == ["Football club signs striker"]
+    assert "人工智慧" in tags[1]
+
+
+def test_tagger_trains_only_on_llm_labelled_news(session_factory):
+    """Local predictions and tags copied from clusters never become training data"""
+    async def run():
+        async with session_factory() as db:
+            db.add_all([Tag(id=1, name="人工智慧"), Tag(id=2, name="足球")])
+            await db.execute(insert(News), [
+                {"id": i, "title": f"AI chip story {i}", "summary": "GPU machine learning",
+                 "link": f"https://e.com/{i}", "source": "t", "tag_source": "llm"}
+                for i in (1, 2)
+            ] + [
+                {"id": i, "title": f"Football transfer {i}", "summary": "striker record fee",
+                 "link": f"https://e.com/{i}", "source": "t", "tag_source": source}
+                for i, source in ((3, "local"), (4, "local"), (5, "cluster"))
+            ])
+            await db.execute(insert(news_tags), [
+                {"news_id": 1, "tag_id": 1}, {"news_id": 2, "tag_id": 1},
+                {"news_id": 3, "tag_id": 2}, {"news_id": 4, "tag_id": 2}, {"news_id": 5, "tag_id": 2},
+            ])
+            await db.commit()
+            return await load_local_tagger(db)
+
+    tagger = asyncio.run(run())
+
+    assert "人工智慧" in tagger.predict("New AI chip", "GPU for machine learning").tags
+    assert "足球" not in tagger.predict("Football transfer news", "striker record fee").tags
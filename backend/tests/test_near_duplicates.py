@@ -0,0 +1,69 @@
+"""Test near-duplicate clustering and tag reuse"""
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.core.config import get_settings
+from app.models.news import News
+from app.services.simhash import hamming_distance, news_fingerprint
+from app.services.tag_extractor import TagExtractor
+
+
+class FakeLLMClient:
+    """Counts tag extraction calls instead of calling the gateway"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def extract_tags(self, news_title: str, news_summary: str) -> list[str]:
+        self.calls += 1
+        return ["AI", "Chips"]
+
+    async def extract_tags_batch(self, articles: list[tuple[int, str, str]]) -> dict[int, list[str]]:
+        self.calls += 1
+        return {news_id: ["AI", "Chips"] for news_id, _, _ in articles}
+
+
+def test_fingerprint_separates_syndicated_copies_from_other_stories():
+    """Syndicated copies land within the threshold, unrelated stories do not"""
+    title = "Nvidia unveils next-generation AI chip for data centers"
+    original = news_fingerprint(title, "Nvidia on Monday unveiled its newest accelerator.")
+    copy = news_fingerprint(title, "Nvidia on Monday unveiled the newest accelerator.")
+    other = news_fingerprint("Apple opens new retail store in Taipei", "The store opens Friday.")
+
+    threshold = get_settings().dedup_hamming_threshold
+    assert hamming_distance(original, copy) <= threshold
+    assert hamming_distance(original, other) > threshold
+    assert news_fingerprint("台積電 2 奈米量產", None) != 0
+
+
+def test_cluster_members_reuse_canonical_tags(session_factory):
+    """Only the canonical story pays for an LLM call"""
+    fingerprint = news_fingerprint("Same story", "Same summary")
+
+    async def run():
+        async with session_factory() as db:
+            canonical = News(title="Same story", link="https://a/1", source="A", simhash=fingerprint)
+            db.add(canonical)
+            await db.flush()
+            db.add_all([
+                News(title="Same story", link="https://b/1", source="B", simhash=fingerprint,
+                     cluster_id=canonical.id),
+                News(title="Other story", link="https://c/1", source="C"),
+            ])
+            await db.commit()
+
+            llm = FakeLLMClient()
+            result = await TagExtractor(db, llm).process_untagged_news(limit=10)
+            stored = (await db.execute(
+                select(News).options(selectinload(News.tags)).order_by(News.id)
+            )).scalars().all()
+            return llm.calls, result, [sorted(tag.name for tag in news.tags) for news in stored]
+
+    calls, result, tags = asyncio.run(run())
+
+    assert calls == 1
+    assert result["processed"] == 3
+    assert result["llm_calls_avoided"] == 1
+    assert tags == [["AI", "Chips"]] * 3
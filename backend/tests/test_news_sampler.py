@@ -0,0 +1,117 @@
+"""Test size-independent random news sampling"""
+import asyncio
+from collections import Counter
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.exceptions import InsufficientDataError
+from app.models.news import News, Tag, news_tags
+from app.services.news_sampler import sample_news_ids, sample_news_pair
+
+
+async def make_session(
+    factory: async_sessionmaker, rows: int, tagged: set[int], clustered: set[int] = frozenset()
+) -> AsyncSession:
+    db = factory()
+    db.add(Tag(id=1, name="AI"))
+    await db.execute(insert(News), [
+        {
+            "id": i,
+            "title": f"story {i}",
+            "link": f"https://example.com/{i}",
+            "source": "test",
+            "cluster_id": 1 if i in clustered else None,
+        }
+        for i in range(1, rows + 1)
+    ])
+    await db.execute(insert(news_tags), [{"news_id": i, "tag_id": 1} for i in tagged])
+    await db.commit()
+    return db
+
+
+def test_pair_only_contains_tagged_canonical_news_with_tags_loaded(session_factory):
+    """Untagged news and cluster members are never sampled"""
+    async def run():
+        db = await make_session(session_factory, 200, tagged=set(range(2, 201, 2)), clustered={4, 6, 8})
+        pairs = [await sample_news_pair(db) for _ in range(50)]
+        await db.close()
+        return pairs
+
+    for news_a, news_b in asyncio.run(run()):
+        assert news_a.id != news_b.id
+        for news in (news_a, news_b):
+            assert news.id % 2 == 0 and news.id not in {4, 6, 8}
+            assert [tag.name for tag in news.tags] == ["AI"]
+
+
+def test_sparse_eligible_rows_are_still_found(session_factory):
+    """When rejection sampling misses, the index walk still finds the rare rows"""
+    async def run():
+        db = await make_session(session_factory, 5000, tagged={17, 4321})
+        ids = [sorted(await sample_news_ids(db, 2)) for _ in range(5)]
+        await db.close()
+        return ids
+
+    assert asyncio.run(run()) == [[17, 4321]] * 5
+
+
+def test_insufficient_data_raises(session_factory):
+    async def run():
+        db = await make_session(session_factory, 100, tagged={50})
+        try:
+            await sample_news_pair(db)
+        finally:
+            await db.close()
+
+    with pytest.raises(InsufficientDataError):
+        asyncio.run(run())
+
+
+def test_sampling_is_roughly_uniform(session_factory):
+    """Every eligible row is drawn with similar frequency"""
+    async def run():
+        db = await make_session(session_factory, 40, tagged=set(range(1, 41)))
+        counts = Counter()
+        for _ in range(1000):
+            counts.update(await sample_news_ids(db, 2))
+        await db.close()
+        return counts
+
+    counts = asyncio.run(run())
+
+    assert len(counts) == 40
+    assert max(counts.values()) < 3 * min(counts.values())
+
+
+def test_untagged_backlog_does_not_dilute_sampling(session_factory):
+    """With only the oldest news tagged, probes stay inside the tagged id range and skip cluster members"""
+    async def run():
+        db = await make_session(session_factory, 5000, tagged=set(range(1, 21)), clustered={5})
+        counts = Counter()
+        for _ in range(200):
+            counts.update(await sample_news_ids(db, 2))
+        await db.close()
+        return counts
+
+    counts = asyncio.run(run())
+
+    assert set(counts) == set(range(1, 21)) - {5}
+
+
+def test_pair_candidates_come_from_one_batched_walk(session_factory):
+    """Asking for every eligible row returns each once, even with several tags per news and few probe hits"""
+    eligible = {3, 700, 1500, 2200, 2900, 3600, 4300, 4999}
+
+    async def run():
+        db = await make_session(session_factory, 5000, tagged=eligible)
+        db.add(Tag(id=2, name="晶片"))
+        await db.execute(insert(news_tags), [{"news_id": i, "tag_id": 2} for i in eligible])
+        await db.commit()
+        samples = [await sample_news_ids(db, len(eligible)) for _ in range(20)]
+        await db.close()
+        return samples
+
+    for ids in asyncio.run(run()):
+        assert sorted(ids) == sorted(eligible)
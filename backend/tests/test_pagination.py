@@ -0,0 +1,136 @@
+"""Test keyset (cursor) pagination"""
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.database import get_db
+from app.core.exceptions import InvalidCursorError
+from app.core.pagination import decode_cursor, encode_cursor, paginate
+from app.models.news import News, Tag
+from app.services.news_service import NewsService
+
+BASE_TIME = datetime(2025, 1, 6, 12, 0, 0)
+
+
+async def make_service(factory: async_sessionmaker) -> NewsService:
+    db = factory()
+    # 每三則共用同一個 created_at，驗證 id 作為次要鍵能正確處理同時間的資料
+    await db.execute(insert(News), [
+        {
+            "id": i,
+            "title": f"story {i}",
+            "link": f"https://example.com/{i}",
+            "source": "test",
+            "created_at": BASE_TIME + timedelta(minutes=i // 3),
+        }
+        for i in range(1, 51)
+    ])
+    await db.execute(insert(Tag), [{"id": i, "name": f"tag {i % 7} {i}"} for i in range(1, 31)])
+    await db.commit()
+    return NewsService(db)
+
+
+def test_cursor_pages_match_offset_order_including_ties(session_factory):
+    """Walking next_cursor visits every row once, in the same order as offset paging"""
+    async def run():
+        service = await make_service(session_factory)
+        expected = [news.id for news in (await service.get_news_list(limit=100)).items]
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = await service.get_news_list(limit=7, cursor=cursor)
+            seen.extend(news.id for news in page.items)
+            pages += 1
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        await service.db.close()
+        return expected, seen, pages
+
+    expected, seen, pages = asyncio.run(run())
+
+    assert seen == expected
+    assert len(seen) == 50 and pages == 8
+
+
+def test_tags_page_ascending_by_name(session_factory):
+    async def run():
+        service = await make_service(session_factory)
+        first = await service.get_tags_list(limit=10)
+        second = await service.get_tags_list(limit=10, cursor=first.next_cursor)
+        everything = await service.get_tags_list(limit=100)
+        await service.db.close()
+        return first, second, everything
+
+    first, second, everything = asyncio.run(run())
+
+    names = [tag.name for tag in everything.items]
+    assert names == sorted(names)
+    assert [tag.name for tag in first.items + second.items] == names[:20]
+    assert everything.next_cursor is None
+
+
+def test_zero_limit_is_rejected_by_the_api_and_empty_in_paginate(session_factory):
+    """limit=0 is a 422 on every list endpoint; paginate itself returns an empty last page"""
+    from app.main import app
+
+    async def override_db():
+        async with session_factory() as db:
+            yield db
+
+    async def run():
+        service = await make_service(session_factory)
+        page = await paginate(service.db, select(News), (News.created_at, News.id), 0)
+        await service.db.close()
+
+        app.dependency_overrides[get_db] = override_db
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                statuses = [
+                    (await client.get(path, params={"limit": limit})).status_code
+                    for path in ("/api/news", "/api/news/tags", "/api/ideas")
+                    for limit in (0, 101)
+                ]
+        finally:
+            app.dependency_overrides.clear()
+        return page, statuses
+
+    page, statuses = asyncio.run(run())
+
+    assert page == ([], None)
+    assert statuses == [422] * 6
+
+
+def test_cursor_round_trip_and_invalid_cursor():
+    values = [BASE_TIME, 42]
+    assert decode_cursor(encode_cursor(values), 2) == values
+
+    for bad in ("not-base64!", encode_cursor([1]), encode_cursor([{"dt": "nope"}, 1])):
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(bad, 2)
+
+
+def test_cursor_query_seeks_the_composite_index(memory_session_factory):
+    """Deep pages are an index seek, not a scan of earlier rows"""
+    async def run():
+        service = await make_service(memory_session_factory)
+        plan = await service.db.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT id FROM news WHERE (created_at, id) < (:created_at, :id) "
+                "ORDER BY created_at DESC, id DESC LIMIT 20"
+            ),
+            {"created_at": BASE_TIME, "id": 10},
+        )
+        rows = [row[-1] for row in plan]
+        page = await paginate(service.db, select(News), (News.created_at, News.id), 5, encode_cursor([BASE_TIME, 1]))
+        await service.db.close()
+        return rows, page
+
+    plan, page = asyncio.run(run())
+
+    assert any("ix_news_created_at_id" in step for step in plan)
+    assert page.items == [] and page.next_cursor is None
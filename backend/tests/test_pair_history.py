@@ -0,0 +1,152 @@
+"""Test the used news-pair index, cached idea reuse and the title backfill migration"""
+import asyncio
+import json
+
+import httpx
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.database import Base
+from app.core.migrations import MIGRATIONS, run_migrations
+from app.models.news import Idea, News, Tag, idea_news_pairs, news_tags
+from app.routers import ideas
+from app.services.idea_service import IdeaService
+from app.services.news_sampler import sample_news_pair
+from app.services.tag_cooccurrence import TagCooccurrence
+from tests.conftest import sync_id_sequences
+
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def complete(self, prompt, **kwargs):
+        self.calls += 1
+        return f"點子名稱：點子 {self.calls}\n內容"
+
+    async def stream(self, prompt, **kwargs):
+        self.calls += 1
+        yield f"點子名稱：點子 {self.calls}\n內容"
+
+
+async def seed(factory: async_sessionmaker, rows: int = 3) -> async_sessionmaker:
+    async with factory() as db:
+        db.add(Tag(id=1, name="AI"))
+        await db.execute(insert(News), [
+            {"id": i, "title": f"story {i}", "link": f"https://example.com/{i}", "source": "test"}
+            for i in range(1, rows + 1)
+        ])
+        await db.execute(insert(news_tags), [{"news_id": i, "tag_id": 1} for i in range(1, rows + 1)])
+        await sync_id_sequences(db)
+        await db.commit()
+    return factory
+
+
+def test_samplers_skip_pairs_that_already_have_ideas(session_factory):
+    """Random, co-occurrence and tag-based sampling only return the one unused pair"""
+    async def run():
+        factory = await seed(session_factory)
+        matrix = TagCooccurrence()
+        for news_id in (1, 2, 3):
+            matrix.add(news_id, [1])
+        async with factory() as db:
+            service = IdeaService(db, CountingLLM(), factory, cooccurrence=matrix)
+            news = {item.id: item for item in await service.get_news_by_ids([1, 2, 3])}
+            await service.generate_idea(news[2], news[1])
+            await service.generate_idea(news[1], news[3])
+
+            picks = []
+            for _ in range(20):
+                picks.append(await sample_news_pair(db))
+                picks.append(await service.get_news_pair("random"))
+                picks.append(await service.choose_news_pair(list(news.values())))
+            await service.generate_idea(news[3], news[2])
+            # 所有配對都用過時仍回傳一組，由呼叫端決定是否沿用既有點子
+            exhausted = await sample_news_pair(db)
+        return {frozenset((a.id, b.id)) for a, b in picks}, exhausted
+
+    picks, exhausted = asyncio.run(run())
+
+    assert picks == {frozenset({2, 3})}
+    assert exhausted[0].id != exhausted[1].id
+
+
+async def post(factory, llm, path: str, payload: dict) -> httpx.Response:
+    from app.main import app
+
+    db = factory()
+    app.dependency_overrides[ideas._get_idea_service] = lambda: IdeaService(db, llm, factory)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, json=payload)
+    finally:
+        app.dependency_overrides.clear()
+        await db.close()
+
+
+def test_reuse_cached_returns_the_first_idea_without_calling_the_llm(session_factory):
+    """Either order of the same pair hits the cache; without the flag a new idea is generated"""
+    async def run():
+        factory = await seed(session_factory)
+        llm = CountingLLM()
+        first = (await post(factory, llm, "/api/ideas/generate", {"news_ids": [1, 2]})).json()
+        cached = (await post(factory, llm, "/api/ideas/generate", {"news_ids": [2, 1], "reuse_cached": True})).json()
+        streamed = (await post(
+            factory, llm, "/api/ideas/generate/stream", {"news_ids": [1, 2], "reuse_cached": True}
+        )).text
+        calls_before_regenerate = llm.calls
+        regenerated = (await post(factory, llm, "/api/ideas/generate", {"news_ids": [1, 2]})).json()
+        async with factory() as db:
+            pairs = (await db.execute(select(idea_news_pairs))).all()
+            count = len((await db.execute(select(Idea.id))).all())
+        return first, cached, streamed, calls_before_regenerate, regenerated, pairs, count
+
+    first, cached, streamed, calls, regenerated, pairs, count = asyncio.run(run())
+
+    assert (first["news_id_1"], first["news_id_2"]) == (1, 2)
+    assert cached["id"] == first["id"] and calls == 1
+    event, data = streamed.strip().split("\n", 1)
+    assert event == "event: done"
+    assert json.loads(data.removeprefix("data: "))["id"] == first["id"]
+    assert regenerated["id"] != first["id"]
+    assert pairs == [(1, 2, first["id"])]
+    assert count == 2
+
+
+def test_migration_backfills_news_ids_and_pairs_from_titles():
+    """Titles map to the lowest matching news id; unmatched titles stay NULL and record no pair"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn, tables=[News.__table__, Tag.__table__, news_tags])
+        # 遷移 7 之前的點子表
+        conn.execute(text(
+            "CREATE TABLE ideas (id INTEGER PRIMARY KEY, title VARCHAR(500), content TEXT, "
+            "news_source_1 VARCHAR(500), news_source_2 VARCHAR(500), devil_audit TEXT, created_at DATETIME)"
+        ))
+        conn.execute(insert(News), [
+            {"id": 1, "title": "chips", "link": "https://example.com/1", "source": "t"},
+            {"id": 2, "title": "clinics", "link": "https://example.com/2", "source": "t"},
+            {"id": 3, "title": "chips", "link": "https://example.com/3", "source": "t"},
+        ])
+        conn.execute(text(
+            "INSERT INTO ideas (id, title, content, news_source_1, news_source_2) VALUES "
+            "(1, 'a', 'x', 'clinics', 'chips'), (2, 'b', 'x', 'chips', 'clinics'), "
+            "(3, 'c', 'x', 'chips', 'gone'), (4, 'd', 'x', NULL, NULL)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+        ))
+        conn.execute(text(
+            "INSERT INTO schema_migrations (version, name, applied_at) "
+            "SELECT value, 'done', CURRENT_TIMESTAMP FROM json_each('[1, 2, 3, 4, 5, 6]')"
+        ))
+
+        assert run_migrations(conn) == [version for version, _, _ in MIGRATIONS if version >= 7]
+
+        ids = conn.execute(text("SELECT id, news_id_1, news_id_2 FROM ideas ORDER BY id")).all()
+        pairs = conn.execute(select(idea_news_pairs)).all()
+
+    assert ids == [(1, 2, 1), (2, 1, 2), (3, 1, None), (4, None, None)]
+    assert pairs == [(1, 2, 1)]
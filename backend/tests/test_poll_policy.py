@@ -0,0 +1,130 @@
+"""Test adaptive per-source polling"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.services import scheduler as scheduler_module
+from app.services.poll_policy import AdaptivePollPolicy
+from app.services.rss_sources import RSS_SOURCES
+
+
+def make_policy() -> AdaptivePollPolicy:
+    return AdaptivePollPolicy(base_seconds=3600, min_seconds=300, max_seconds=21600, jitter=0.1)
+
+
+def test_busy_source_polls_sooner_and_quiet_source_backs_off():
+    """Publish rate drives the interval in both directions"""
+    policy = make_policy()
+    busy, quiet = policy.new_state("busy"), policy.new_state("quiet")
+    now = datetime(2025, 1, 1)
+
+    for state in (busy, quiet):
+        policy.record_success(state, new_articles=0, now=now)
+
+    policy.record_success(busy, new_articles=12, now=now + timedelta(hours=1))
+    policy.record_success(quiet, new_articles=0, now=now + timedelta(hours=1))
+
+    assert busy.interval_seconds == 300
+    assert quiet.interval_seconds == 5400
+
+
+def test_feed_hints_set_a_floor():
+    """<ttl> / Cache-Control max-age are honored as a minimum interval"""
+    policy = make_policy()
+    state = policy.new_state("ttl")
+    now = datetime(2025, 1, 1)
+    policy.record_success(state, new_articles=0, now=now)
+    policy.record_success(state, new_articles=30, hint_seconds=1800, now=now + timedelta(hours=1))
+
+    assert state.interval_seconds == 1800
+
+
+def test_failures_back_off_exponentially_and_recover():
+    """Failing sources are polled less often until they succeed"""
+    policy = make_policy()
+    state = policy.new_state("flaky")
+
+    intervals = [policy.record_failure(state) for _ in range(3)]
+    assert intervals == [600, 1200, 2400]
+    assert state.failures == 3
+
+    policy.record_success(state, new_articles=1)
+    assert state.failures == 0
+    assert state.last_status == "ok"
+
+
+def test_next_run_applies_bounded_jitter():
+    """Jitter stays within the configured fraction"""
+    policy = make_policy()
+    state = policy.new_state("jitter")
+    now = datetime(2025, 1, 1)
+
+    for _ in range(20):
+        delay = (policy.next_run(state, now=now) - now).total_seconds()
+        assert 3240 <= delay <= 3960
+
+
+class FailingFetcher:
+    """Stands in for RSSFetcher when the fetch itself raises (e.g. a DB error loading feed states)"""
+    calls = 0
+
+    def __init__(self):
+        self.db = self
+
+    async def fetch_all_sources_async(self, sources):
+        FailingFetcher.calls += 1
+        raise RuntimeError("database is locked")
+
+    async def close(self):
+        pass
+
+
+def run_with_scheduler(monkeypatch, body):
+    """Run body() on a started scheduler with fresh poll states and a failing fetcher"""
+    monkeypatch.setattr(scheduler_module, "create_rss_fetcher", FailingFetcher)
+    monkeypatch.setattr(scheduler_module, "poll_states", {})
+    FailingFetcher.calls = 0
+
+    async def run():
+        scheduler_module.scheduler.start()
+        try:
+            return await body()
+        finally:
+            scheduler_module.scheduler.remove_all_jobs()
+            scheduler_module.scheduler.shutdown(wait=False)
+
+    return asyncio.run(run())
+
+
+def test_failed_fetch_still_reschedules_the_source(monkeypatch):
+    """An exception from the fetch backs the source off instead of dropping its job"""
+    name = RSS_SOURCES[0]["name"]
+
+    async def body():
+        await scheduler_module.fetch_source_job(name)
+        return scheduler_module.scheduler.get_job(f"fetch_rss:{name}"), scheduler_module.poll_states[name]
+
+    job, state = run_with_scheduler(monkeypatch, body)
+
+    assert job is not None
+    assert state.failures == 1 and state.last_status == "failed"
+
+
+def test_late_fetch_job_runs_instead_of_being_dropped(monkeypatch):
+    """A job that fires well past its run date (loop stall, sleep) still runs and reschedules"""
+    name = RSS_SOURCES[0]["name"]
+
+    async def body():
+        state = scheduler_module._get_poll_state(name)
+        state.next_run_at = datetime.utcnow() - timedelta(minutes=5)
+        scheduler_module._add_source_job(state)
+        for _ in range(50):
+            await asyncio.sleep(0.02)
+            if FailingFetcher.calls:
+                break
+        await asyncio.sleep(0.05)
+        return scheduler_module.scheduler.get_job(f"fetch_rss:{name}")
+
+    job = run_with_scheduler(monkeypatch, body)
+
+    assert FailingFetcher.calls == 1
+    assert job is not None and job.next_run_time > datetime.now(timezone.utc)
@@ -0,0 +1,136 @@
+"""Test the LLM rate limiter and 429 handling"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core.exceptions import LLMRateLimitError
+from app.services.llm_client import VercelLLMClient
+from app.services.rate_limiter import RateLimiter, TokenBucket, parse_retry_after
+
+
+def test_token_bucket_waits_for_refill():
+    """An empty bucket reports how long until enough tokens accrue"""
+    bucket = TokenBucket(rate_per_minute=60)
+    bucket.consume(60)
+
+    assert bucket.wait_time(1) == pytest.approx(1.0, abs=0.05)
+    assert bucket.wait_time(1, factor=0.5) == pytest.approx(2.0, abs=0.1)
+    bucket.refund(10)
+    assert bucket.wait_time(5) == 0.0
+
+
+def test_parse_retry_after_accepts_seconds_and_dates():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_limiter_bounds_concurrency():
+    """No more than max_concurrency callers hold a slot at once"""
+    limiter = RateLimiter(rpm=0, tpm=0, max_concurrency=2)
+    active = peak = 0
+
+    async def call():
+        nonlocal active, peak
+        async with limiter.slot():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(run())
+
+    assert peak == 2
+    assert limiter.get_stats()["acquired"] == 6
+
+
+def test_rate_limited_call_honors_retry_after_then_succeeds():
+    """A 429 pauses the limiter for Retry-After and the call is retried"""
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "0.2"}),
+        httpx.Response(200, json={
+            "choices": [{"message": {"content": "ok"}}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6},
+        }),
+    ]
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return responses.pop(0)
+
+    limiter = RateLimiter(rpm=600, tpm=10000, max_concurrency=2)
+    client = VercelLLMClient(transport=httpx.MockTransport(handler), rate_limiter=limiter)
+
+    async def run():
+        started = time.monotonic()
+        content = await client.complete("hello", max_tokens=10)
+        await client.aclose()
+        return content, time.monotonic() - started
+
+    content, elapsed = asyncio.run(run())
+
+    assert content == "ok"
+    assert elapsed >= 0.2
+    assert limiter.stats["rate_limited"] == 1
+    assert limiter.factor == pytest.approx(0.6)
+    assert client.usage["requests"] == 1
+
+
+def test_exhausted_retries_raise_with_retry_after():
+    """After llm_max_retries the caller gets LLMRateLimitError carrying retry_after"""
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(429, headers={"Retry-After": "0"})
+
+    limiter = RateLimiter(rpm=0, tpm=0, max_concurrency=1)
+    client = VercelLLMClient(transport=httpx.MockTransport(handler), rate_limiter=limiter)
+
+    async def run():
+        try:
+            await client.complete("hello")
+        finally:
+            await client.aclose()
+
+    with pytest.raises(LLMRateLimitError) as excinfo:
+        asyncio.run(run())
+
+    assert len(calls) == client.settings.llm_max_retries + 1
+    assert excinfo.value.retry_after == 0.0
+
+
+def test_background_calls_leave_a_slot_and_budget_for_interactive_calls():
+    """Tagging never takes the reserved slot, and a waiting interactive call goes ahead of queued tag batches"""
+    limiter = RateLimiter(rpm=600, tpm=0, max_concurrency=2, interactive_slots=1, interactive_reserve=0.5)
+    active = peak = 0
+    order = []
+
+    async def tag_batch(i):
+        nonlocal active, peak
+        async with limiter.slot(background=True):
+            active += 1
+            peak = max(peak, active)
+            order.append(f"tags {i}")
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def run():
+        # 背景呼叫只能用到一半的 RPM，之後排隊等待補充
+        limiter.requests.consume(limiter.requests.capacity / 2 - 1)
+        batches = [asyncio.create_task(tag_batch(i)) for i in range(3)]
+        await asyncio.sleep(0.02)
+        async with limiter.slot():
+            order.append("idea")
+        await asyncio.gather(*batches)
+
+    asyncio.run(run())
+
+    assert peak == 1
+    assert order[:2] == ["tags 0", "idea"]
+    assert limiter.get_stats()["background_acquired"] == 3
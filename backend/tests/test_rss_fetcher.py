@@ -0,0 +1,240 @@
+"""Test concurrent RSS ingestion"""
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.news import News
+from app.services.feed_downloader import FeedDownloader
+from app.services.feed_parser import FeedParser, shutdown_parse_pool
+from app.services.rss_fetcher import RSSFetcher
+
+
+def build_rss(name: str, count: int = 3) -> bytes:
+    """Build a minimal RSS 2.0 document"""
+    items = "".join(
+        f"<item><title>{name} story {i}</title>"
+        f"<link>https://{name}.example.com/{i}</link>"
+        f"<description>{name} summary {i}</description>"
+        f"<pubDate>Mon, 06 Jan 2025 0{i}:00:00 GMT</pubDate></item>"
+        for i in range(count)
+    )
+    return (
+        f'<?xml version="1.0"?><rss version="2.0"><channel><title>{name}</title>'
+        f"{items}</channel></rss>"
+    ).encode()
+
+
+async def count_news(db: AsyncSession) -> int:
+    return (await db.execute(select(func.count()).select_from(News))).scalar_one()
+
+
+def make_sources(*names: str) -> list[dict]:
+    return [{"name": name, "url": f"https://{name}.example.com/feed"} for name in names]
+
+
+def test_sources_download_concurrently(session_factory):
+    """A cycle should take about as long as the slowest feed"""
+    delay = 0.3
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        return httpx.Response(200, content=build_rss(request.url.host.split(".")[0]))
+
+    async def run():
+        downloader = FeedDownloader(transport=httpx.MockTransport(handler))
+        fetcher = RSSFetcher(session_factory(), downloader=downloader)
+        try:
+            return await fetcher.fetch_all_sources_async(make_sources("a", "b", "c", "d"))
+        finally:
+            await fetcher.db.close()
+            await downloader.aclose()
+
+    started = time.perf_counter()
+    result = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+
+    assert result["success"] == 4
+    assert result["new_articles"] == 12
+    assert elapsed < delay * 3
+
+
+def test_failed_source_does_not_block_others(session_factory):
+    """A timeout or HTTP error is reported per source"""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host.startswith("slow"):
+            raise httpx.ReadTimeout("timed out", request=request)
+        if request.url.host.startswith("broken"):
+            return httpx.Response(503)
+        return httpx.Response(200, content=build_rss("ok"))
+
+    async def run():
+        downloader = FeedDownloader(transport=httpx.MockTransport(handler))
+        db = session_factory()
+        fetcher = RSSFetcher(db, downloader=downloader)
+        try:
+            first = await fetcher.fetch_all_sources_async(make_sources("ok", "slow", "broken"))
+            second = await fetcher.fetch_all_sources_async(make_sources("ok"))
+            return first, second, await count_news(db)
+        finally:
+            await fetcher.db.close()
+            await downloader.aclose()
+
+    first, second, stored = asyncio.run(run())
+
+    assert first["success"] == 1
+    assert first["failed"] == 2
+    assert {error["source"] for error in first["errors"]} == {"slow", "broken"}
+    assert second["new_articles"] == 0
+    assert stored == 3
+
+
+def test_unchanged_feeds_are_skipped(session_factory):
+    """304 responses and identical bodies skip parsing"""
+    seen_headers = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        name = request.url.host.split(".")[0]
+        seen_headers.append((name, request.headers.get("if-none-match")))
+        if name == "etag":
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, content=build_rss(name), headers={"ETag": '"v1"'})
+        return httpx.Response(200, content=build_rss(name))
+
+    async def run():
+        downloader = FeedDownloader(transport=httpx.MockTransport(handler))
+        fetcher = RSSFetcher(session_factory(), downloader=downloader)
+        sources = make_sources("etag", "plain")
+        try:
+            first = await fetcher.fetch_all_sources_async(sources)
+            second = await fetcher.fetch_all_sources_async(sources)
+            return first, second
+        finally:
+            await fetcher.db.close()
+            await downloader.aclose()
+
+    first, second = asyncio.run(run())
+
+    assert first["new_articles"] == 6
+    assert first["skipped"] == 0
+    assert second["success"] == 2
+    assert second["skipped"] == 2
+    assert {item["source"]: item["reason"] for item in second["skipped_sources"]} == {
+        "etag": "not_modified",
+        "plain": "unchanged",
+    }
+    assert ("etag", '"v1"') in seen_headers
+
+
+def test_write_failure_only_fails_changed_sources(session_factory):
+    """A failed batch write marks the sources with entries as failed; unchanged ones stay skipped"""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        name = request.url.host.split(".")[0]
+        if name == "etag" and request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=build_rss(name), headers={"ETag": '"v1"'})
+
+    async def run():
+        downloader = FeedDownloader(transport=httpx.MockTransport(handler))
+        fetcher = RSSFetcher(session_factory(), downloader=downloader)
+        try:
+            await fetcher.fetch_all_sources_async(make_sources("etag"))
+
+            async def broken_save(changed):
+                raise RuntimeError("database is locked")
+
+            fetcher._save_entries = broken_save
+            return await fetcher.fetch_all_sources_async(make_sources("etag", "fresh"))
+        finally:
+            await fetcher.db.close()
+            await downloader.aclose()
+
+    result = asyncio.run(run())
+
+    assert result["sources"]["etag"]["status"] == "skipped"
+    assert result["sources"]["fresh"]["status"] == "failed"
+    assert (result["success"], result["failed"], result["skipped"]) == (1, 1, 1)
+    assert [error["source"] for error in result["errors"]] == ["fresh"]
+
+
+def test_bulk_ingest_dedups_across_sources(storage_backend):
+    """Links shared by several feeds are stored once and counted once"""
+    shared = build_rss("shared", count=4)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host.startswith("extra"):
+            return httpx.Response(200, content=build_rss("extra", count=2))
+        return httpx.Response(200, content=shared)
+
+    async def run():
+        downloader = FeedDownloader(transport=httpx.MockTransport(handler))
+        db = storage_backend.session_factory()
+        fetcher = RSSFetcher(db, downloader=downloader)
+        try:
+            result = await fetcher.fetch_all_sources_async(make_sources("mirror1", "mirror2"))
+            extra = await fetcher.fetch_all_sources_async(make_sources("mirror3", "extra"))
+            return result, extra, await count_news(db)
+        finally:
+            await db.close()
+            await downloader.aclose()
+
+    result, extra, stored = storage_backend.run(run())
+
+    assert result["new_articles"] == 4
+    assert extra["new_articles"] == 2
+    assert stored == 6
+
+
+def test_process_pool_parsing_matches_thread_parsing():
+    """Pool workers return the same compact entry records"""
+    content = build_rss("pool", count=5)
+
+    async def run():
+        thread_entries = await FeedParser("thread").parse(content, "pool")
+        process_entries = await FeedParser("process").parse(content, "pool")
+        return thread_entries, process_entries
+
+    try:
+        thread_entries, process_entries = asyncio.run(run())
+    finally:
+        shutdown_parse_pool()
+
+    assert process_entries == thread_entries
+    assert len(process_entries.entries) == 5
+    assert process_entries.entries[1].link == "https://pool.example.com/1"
+    assert process_entries.entries[1].published_ts == 1736125200.0
+
+
+def test_tracking_variants_of_a_link_are_deduplicated(session_factory):
+    """utm_* / http / trailing-slash variants map to one row"""
+    feed = (
+        b'<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>'
+        b"<item><title>One</title><link>https://news.example.com/story/</link></item>"
+        b"<item><title>Two</title><link>http://news.example.com/story?utm_source=rss</link></item>"
+        b"<item><title>Three</title><link>https://www.news.example.com/story?guccounter=1</link></item>"
+        b"</channel></rss>"
+    )
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=feed)
+
+    async def run():
+        downloader = FeedDownloader(transport=httpx.MockTransport(handler))
+        db = session_factory()
+        fetcher = RSSFetcher(db, downloader=downloader)
+        try:
+            result = await fetcher.fetch_all_sources_async(make_sources("variants"))
+            return result, (await db.execute(select(News))).scalars().all()
+        finally:
+            await fetcher.db.close()
+            await downloader.aclose()
+
+    result, stored = asyncio.run(run())
+
+    assert result["new_articles"] == 1
+    assert [news.title for news in stored] == ["One"]
+    assert stored[0].link_hash is not None
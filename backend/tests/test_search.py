@@ -0,0 +1,169 @@
+"""Test FTS5 full-text search over news and ideas"""
+import asyncio
+
+import pytest
+from sqlalchemy import delete, insert, update
+
+from app.core.config import get_settings
+from app.core.exceptions import InvalidCursorError, InvalidSearchQueryError
+from app.models.news import Idea, News
+from app.schemas import SearchHitResponse
+from app.services.feed_parser import FeedEntry
+from app.services.rss_fetcher import RSSFetcher
+from app.services.search_service import SearchService
+
+
+def news_row(i: int, title: str, summary: str = "", **extra) -> dict:
+    return {"id": i, "title": title, "link": f"https://example.com/{i}", "summary": summary,
+            "source": "test", **extra}
+
+
+def test_triggers_keep_the_index_in_sync_with_writes(memory_session_factory):
+    """Inserts (including the bulk ingest upsert), title edits and deletes are searchable immediately"""
+
+    async def run():
+        db = memory_session_factory()
+        service = SearchService(db)
+        fetcher = RSSFetcher(db, downloader=object(), parser=object())
+        await fetcher._save_entries([[
+            FeedEntry("台積電宣布擴產計畫", "https://example.com/tsmc", "先進製程產能", "test", None),
+        ]])
+        ingested = [hit.title for hit in (await service.search("台積電")).items]
+
+        await db.execute(insert(News), [news_row(10, "Quantum computing startup raises funds")])
+        await db.commit()
+        await db.execute(update(News).where(News.id == 10).values(title="Fusion energy startup raises funds"))
+        await db.commit()
+        renamed = [
+            [hit.id for hit in (await service.search(query)).items]
+            for query in ("quantum", "fusion")
+        ]
+
+        await db.execute(delete(News).where(News.id == 10))
+        await db.commit()
+        deleted = (await service.search("fusion")).items
+        await db.close()
+        return ingested, renamed, deleted
+
+    ingested, renamed, deleted = asyncio.run(run())
+
+    assert ingested == ["台積電宣布擴產計畫"]
+    assert renamed == [[], [10]]
+    assert deleted == []
+
+
+def test_bm25_ranking_snippets_and_cursor_pages(memory_session_factory):
+    """Title hits outrank summary hits; walking next_cursor returns every hit once in rank order"""
+
+    async def run():
+        db = memory_session_factory()
+        rows = [news_row(1, "Battery recycling plant opens", "A new battery plant in Nevada")]
+        rows += [news_row(i, f"Market update {i}", "analysts mention battery demand") for i in range(2, 12)]
+        rows += [news_row(12, "Weather report", "sunny"), news_row(13, "Battery twin", "copy", cluster_id=1)]
+        await db.execute(insert(News), rows)
+        await db.commit()
+
+        service = SearchService(db)
+        first = await service.search("battery", limit=4)
+        seen, cursor = [], None
+        while True:
+            page = await service.search("battery", limit=4, cursor=cursor)
+            seen.extend(hit.id for hit in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        everything = await service.search("battery", limit=50)
+        await db.close()
+        return first, seen, everything
+
+    first, seen, everything = asyncio.run(run())
+
+    assert first.ranking == "bm25"
+    assert first.items[0].id == 1
+    assert "<mark>" in first.items[0].snippet and "</mark>" in first.items[0].snippet
+    assert seen == [hit.id for hit in everything.items]
+    # 近似重複的群組成員（13）與不相關的新聞（12）不出現
+    assert sorted(seen) == list(range(1, 12))
+    scores = [hit.score for hit in everything.items]
+    assert scores == sorted(scores)
+    assert SearchHitResponse.model_validate(first.items[0]).id == 1
+
+
+def test_short_chinese_terms_fall_back_to_like_filtering(memory_session_factory):
+    """Two-character terms cannot MATCH a trigram index but still filter and highlight"""
+
+    async def run():
+        db = memory_session_factory()
+        await db.execute(insert(News), [
+            news_row(1, "美國祭出晶片禁令", "出口管制擴大"),
+            news_row(2, "台積電晶片產能滿載", "先進製程需求強勁"),
+            news_row(3, "台積電法說會", "資本支出維持"),
+        ])
+        await db.commit()
+        service = SearchService(db)
+        short_only = await service.search("晶片")
+        mixed = await service.search("台積電 晶片")
+        await db.close()
+        return short_only, mixed
+
+    short_only, mixed = asyncio.run(run())
+
+    assert short_only.ranking == "recent"
+    assert [hit.id for hit in short_only.items] == [2, 1]
+    assert all("<mark>晶片</mark>" in hit.snippet for hit in short_only.items)
+    assert [hit.id for hit in mixed.items] == [2]
+
+
+def test_terms_matching_too_many_rows_are_paged_newest_first(memory_session_factory, monkeypatch):
+    """Above search_rank_limit matches, results skip BM25 and walk ids downward, keeping that order across pages"""
+    monkeypatch.setattr(get_settings(), "search_rank_limit", 5)
+
+    async def run():
+        db = memory_session_factory()
+        await db.execute(insert(News), [news_row(i, f"Robotics digest {i}") for i in range(1, 9)])
+        await db.execute(insert(News), [news_row(20, "Robotics", "weekly recap of robotics")])
+        await db.commit()
+        service = SearchService(db)
+        pages, cursor = [], None
+        while True:
+            page = await service.search("robotics", limit=4, cursor=cursor)
+            pages.append(page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        narrow = await service.search("recap")
+        await db.close()
+        return pages, narrow
+
+    pages, narrow = asyncio.run(run())
+
+    assert {page.ranking for page in pages} == {"recent"}
+    assert [hit.id for page in pages for hit in page.items] == [20, 8, 7, 6, 5, 4, 3, 2, 1]
+    assert all("<mark>" in hit.snippet for page in pages for hit in page.items)
+    assert narrow.ranking == "bm25"
+    assert [hit.id for hit in narrow.items] == [20]
+
+
+def test_idea_scope_indexes_devil_audit_and_rejects_bad_input(memory_session_factory):
+    """Idea search covers content and audits added later; empty queries and bad cursors are rejected"""
+
+    async def run():
+        db = memory_session_factory()
+        await db.execute(insert(Idea), [{"id": 1, "title": "Drone delivery", "content": "last-mile logistics"}])
+        await db.commit()
+        service = SearchService(db)
+        before = await service.search("liability", scope="ideas")
+        await db.execute(update(Idea).where(Idea.id == 1).values(devil_audit="Who carries the liability?"))
+        await db.commit()
+        after = await service.search("liability", scope="ideas")
+        with pytest.raises(InvalidSearchQueryError):
+            await service.search(' " ', scope="ideas")
+        with pytest.raises(InvalidCursorError):
+            await service.search("drone", scope="ideas", cursor="not-a-cursor")
+        await db.close()
+        return before, after
+
+    before, after = asyncio.run(run())
+
+    assert before.items == []
+    assert [hit.id for hit in after.items] == [1]
@@ -0,0 +1,93 @@
+"""Test the tag co-occurrence matrix and strategy-based news pairing"""
+import asyncio
+import math
+import random
+
+from sqlalchemy import insert
+
+from app.models.news import News
+from app.services.idea_service import IdeaService
+from app.services.tag_cooccurrence import TagCooccurrence
+from app.services.tag_extractor import TagExtractor
+
+
+def topic_matrix() -> TagCooccurrence:
+    """Three topics of four tags; each news carries two tags from one topic"""
+    rng = random.Random(3)
+    matrix = TagCooccurrence()
+    for news_id in range(1, 601):
+        topic = news_id % 3
+        matrix.add(news_id, rng.sample(range(topic * 4 + 1, topic * 4 + 5), 2))
+    return matrix
+
+
+def test_counts_and_pmi_update_incrementally_and_skip_known_tags():
+    """Re-adding a committed association is a no-op; new tags pair with the ones already counted"""
+    matrix = TagCooccurrence()
+    matrix.add(1, [10, 20])
+    matrix.add(2, [10, 30])
+    matrix.add(3, [30])
+    matrix.add(1, [20, 10])
+    before = (len(matrix), matrix.count(10, 20), matrix.count(10, 30))
+    matrix.add(3, [20])
+
+    assert before == (3, 1, 1)
+    assert (matrix.count(20, 30), matrix.count(30, 20), matrix.count(10, 20)) == (1, 1, 1)
+    assert matrix.pmi(10, 20) == math.log(1 * 3 / (2 * 2))
+    assert matrix.pmi(10, 10) == -math.inf
+
+
+def test_strategies_pick_related_or_unrelated_news_without_shared_tags():
+    """complementary stays within a topic but never shares a tag; distant crosses topics"""
+    matrix = topic_matrix()
+    random.seed(5)
+
+    def topic(news_id: int) -> int:
+        return news_id % 3
+
+    complementary = [matrix.pick_pair("complementary") for _ in range(200)]
+    distant = [matrix.pick_pair("distant") for _ in range(200)]
+    randoms = [matrix.pick_pair("random") for _ in range(200)]
+
+    for news_a, news_b in complementary:
+        assert topic(news_a) == topic(news_b)
+        assert not set(matrix._news_tags[news_a]) & set(matrix._news_tags[news_b])
+    assert all(topic(news_a) != topic(news_b) for news_a, news_b in distant)
+    assert all(news_a != news_b for news_a, news_b in randoms)
+    assert TagCooccurrence().pick_pair("distant") is None
+
+
+def test_tag_writes_feed_the_matrix_and_pairs_load_by_primary_key(session_factory):
+    """Committed tags of canonical news are counted at once; cluster members are not; warm rebuilds the same state"""
+
+    class TagsLLM:
+        async def extract_tags_batch(self, articles):
+            return {news_id: ["晶片", "出口管制"] if news_id < 3 else ["咖啡"] for news_id, _, _ in articles}
+
+    async def run():
+        db = session_factory()
+        await db.execute(insert(News), [
+            {"id": i, "title": f"story {i}", "link": f"https://example.com/{i}", "source": "test",
+             "cluster_id": 1 if i == 4 else None}
+            for i in range(1, 5)
+        ])
+        await db.commit()
+        matrix = TagCooccurrence()
+        await TagExtractor(db, TagsLLM(), cooccurrence=matrix).process_untagged_news(limit=10, batch_size=10)
+
+        warmed = TagCooccurrence()
+        await warmed.warm(db)
+
+        service = IdeaService(db, llm_client=None, cooccurrence=matrix)
+        pairs = [await service.get_news_pair("distant") for _ in range(10)]
+        await db.close()
+        return matrix, warmed, pairs
+
+    matrix, warmed, pairs = asyncio.run(run())
+
+    assert sorted(matrix._news_tags) == [1, 2, 3]
+    assert {k: set(v) for k, v in warmed._news_tags.items()} == {k: set(v) for k, v in matrix._news_tags.items()}
+    assert warmed._pairs == matrix._pairs
+    for news_a, news_b in pairs:
+        assert {news_a.id, news_b.id} & {1, 2} and 3 in {news_a.id, news_b.id}
+        assert news_a.tags and news_b.tags
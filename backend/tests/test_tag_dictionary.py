@@ -0,0 +1,101 @@
+"""Test the in-memory tag dictionary and bulk tag writes"""
+import asyncio
+
+from sqlalchemy import event, func, select
+
+from app.models.news import News, Tag, news_tags
+from app.services.counters import get_count
+from app.services.tag_dictionary import TagDictionary
+from app.services.tag_extractor import TagExtractor
+
+
+def test_concurrent_writers_converge_on_the_same_tag_ids(storage_backend):
+    """A writer that loses the ON CONFLICT race picks up the winner's id instead of failing"""
+    factory = storage_backend.session_factory
+
+    async def scenario():
+        first, second = TagDictionary(), TagDictionary()
+        async with factory() as db_a, factory() as db_b:
+            resolved_a = await first.resolve(db_a, ["AI", "晶片"])
+            # B 的寫入會等 A 提交，之後 "晶片" 衝突、改以查詢取得 A 建立的 ID
+            task_b = asyncio.create_task(second.resolve(db_b, ["晶片", "雲端"]))
+            await asyncio.sleep(0.2)
+            await db_a.commit()
+            first.remember(resolved_a.created)
+            resolved_b = await task_b
+            await db_b.commit()
+            second.remember(resolved_b.created)
+
+        assert resolved_b.ids["晶片"] == resolved_a.ids["晶片"]
+        assert set(resolved_b.created) == {"雲端"}
+        async with factory() as db:
+            names = (await db.execute(select(Tag.name))).scalars().all()
+            assert sorted(names) == sorted(["AI", "晶片", "雲端"])
+            assert await get_count(db, "tags") == 3
+
+    storage_backend.run(scenario())
+
+
+def test_rolled_back_tags_never_enter_the_dictionary(storage_backend):
+    """Ids created in a rolled-back transaction are not cached"""
+    factory = storage_backend.session_factory
+
+    async def scenario():
+        dictionary = TagDictionary()
+        async with factory() as db:
+            await dictionary.resolve(db, ["AI"])
+            await db.rollback()
+            assert len(dictionary) == 0
+
+            resolved = await dictionary.resolve(db, ["AI"])
+            await db.commit()
+            dictionary.remember(resolved.created)
+            assert (await db.execute(select(Tag.id).where(Tag.name == "AI"))).scalar_one() == resolved.ids["AI"]
+
+        warmed = TagDictionary()
+        async with factory() as db:
+            assert await warmed.warm(db) == 1
+
+    storage_backend.run(scenario())
+
+
+def test_batch_write_uses_a_constant_number_of_statements(storage_backend):
+    """Tagging a batch costs the same statements whether it has 2 or 20 articles"""
+    factory = storage_backend.session_factory
+    # 兩批共用字典（同正式環境），第二批的共同標籤不再觸發衝突查詢
+    dictionary = TagDictionary()
+    statements = []
+    for engine in storage_backend.async_engines:
+        event.listen(
+            engine.sync_engine, "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+
+    async def tag_batch(articles: int, offset: int) -> int:
+        async with factory() as db:
+            news = [
+                News(title=f"story {i}", link=f"https://example.com/{i}", source="test")
+                for i in range(offset, offset + articles)
+            ]
+            db.add_all(news)
+            await db.commit()
+            statements.clear()
+
+            extractor = TagExtractor(db, llm_client=None, tag_dictionary=dictionary)
+            results = {"processed": 0, "failed": 0, "errors": []}
+            await extractor._save_tag_results(
+                [(item, [f"tag {item.id}", "shared", "AI", "雲端"]) for item in news], results
+            )
+            assert results["processed"] == articles
+            count = len(statements)
+            links = select(func.count()).select_from(news_tags).where(
+                news_tags.c.news_id.in_([item.id for item in news])
+            )
+            assert (await db.execute(links)).scalar_one() == articles * 4
+        return count
+
+    async def scenario():
+        return await tag_batch(2, 0), await tag_batch(20, 100)
+
+    small, large = storage_backend.run(scenario())
+    assert small == large
@@ -0,0 +1,78 @@
+"""Test the tagging pipeline"""
+import asyncio
+
+from app.core.exceptions import LLMRateLimitError
+from app.services.llm_client import parse_batch_tags
+from app.services.tag_extractor import TagExtractor
+from tests.conftest import BatchLLMClient, add_stories, load_tags
+
+
+def test_parse_batch_tags_tolerates_fences_and_bad_items():
+    """Only well-formed entries for expected ids survive"""
+    raw = '好的：\n```json\n{"1": ["AI", " AI ", ""], "2": "oops", "3": ["晶片"], "9": ["x"]}\n```'
+
+    assert parse_batch_tags(raw, [1, 2, 3]) == {1: ["AI"], 3: ["晶片"]}
+    assert parse_batch_tags('[{"id": 4, "tags": ["雲端"]}]', [4]) == {4: ["雲端"]}
+    assert parse_batch_tags("not json", [1]) == {}
+
+
+def test_batches_share_one_call_and_fall_back_per_article(session_factory):
+    """Missing ids are retried individually; everything else is batched"""
+    llm = BatchLLMClient(drop_ids={2})
+
+    async def run():
+        async with session_factory() as db:
+            await add_stories(db, 5)
+            result = await TagExtractor(db, llm).process_untagged_news(limit=10, batch_size=3)
+            return result, await load_tags(db)
+
+    result, tags = asyncio.run(run())
+
+    assert llm.batch_calls == [[1, 2, 3], [4, 5]]
+    assert llm.single_calls == ["story 2"]
+    assert result["processed"] == 5
+    assert result["batch_calls"] == 2
+    assert result["fallback_calls"] == 1
+    assert tags[1] == ["shared", "tag-1"]
+    assert tags[2] == ["shared", "single"]
+
+
+class ThrottledLLMClient(BatchLLMClient):
+    """Tracks in-flight batch calls and starts rate limiting after a few"""
+
+    def __init__(self, allowed_batches: int):
+        super().__init__()
+        self.allowed_batches = allowed_batches
+        self.in_flight = 0
+        self.peak = 0
+
+    async def extract_tags_batch(self, articles):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if len(self.batch_calls) >= self.allowed_batches:
+            raise LLMRateLimitError(retry_after=30)
+        return await super().extract_tags_batch(articles)
+
+
+def test_concurrent_batches_stop_dispatching_after_rate_limit(session_factory):
+    """Batches run concurrently; once rate limited the rest are deferred, not failed"""
+    llm = ThrottledLLMClient(allowed_batches=2)
+
+    async def run():
+        async with session_factory() as db:
+            await add_stories(db, 20)
+            result = await TagExtractor(db, llm).process_untagged_news(
+                limit=20, batch_size=2, concurrency=2
+            )
+            return result, await load_tags(db)
+
+    result, tags = asyncio.run(run())
+
+    assert llm.peak == 2
+    assert result["processed"] == 4
+    assert result["failed"] == 0
+    assert result["processed"] + result["deferred"] == 20
+    assert llm.single_calls == []
+    assert sum(1 for names in tags.values() if names) == 4
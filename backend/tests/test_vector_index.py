@@ -0,0 +1,151 @@
+"""Test the local embedding, memmap vector index and similarity endpoints"""
+import asyncio
+
+import numpy as np
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.core.config import get_settings
+from app.core.database import get_db
+from app.core.dependencies import get_similarity_service
+from app.main import app
+from app.models.news import Idea, News
+from app.services.embedding import HashingEmbedder, get_embedder
+from app.services.feed_parser import FeedEntry
+from app.services.idea_service import IdeaService
+from app.services.rss_fetcher import RSSFetcher
+from app.services.similarity_service import SimilarityService
+from app.services.vector_index import VectorIndex
+from tests.conftest import sync_id_sequences
+
+DIM = 64
+
+
+def unit_rows(rng: np.random.Generator, count: int, centers: np.ndarray, noise: float = 0.3) -> np.ndarray:
+    rows = centers[rng.integers(len(centers), size=count)] + noise * rng.standard_normal((count, centers.shape[1]))
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_embedding_is_stable_and_puts_related_text_closer():
+    """Same text gives the same vector in a fresh embedder; shared words raise cosine similarity"""
+    embedder = HashingEmbedder(256)
+    chip = embedder.embed("台積電先進製程擴產", "晶片需求強勁，資本支出上修")
+    chip_again = HashingEmbedder(256).embed("台積電先進製程擴產", "晶片需求強勁，資本支出上修")
+    related = embedder.embed("台積電晶片出貨創新高", "先進製程需求")
+    unrelated = embedder.embed("Coffee prices surge after frost", "Brazil harvest outlook")
+
+    assert np.array_equal(chip, chip_again)
+    assert abs(np.linalg.norm(chip) - 1) < 1e-5
+    assert chip @ related > 0.3 > abs(chip @ unrelated)
+    assert not embedder.embed("", "  ").any()
+
+
+def test_index_grows_persists_and_matches_brute_force(tmp_path):
+    """Sparse ids grow the memmap; a reopened index returns exact top-k with exclusions"""
+    rng = np.random.default_rng(1)
+    ids = rng.choice(np.arange(1, 5000), 600, replace=False)
+    vectors = unit_rows(rng, 600, rng.standard_normal((8, DIM)))
+    index = VectorIndex(str(tmp_path / "news"), DIM)
+    index.add_many(ids[:300], vectors[:300])
+    for item_id, vector in zip(ids[300:], vectors[300:]):
+        index.add(int(item_id), vector)
+    index.add(7000, np.zeros(DIM, dtype=np.float32))
+
+    reopened = VectorIndex(str(tmp_path / "news"), DIM)
+    absent = next(i for i in range(1, 5000) if i not in set(ids.tolist()))
+    query = vectors[0]
+    expected = ids[np.argsort(-(vectors @ query))]
+    hits = reopened.search(query, 5, exclude=[int(ids[0])])
+
+    assert len(reopened) == 600
+    assert reopened.missing([int(ids[1]), absent, 7000, 10**6]) == [absent, 7000, 10**6]
+    assert np.array_equal(reopened.get(int(ids[2])), vectors[2])
+    assert [item_id for item_id, _ in hits] == [int(i) for i in expected[1:6]]
+    assert all(a[1] >= b[1] for a, b in zip(hits, hits[1:]))
+    assert VectorIndex(str(tmp_path / "news"), DIM * 2).search(query, 5) == []
+
+
+def test_ivf_partitions_keep_recall_and_see_new_vectors(tmp_path):
+    """After training, probing a few partitions finds nearly all true neighbours, including later adds"""
+    rng = np.random.default_rng(2)
+    centers = rng.standard_normal((32, DIM))
+    vectors = unit_rows(rng, 8000, centers)
+    index = VectorIndex(str(tmp_path / "news"), DIM)
+    index.add_many(range(1, 8001), vectors)
+    flat = [index.search(vectors[i], 10) for i in range(0, 8000, 400)]
+
+    assert index.train_ivf(partitions=32) == 32
+    late = unit_rows(rng, 1, centers)[0]
+    index.add(9000, late)
+    recall = np.mean([
+        len({hit for hit, _ in exact} & {hit for hit, _ in index.search(vectors[i], 10, probes=4)}) / 10
+        for i, exact in zip(range(0, 8000, 400), flat)
+    ])
+    reopened = VectorIndex(str(tmp_path / "news"), DIM)
+
+    assert recall >= 0.9
+    assert index.search(late, 1, probes=1)[0][0] == 9000
+    assert reopened.partitions == 32
+    assert reopened.search(late, 1, probes=1)[0][0] == 9000
+
+
+def test_ingest_and_idea_creation_index_vectors_and_endpoints_rank_neighbours(session_factory, tmp_path):
+    """New news and ideas are indexed on write; /similar excludes the item itself and cluster members"""
+    factory = session_factory
+    # 寫入路徑使用共用的向量器，索引維度需與設定一致
+    dim = get_settings().vector_dim
+    news_index = VectorIndex(str(tmp_path / "news"), dim)
+    idea_index = VectorIndex(str(tmp_path / "ideas"), dim)
+
+    class IdeaLLM:
+        async def complete(self, prompt, **kwargs):
+            return "點子名稱：晶片良率預測平台\n以 AI 預測先進製程良率"
+
+    async def setup():
+        async with factory() as db:
+            fetcher = RSSFetcher(db, downloader=object(), parser=object(), news_index=news_index)
+            await fetcher._save_entries([[
+                FeedEntry("台積電先進製程擴產", "https://example.com/1", "晶片需求強勁", "test", None),
+                FeedEntry("台積電先進製程產能滿載", "https://example.com/2", "晶片訂單湧入", "test", None),
+                FeedEntry("巴西咖啡豆價格大漲", "https://example.com/3", "霜害衝擊收成", "test", None),
+            ]])
+            await db.execute(insert(News), [{
+                "id": 4, "title": "台積電先進製程擴產計畫", "link": "https://example.com/4",
+                "summary": "晶片需求強勁", "source": "test", "cluster_id": 1,
+            }])
+            await db.execute(insert(Idea), [{"id": 1, "title": "晶圓廠節能顧問", "content": "先進製程晶片廠節能"}])
+            await sync_id_sequences(db)
+            await db.commit()
+            service = IdeaService(db, IdeaLLM(), idea_index=idea_index)
+            news = await service.get_news_by_ids([1, 3])
+            created = await service.generate_idea(news[0], news[1])
+        return created.id
+
+    created_id = asyncio.run(setup())
+    indexed = (sorted(np.flatnonzero(news_index._lists).tolist()), idea_index.contains(created_id))
+
+    async def override_db():
+        async with factory() as db:
+            yield db
+
+    async def override_similarity():
+        async with factory() as db:
+            yield SimilarityService(db, news_index, idea_index, get_embedder())
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_similarity_service] = override_similarity
+    try:
+        client = TestClient(app)
+        similar_news = client.get("/api/news/1/similar", params={"limit": 5}).json()
+        similar_ideas = client.get("/api/ideas/1/similar").json()
+        missing = client.get("/api/news/99/similar")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert indexed == ([1, 2, 3], True)
+    assert [item["id"] for item in similar_news["items"]] == [2, 3]
+    assert similar_news["items"][0]["score"] > similar_news["items"][1]["score"]
+    # 點子 1 沒有經過服務層建立，查詢時即時補寫向量
+    assert [item["id"] for item in similar_ideas["items"]] == [created_id]
+    assert idea_index.contains(1)
+    assert missing.status_code == 404